@@ -0,0 +1,401 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+from datetime import datetime
+from multiprocessing import Pool
+
+from jitte.benchmarks.server import BenchmarkServer
+from jitte.core.reply import Reply
+from jitte.core.renderer import Renderer
+from jitte.core.summary import Summary
+from jitte.core.testcase import TestCase
+from jitte.core.testsuite import TestSuite
+from jitte.core.session import ConnectionPool
+from jitte.core.logger import configure_logging
+
+
+DEFAULT_HISTORY = 'benchmarks.jsonl'
+# a metric getting worse by more than this fraction is a regression
+DEFAULT_THRESHOLD = 0.1
+NETWORK_PHASES = ('connect', 'tls', 'ttfb', 'body')
+# seconds `jitte --help` may take to start, import and exit
+STARTUP_BUDGET = 0.25
+HEAVY_MODULES = ('requests', 'lxml', 'jinja2', 'ijson')
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+# metrics compared between runs, the others describe the benchmark itself
+TRACKED_METRICS = ('steps_per_sec', 'calls_per_sec', 'overhead_us_per_step',
+                   'us_per_call', 'elapsed', 'memory_peak')
+
+# jitte logs every request, only warnings are of interest here
+logger = logging.getLogger('jitte.benchmarks')
+logger.setLevel(logging.WARNING)
+
+
+class FakeResponse(object):
+
+    def __init__(self, text):
+        self.text = text
+        self.status_code = 200
+        self.headers = {}
+
+
+def json_step(url):
+    return {'url': url + '/json',
+            'method': 'GET',
+            'assume': [{'type': 'status_code', 'expected': '200'},
+                       {'type': 'json', 'got': ['status'], 'expected': 'ok'},
+                       {'type': 'text', 'expected': 'item 19',
+                        'pass_if': 'in'}]}
+
+
+def xml_step(url):
+    return {'url': url + '/xml',
+            'method': 'GET',
+            'assume': [{'type': 'status_code', 'expected': '200'},
+                       {'type': 'xpath', 'got': '/catalog/status/text()',
+                        'expected': 'ok'}]}
+
+
+def large_step(url, stream):
+    return {'url': url + '/large',
+            'method': 'GET',
+            'stream': stream,
+            'assume': [{'type': 'status_code', 'expected': '200'},
+                       {'type': 'text', 'expected': 'not there',
+                        'pass_if': 'nin'}]}
+
+
+def slow_step(url):
+    return {'url': url + '/slow',
+            'method': 'GET',
+            'assume': [{'type': 'status_code', 'expected': '200'}]}
+
+
+def write_script(directory, name, steps, graph=False):
+    """
+    Write the steps as a script, chained one after another, or all of them
+    following the first one when `graph` is set.
+    """
+    script = {}
+    for index, step in enumerate(steps, 1):
+        step = dict(step)
+        if graph and index == 1:
+            step['next'] = [str(i) for i in range(2, len(steps) + 1)]
+        elif not graph and index < len(steps):
+            step['next'] = str(index + 1)
+        script[str(index)] = step
+
+    path = os.path.join(directory, '{0}.json'.format(name))
+    with open(path, 'w') as file_obj:
+        json.dump(script, file_obj)
+    return path
+
+
+def peak_memory():
+    # kilobytes on Linux, bytes on OS X
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def isolated(benchmark, *args):
+    """
+    Run a benchmark in a fresh process so its memory peak is its own.
+    """
+    pool = Pool(1)
+    try:
+        return pool.apply(measured, (benchmark,) + args)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def measured(benchmark, *args):
+    start_memory = peak_memory()
+    metrics = benchmark(*args)
+    metrics['memory_peak'] = peak_memory()
+    metrics['memory_growth'] = metrics['memory_peak'] - start_memory
+    return metrics
+
+
+def bench_suite(script, repeat, concurrency=None):
+    """
+    Steps per second of TestSuite.run, and the time per step spent in
+    jitte rather than waiting on the network.
+    """
+    pool = ConnectionPool(logger, pool_size=max(10, concurrency or 1))
+    suite = TestSuite(logger, script, pool, timings=True)
+    steps = 0
+    overhead = 0.0
+    start = time.time()
+    try:
+        for _ in range(repeat):
+            for result in suite.run(concurrency):
+                if result['result'] != 'OK':
+                    raise RuntimeError('Benchmark step failed: {0}'.format(
+                        result.get('cause') or result.get('assumption')))
+                timings = result['timings']
+                network = sum(float(timings[phase])
+                              for phase in NETWORK_PHASES if phase in timings)
+                overhead += float(result['duration']) - network
+                steps += 1
+    finally:
+        pool.close()
+    elapsed = time.time() - start
+
+    return {'steps': steps,
+            'elapsed': elapsed,
+            'steps_per_sec': steps / elapsed,
+            'overhead_us_per_step': overhead / steps * 1e6}
+
+
+def bench_process_reply(iterations):
+    """
+    Assumption evaluation of TestCase._process_reply on a fresh reply each
+    time, so parsing is part of the measurement.
+    """
+    base = FakeResponse(json.dumps({'status': 'ok',
+                                    'items': [{'id': i} for i in range(50)]}))
+    assume = [{'type': 'status_code', 'pass_if': 'eq', 'expected': '200',
+               'got': None},
+              {'type': 'json', 'pass_if': 'eq', 'expected': 'ok',
+               'got': ['status']},
+              {'type': 'json', 'pass_if': 'eq', 'expected': 49,
+               'got': ['items', 49, 'id']},
+              {'type': 'text', 'pass_if': 'in', 'expected': '"id": 25',
+               'got': None}]
+    test_case = TestCase(logger, 'GET', 'http://localhost/', assume, [], {},
+                         None)
+    start = time.time()
+    for _ in range(iterations):
+        if test_case._process_reply(Reply(base)):
+            raise RuntimeError('Benchmark assumption failed')
+    elapsed = time.time() - start
+
+    return {'calls': iterations,
+            'elapsed': elapsed,
+            'calls_per_sec': iterations / elapsed,
+            'us_per_call': elapsed / iterations * 1e6}
+
+
+def bench_render(results):
+    """
+    Time taken by Renderer.render for a report of the given size.
+    """
+    tests = []
+    for index in range(results):
+        test = {'step': str(index), 'url': 'http://localhost/json',
+                'script': 'bench.json', 'duration': '0.00100',
+                'result': 'OK' if index % 10 else 'FAILED',
+                'cause': '' if index % 10 else 'Got status_code: 500',
+                'assumptions': [{'type': 'json', 'got': ['status'],
+                                 'expected': 'ok', 'pass_if': 'eq'}]}
+        tests.append(test)
+    summary = Summary(logger, tests).create_summary('Benchmark')
+
+    result_path = tempfile.mkdtemp()
+    start = time.time()
+    try:
+        Renderer(logger, summary).render(result_path, 'benchmark')
+        elapsed = time.time() - start
+    finally:
+        shutil.rmtree(result_path)
+
+    return {'results': results,
+            'elapsed': elapsed}
+
+
+def bench_startup(runs):
+    """
+    Mean time of starting the command line for --help, and the heavy
+    modules imported by jitte.run.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [PACKAGE_ROOT, env.get('PYTHONPATH')]))
+    with open(os.devnull, 'w') as devnull:
+        start = time.time()
+        for _ in range(runs):
+            subprocess.check_call([sys.executable, '-m', 'jitte.run',
+                                   '--help'], stdout=devnull, env=env)
+        elapsed = (time.time() - start) / runs
+
+    check = ('import sys, jitte.run; '
+             'print(sum(name in sys.modules for name in {0!r}))'.format(
+                 HEAVY_MODULES))
+    heavy = subprocess.check_output([sys.executable, '-c', check], env=env)
+    return {'runs': runs,
+            'elapsed': elapsed,
+            'heavy_modules': int(heavy)}
+
+
+def benchmarks(url, directory, quick=False):
+    """
+    The benchmarks as (name, callable, arguments) tuples.
+    """
+    scale = 1 if quick else 10
+    sizes = (10, 100)
+    plans = []
+    for size in sizes:
+        script = write_script(directory, 'json_{0}'.format(size),
+                              [json_step(url)] * size)
+        plans.append(('suite_json_{0}'.format(size), bench_suite,
+                      (script, max(1, 50 * scale // size))))
+    script = write_script(directory, 'xml_100', [xml_step(url)] * 100)
+    plans.append(('suite_xml_100', bench_suite, (script, scale)))
+    for stream in (False, True):
+        name = 'large_streamed' if stream else 'large'
+        script = write_script(directory, name, [large_step(url, stream)])
+        plans.append(('suite_' + name, bench_suite, (script, 1)))
+    script = write_script(directory, 'slow_graph', [slow_step(url)] * 21,
+                          graph=True)
+    plans.append(('suite_slow_graph', bench_suite, (script, scale, 10)))
+    plans.append(('startup', bench_startup, (5 * scale,)))
+    plans.append(('process_reply', bench_process_reply, (1000 * scale,)))
+    for size in (100, 1000):
+        plans.append(('render_{0}'.format(size), bench_render, (size,)))
+    return plans
+
+
+def revision():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        output = subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=directory, stderr=open(os.devnull, 'w'))
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return output.strip()
+
+
+def read_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as file_obj:
+        return [json.loads(line) for line in file_obj if line.strip()]
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_sec')
+
+
+def compare(previous, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Relative change of every tracked metric present in both runs, as
+    (benchmark, metric, previous, current, change, regressed) tuples.
+    """
+    changes = []
+    for name in sorted(current):
+        for metric in TRACKED_METRICS:
+            if metric not in current[name]:
+                continue
+            old = previous.get(name, {}).get(metric)
+            new = current[name][metric]
+            if not old:
+                continue
+            change = (new - old) / float(old)
+            worse = -change if higher_is_better(metric) else change
+            changes.append((name, metric, old, new, change,
+                            worse > threshold))
+    return changes
+
+
+def parse_options(args):
+    parser = argparse.ArgumentParser(prog="python -m jitte.benchmarks.run")
+    parser.add_argument("--history",
+                        action="store",
+                        type=str,
+                        default=DEFAULT_HISTORY,
+                        dest="history",
+                        help="JSON Lines file the results are appended to")
+    parser.add_argument("--label",
+                        action="store",
+                        type=str,
+                        default=None,
+                        dest="label",
+                        help="Name of this run, the git revision by default")
+    parser.add_argument("--threshold",
+                        action="store",
+                        type=float,
+                        default=DEFAULT_THRESHOLD,
+                        dest="threshold",
+                        help="Relative change reported as a regression")
+    parser.add_argument("--quick",
+                        action="store_true",
+                        default=False,
+                        dest="quick",
+                        help="Fewer iterations, for a rough number")
+    parser.add_argument("-k",
+                        action="store",
+                        type=str,
+                        default=None,
+                        dest="only",
+                        help="Only run benchmarks whose name contains this")
+    return parser.parse_args(args)
+
+
+def main(args):
+    options = parse_options(args)
+    configure_logging()
+    server = BenchmarkServer().start()
+    directory = tempfile.mkdtemp()
+    results = {}
+    try:
+        for name, benchmark, arguments in benchmarks(server.url, directory,
+                                                     options.quick):
+            if options.only and options.only not in name:
+                continue
+            results[name] = isolated(benchmark, *arguments)
+            print '{0:<22} {1}'.format(name, ', '.join(
+                '{0}={1:.6g}'.format(metric, value)
+                for metric, value in sorted(results[name].items())))
+    finally:
+        shutil.rmtree(directory)
+        server.stop()
+
+    history = read_history(options.history)
+    record = {'label': options.label or revision(),
+              'time': datetime.now().isoformat(),
+              'python': platform.python_version(),
+              'quick': options.quick,
+              'benchmarks': results}
+    with open(options.history, 'a') as file_obj:
+        file_obj.write(json.dumps(record, sort_keys=True) + '\n')
+
+    startup = results.get('startup')
+    over_budget = startup is not None and (
+        startup['elapsed'] > STARTUP_BUDGET or startup['heavy_modules'])
+    if over_budget:
+        print ('Startup took {0:.3f}s with {1} of {2} imported, the budget is '
+               '{3}s without them').format(startup['elapsed'],
+                                           startup['heavy_modules'],
+                                           ', '.join(HEAVY_MODULES),
+                                           STARTUP_BUDGET)
+
+    # only runs made with the same number of iterations are comparable
+    previous = [entry for entry in history
+                if entry.get('quick') == options.quick]
+    if not previous:
+        return 1 if over_budget else 0
+
+    regressions = 0
+    print
+    print 'Compared to {0}:'.format(previous[-1]['label'])
+    for name, metric, old, new, change, regressed in compare(
+            previous[-1]['benchmarks'], results, options.threshold):
+        regressions += regressed
+        print '{0:<22} {1:<22} {2:>12.6g} -> {3:<12.6g} {4:+.1%}{5}'.format(
+            name, metric, old, new, change, ' REGRESSION' if regressed else '')
+    return 1 if regressions or over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,103 @@
+import BaseHTTPServer
+import SocketServer
+import json
+import threading
+import time
+import urlparse
+
+
+JSON_BODY = json.dumps({'status': 'ok',
+                        'token': 'abc',
+                        'items': [{'id': i, 'name': 'item {0}'.format(i)}
+                                  for i in range(20)]})
+XML_BODY = ('<catalog><status>ok</status>' +
+            ''.join('<item id="{0}">item {0}</item>'.format(i)
+                    for i in range(20)) +
+            '</catalog>')
+LARGE_CHUNK = json.dumps({'id': 0, 'name': 'x' * 1000})
+DEFAULT_LARGE_SIZE = 10 * 1024 * 1024
+DEFAULT_DELAY = 0.05
+
+
+class BenchmarkHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Fixed endpoints of the benchmark server:
+    /json, /xml, /large?size=BYTES (a JSON array) and /slow?delay=SECONDS.
+    """
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out together, a reply split in small writes
+    # stalls on delayed acknowledgements of keep-alive connections
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send_headers(self, content_type, length):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+
+    def _send(self, body, content_type='application/json'):
+        self._send_headers(content_type, len(body))
+        self.wfile.write(body)
+
+    def _send_large(self, size):
+        # the body is written in chunks, the server never holds all of it
+        chunk = LARGE_CHUNK + ','
+        count = max(1, (size - 2) // len(chunk))
+        self._send_headers('application/json',
+                           2 + count * len(chunk) - 1)
+        self.wfile.write('[')
+        for index in range(count):
+            self.wfile.write(chunk if index < count - 1 else LARGE_CHUNK)
+        self.wfile.write(']')
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        query = dict(urlparse.parse_qsl(url.query))
+        if url.path == '/xml':
+            self._send(XML_BODY, 'text/xml')
+        elif url.path == '/large':
+            self._send_large(int(query.get('size', DEFAULT_LARGE_SIZE)))
+        elif url.path == '/slow':
+            time.sleep(float(query.get('delay', DEFAULT_DELAY)))
+            self._send(JSON_BODY)
+        else:
+            self._send(JSON_BODY)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self._send(JSON_BODY)
+
+
+class ThreadedServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class BenchmarkServer(object):
+    """
+    HTTP server running in a thread of the benchmark process, on a free
+    port of localhost.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.server = ThreadedServer((host, port), BenchmarkHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return 'http://{0}:{1}'.format(host, port)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,79 @@
+CHECKS = {'eq': lambda x, y: x == y,
+          'neq': lambda x, y: x != y,
+          'in': lambda x, y: y in x,
+          'nin': lambda x, y: y not in x,
+          'empty': lambda x, y: x is None,
+          'nempty': lambda x, y: x is not None,
+          'ninja': lambda x, y: True}
+
+
+def json_trie(paths):
+    """
+    Merge key paths into a trie, so paths sharing a prefix walk it once.
+    A node is the path ending there, if any, and its (key, node) children.
+    """
+    root = {}
+    for path in paths:
+        node = root
+        for key in path:
+            node = node.setdefault(key, {})
+        node[None] = tuple(path)
+
+    def freeze(node):
+        children = tuple((key, freeze(child))
+                         for key, child in node.items() if key is not None)
+        return node.get(None), children
+
+    return freeze(root)
+
+
+def _walk(document, node, values):
+    path, children = node
+    if path is not None:
+        values[path] = document
+    for key, child in children:
+        try:
+            value = document[key]
+        except (KeyError, IndexError, TypeError):
+            continue
+        _walk(value, child, values)
+
+
+def find_json(document, trie):
+    """
+    The values at every key path of the trie in one traversal of the
+    document, by path. Paths not found are left out.
+    """
+    values = {}
+    _walk(document, trie, values)
+    return values
+
+
+class AssumptionEvaluator(object):
+    """
+    The assumptions of a step compiled once: their conditions are looked
+    up ahead and the key paths of the JSON assumptions are merged into a
+    trie, so a reply is walked once for all of them.
+    """
+
+    def __init__(self, assumptions):
+        self.assumptions = tuple(assumptions)
+        self.checks = tuple(CHECKS[assumption['pass_if']]
+                            for assumption in self.assumptions)
+        # the key path of every JSON assumption, None for the others and for
+        # those reading an earlier reply with "from" from the reply store
+        self.json = tuple(tuple(assumption['got'])
+                          if assumption['type'] == 'json' and
+                          assumption.get('from') is None else None
+                          for assumption in self.assumptions)
+        self.json_paths = [path for path in self.json if path is not None]
+        self.trie = json_trie(self.json_paths)
+
+    @classmethod
+    def wrap(cls, assumptions):
+        if isinstance(assumptions, cls):
+            return assumptions
+        return cls(assumptions)
+
+    def find_json(self, document):
+        return find_json(document, self.trie)
@@ -0,0 +1,293 @@
+import calendar
+import hashlib
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from email.utils import parsedate
+
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from jitte.core.cassette import make_response, fits_in_memory
+from jitte.core.defaults import DEFAULT_CACHE_SIZE
+
+
+CACHEABLE_STATUS_CODES = (200, 203, 300, 301, 410)
+# headers of a 304 describing its own empty body, not the stored one
+BODY_HEADERS = ('content-length', 'content-encoding', 'transfer-encoding')
+# requests sent on behalf of a user are not cached, their replies are only
+# that user's
+CREDENTIAL_HEADERS = ('Authorization', 'Cookie')
+
+
+def parse_cache_control(value):
+    directives = {}
+    for directive in (value or '').split(','):
+        name, _, argument = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def parse_http_date(value):
+    parsed = parsedate(value) if value else None
+    if parsed is None:
+        return None
+    return calendar.timegm(parsed)
+
+
+class CacheEntry(object):
+    """
+    A stored reply: its status, headers, body and when it stops being
+    fresh. Stale entries are revalidated with a conditional request.
+    """
+
+    def __init__(self, url, vary, status, reason, headers, body, expires):
+        self.url = url
+        self.vary = vary
+        self.status = status
+        self.reason = reason
+        self.headers = CaseInsensitiveDict(headers)
+        self.body = body
+        self.expires = expires
+
+    @classmethod
+    def from_response(cls, request, response, now, streamed=False):
+        """
+        The entry of a reply, None if the reply must not be stored. The
+        body of a `streamed` reply is read only when its Content-Length is
+        at most MAX_STREAMED_SIZE.
+        """
+        cache_control = parse_cache_control(response.headers.get(
+            'Cache-Control'))
+        vary = response.headers.get('Vary')
+        if ('no-store' in cache_control or
+                response.status_code not in CACHEABLE_STATUS_CODES or
+                (vary and vary.strip() == '*')):
+            return None
+        if streamed and not fits_in_memory(response):
+            return None
+
+        vary = dict((name.strip().lower(), request.headers.get(name.strip()))
+                    for name in (vary or '').split(',') if name.strip())
+        entry = cls(request.url, vary, response.status_code, response.reason,
+                    response.headers, None, now)
+        entry.refresh(response.headers, now)
+        if entry.expires <= now and not entry.validators():
+            # neither fresh nor revalidatable, storing it is pointless
+            return None
+        entry.body = response.content or ''
+        return entry
+
+    def refresh(self, headers, now):
+        """
+        Compute the freshness lifetime from Cache-Control or Expires, a
+        reply without either is revalidated every time it's used.
+        """
+        cache_control = parse_cache_control(headers.get('Cache-Control'))
+        self.expires = now
+        if 'no-cache' in cache_control:
+            return
+        try:
+            age = int(headers.get('Age') or 0)
+        except ValueError:
+            age = 0
+        if cache_control.get('max-age') is not None:
+            try:
+                self.expires = now + int(cache_control['max-age']) - age
+            except ValueError:
+                pass
+        elif headers.get('Expires'):
+            expires = parse_http_date(headers['Expires'])
+            date = parse_http_date(headers.get('Date')) or now
+            if expires is not None:
+                self.expires = now + expires - date
+
+    def validators(self):
+        validators = {}
+        if self.headers.get('ETag'):
+            validators['If-None-Match'] = self.headers['ETag']
+        if self.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = self.headers['Last-Modified']
+        return validators
+
+    def matches(self, request):
+        return all(request.headers.get(name) == value
+                   for name, value in self.vary.items())
+
+    def as_dict(self):
+        return {'url': self.url, 'vary': self.vary, 'status': self.status,
+                'reason': self.reason, 'headers': dict(self.headers),
+                'expires': self.expires}
+
+
+class HttpCache(object):
+    """
+    Replies of GET requests kept in memory, the least recently used ones
+    dropped past `size` entries, and optionally in a directory as well so
+    they survive the run, where the least recently used ones past `size`
+    are deleted too.
+    """
+
+    def __init__(self, logger, size=DEFAULT_CACHE_SIZE, path=None):
+        self.logger = logger
+        self.size = max(1, size)
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path is not None and not os.path.isdir(path):
+            os.makedirs(path)
+
+    def adapter(self, adapter):
+        return CachingAdapter(adapter, self)
+
+    def _file(self, key):
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, name)
+
+    def _read(self, key):
+        try:
+            with open(self._file(key) + '.json', 'r') as file_obj:
+                stored = json.load(file_obj)
+            with open(self._file(key) + '.body', 'rb') as file_obj:
+                body = file_obj.read()
+        except (IOError, ValueError):
+            return None
+        return CacheEntry(stored['url'], stored['vary'], stored['status'],
+                          stored['reason'], stored['headers'], body,
+                          stored['expires'])
+
+    def _write(self, key, entry):
+        with open(self._file(key) + '.body', 'wb') as file_obj:
+            file_obj.write(entry.body)
+        with open(self._file(key) + '.json', 'w') as file_obj:
+            json.dump(entry.as_dict(), file_obj)
+        self._evict_files()
+
+    def _touch(self, key):
+        # the modification time tells which stored entries were used last
+        try:
+            os.utime(self._file(key) + '.json', None)
+        except OSError:
+            pass
+
+    def _evict_files(self):
+        names = [os.path.join(self.path, name[:-len('.json')])
+                 for name in os.listdir(self.path) if name.endswith('.json')]
+        if len(names) <= self.size:
+            return
+        mtimes = {}
+        for name in names:
+            try:
+                mtimes[name] = os.path.getmtime(name + '.json')
+            except OSError:
+                mtimes[name] = 0
+        names.sort(key=lambda name: mtimes[name])
+        for name in names[:len(names) - self.size]:
+            for suffix in ('.json', '.body'):
+                try:
+                    os.remove(name + suffix)
+                except OSError:
+                    pass
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is None and self.path is not None:
+                entry = self._read(key)
+            if entry is not None:
+                self.entries[key] = entry
+                self._evict()
+                if self.path is not None:
+                    self._touch(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            self._evict()
+            if self.path is not None:
+                self._write(key, entry)
+
+    def _evict(self):
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def count(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def close(self):
+        self.logger.info('HTTP cache: {0} hits, {1} revalidated, '
+                         '{2} misses'.format(self.hits, self.revalidated,
+                                             self.misses))
+
+
+class CachingAdapter(BaseAdapter):
+    """
+    Serve GET requests from the cache while the stored reply is fresh,
+    revalidate it with If-None-Match / If-Modified-Since when it's stale,
+    and pass every other request on to the wrapped adapter.
+    """
+
+    def __init__(self, adapter, cache):
+        super(CachingAdapter, self).__init__()
+        self.adapter = adapter
+        self.cache = cache
+
+    def _respond(self, request, entry):
+        return make_response(request, entry.status, entry.reason,
+                             entry.headers, entry.body)
+
+    def send(self, request, **kwargs):
+        request_cache_control = parse_cache_control(request.headers.get(
+            'Cache-Control'))
+        if (request.method != 'GET' or 'no-store' in request_cache_control or
+                'no-cache' in request_cache_control or
+                any(name in request.headers for name in CREDENTIAL_HEADERS)):
+            return self.adapter.send(request, **kwargs)
+
+        key = request.url
+        now = time.time()
+        entry = self.cache.get(key)
+        if entry is not None and not entry.matches(request):
+            entry = None
+        if entry is not None and entry.expires > now:
+            self.cache.count('hits')
+            return self._respond(request, entry)
+
+        sent = request
+        if entry is not None and entry.validators():
+            sent = request.copy()
+            sent.headers.update(entry.validators())
+        response = self.adapter.send(sent, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            # the stored reply is still valid, with updated headers
+            response.close()
+            entry.headers.update((name, value)
+                                 for name, value in response.headers.items()
+                                 if name.lower() not in BODY_HEADERS)
+            # a 304 without Cache-Control keeps the stored lifetime
+            entry.refresh(entry.headers, now)
+            self.cache.put(key, entry)
+            self.cache.count('revalidated')
+            return self._respond(request, entry)
+
+        self.cache.count('misses')
+        entry = CacheEntry.from_response(request, response, now,
+                                         kwargs.get('stream', False))
+        if entry is not None:
+            self.cache.put(key, entry)
+        return response
+
+    def close(self):
+        # the cache itself is closed by its owner, it outlives the sessions
+        self.adapter.close()
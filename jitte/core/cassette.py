@@ -0,0 +1,229 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import RequestException
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from jitte.core.exceptions import InvalidConfiguration
+
+
+INDEX_FILE = 'cassette.jsonl'
+BODIES_DIR = 'bodies'
+# the body of a streamed reply is read at once to be stored, only when the
+# reply tells it's no larger
+MAX_STREAMED_SIZE = 1024 * 1024
+
+
+class ReplyNotRecorded(RequestException):
+    pass
+
+
+def make_response(request, status, reason, headers, body):
+    """
+    A requests Response with its whole body already read, sent by no
+    connection.
+    """
+    response = Response()
+    response.status_code = status
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response._content = body
+    response._content_consumed = True
+    return response
+
+
+def fits_in_memory(response):
+    """
+    True if the Content-Length of a reply is at most MAX_STREAMED_SIZE.
+    """
+    try:
+        size = int(response.headers.get('Content-Length'))
+    except (TypeError, ValueError):
+        return False
+    return size <= MAX_STREAMED_SIZE
+
+
+def digest(body):
+    if body is None:
+        return None
+    if isinstance(body, unicode):
+        body = body.encode('utf-8')
+    elif not isinstance(body, str):
+        # file objects and generators can't be replayed, nor told apart
+        return 'stream'
+    return hashlib.sha1(body).hexdigest()
+
+
+class Cassette(object):
+    """
+    Requests and replies stored in a directory: one JSON line per request
+    and the reply bodies gzipped in files named after their SHA-1, so
+    identical bodies are stored once. A recording cassette stores every
+    reply sent, a replaying one serves the recorded replies, requests
+    without one fail.
+    """
+
+    def __init__(self, path, record=False):
+        self.path = path
+        self.recording = record
+        self.interactions = {}
+        self.played = {}
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._index = None
+        if record:
+            bodies = os.path.join(path, BODIES_DIR)
+            if not os.path.isdir(bodies):
+                os.makedirs(bodies)
+            self._index = open(os.path.join(path, INDEX_FILE), 'w')
+        else:
+            self._load()
+
+    def _load(self):
+        try:
+            file_obj = open(os.path.join(self.path, INDEX_FILE), 'r')
+        except IOError:
+            msg = 'Cassette {0} not found'.format(self.path)
+            raise InvalidConfiguration(msg)
+
+        with file_obj:
+            for line in file_obj:
+                if line.strip():
+                    interaction = json.loads(line)
+                    key = self._key(interaction['method'],
+                                    interaction['url'],
+                                    interaction['body'])
+                    self.interactions.setdefault(key, []).append(interaction)
+
+    def _key(self, method, url, body_digest):
+        return (method.upper(), url, body_digest)
+
+    def adapter(self, adapter):
+        """
+        The transport adapter of a session using this cassette, recording
+        wraps the adapter doing the actual requests.
+        """
+        if self.recording:
+            return RecordingAdapter(adapter, self)
+        return ReplayAdapter(self)
+
+    def _body_path(self, content):
+        return os.path.join(self.path, BODIES_DIR, content + '.gz')
+
+    def _store_body(self, content, body):
+        path = self._body_path(content)
+        if os.path.exists(path):
+            return
+        # written aside then renamed, steps recording the same body at
+        # once write identical files
+        fd, spooled = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as file_obj:
+                file_obj.write(body)
+        os.rename(spooled, path)
+
+    def record(self, request, response, streamed=False):
+        """
+        Store a reply. The body of a `streamed` reply is stored only when
+        it fits in memory, otherwise replaying the request fails.
+        """
+        content = None
+        if not streamed or fits_in_memory(response):
+            body = response.content or ''
+            content = digest(body)
+            self._store_body(content, body)
+        interaction = {'method': request.method,
+                       'url': request.url,
+                       'body': digest(request.body),
+                       'status': response.status_code,
+                       'reason': response.reason,
+                       'headers': dict(response.headers),
+                       'content': content}
+        with self._lock:
+            self._index.write(json.dumps(interaction) + '\n')
+            self._index.flush()
+
+    def _read_body(self, content):
+        if content not in self._bodies:
+            try:
+                with gzip.open(self._body_path(content), 'rb') as file_obj:
+                    self._bodies[content] = file_obj.read()
+            except IOError:
+                msg = 'Recorded body {0} is missing'.format(content)
+                raise ReplyNotRecorded(msg)
+        return self._bodies[content]
+
+    def play(self, request):
+        """
+        The recorded replies of a request are served in the order they were
+        recorded, the last one again once they are used up.
+        """
+        key = self._key(request.method, request.url, digest(request.body))
+        with self._lock:
+            recorded = self.interactions.get(key)
+            if not recorded:
+                msg = 'No recorded reply for {0} {1}'.format(request.method,
+                                                           request.url)
+                raise ReplyNotRecorded(msg)
+            played = self.played.get(key, 0)
+            self.played[key] = played + 1
+            interaction = recorded[min(played, len(recorded) - 1)]
+            if interaction['content'] is None:
+                msg = ('Body of {0} {1} was streamed and too large to be '
+                       'recorded'.format(request.method, request.url))
+                raise ReplyNotRecorded(msg)
+            body = self._read_body(interaction['content'])
+
+        return make_response(request,
+                             interaction['status'],
+                             interaction['reason'],
+                             interaction['headers'],
+                             body)
+
+    def close(self):
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+
+class RecordingAdapter(BaseAdapter):
+
+    def __init__(self, adapter, cassette):
+        super(RecordingAdapter, self).__init__()
+        self.adapter = adapter
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        response = self.adapter.send(request, **kwargs)
+        # the body is read here, streamed steps read it from memory later
+        self.cassette.record(request, response,
+                             streamed=kwargs.get('stream', False))
+        return response
+
+    def close(self):
+        self.adapter.close()
+        self.cassette.close()
+
+
+class ReplayAdapter(BaseAdapter):
+
+    def __init__(self, cassette):
+        super(ReplayAdapter, self).__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        return self.cassette.play(request)
+
+    def close(self):
+        pass
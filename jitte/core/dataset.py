@@ -0,0 +1,116 @@
+import csv
+import json
+import threading
+import time
+
+from string import Template
+
+from multiprocessing.pool import ThreadPool
+
+from jitte.core.stats import SuiteStats
+from jitte.core.exceptions import InvalidConfiguration
+
+
+def substitute(value, row):
+    """
+    Replace ${field} placeholders with the fields of a dataset row.
+    """
+    if row is None or not isinstance(value, basestring):
+        return value
+    return Template(value).safe_substitute(row)
+
+
+class Dataset(object):
+    """
+    Rows of a CSV file (with a header line) or of a JSON Lines file, read
+    lazily, one row at a time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path.endswith('.csv'):
+            self.reader = self._read_csv
+        elif path.endswith(('.jsonl', '.ndjson')):
+            self.reader = self._read_json_lines
+        else:
+            msg = 'Unknown dataset format {0}, use .csv or .jsonl'.format(path)
+            raise InvalidConfiguration(msg)
+
+    def _read_csv(self, file_obj):
+        for row in csv.DictReader(file_obj):
+            yield row
+
+    def _read_json_lines(self, file_obj):
+        for number, line in enumerate(file_obj, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                msg = 'Invalid dataset row {0} in {1}'.format(number,
+                                                             self.path)
+                raise InvalidConfiguration(msg)
+            yield row
+
+    def __iter__(self):
+        try:
+            file_obj = open(self.path, 'r')
+        except IOError:
+            msg = 'Unable to open: {0}'.format(self.path)
+            raise InvalidConfiguration(msg)
+
+        with file_obj:
+            for row in self.reader(file_obj):
+                yield row
+
+
+class DatasetRun(object):
+    """
+    Run a test suite once per dataset row, rows spread across `workers`,
+    and aggregate the results of every step across all rows.
+    """
+
+    def __init__(self, logger, suite, dataset, workers=1, concurrency=None):
+        self.logger = logger
+        self.suite = suite
+        self.dataset = dataset
+        self.workers = max(1, workers)
+        self.concurrency = concurrency
+        self.stats = SuiteStats()
+        self._lock = threading.Lock()
+        self._rows = None
+
+    def _next_row(self):
+        # rows are pulled by the workers, never read ahead of them
+        with self._lock:
+            return next(self._rows, None)
+
+    def _worker(self, worker_id):
+        rows = 0
+        row = self._next_row()
+        while row is not None:
+            self.stats.record(self.suite.run(self.concurrency, row=row))
+            rows += 1
+            row = self._next_row()
+        return rows
+
+    def run(self, sink):
+        start = time.time()
+        self._rows = iter(self.dataset)
+        workers = ThreadPool(self.workers)
+        try:
+            rows = sum(workers.map(self._worker, range(self.workers)))
+        finally:
+            workers.close()
+            workers.join()
+        elapsed = time.time() - start
+
+        self.logger.info('{0} dataset rows run from {1}'.format(
+            rows, self.dataset.path))
+        for result in self.stats.as_results(elapsed):
+            result['script'] = self.suite.testfile
+            result['rows'] = rows
+            sink.add(result)
+        return sink
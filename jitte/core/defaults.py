@@ -0,0 +1,7 @@
+# defaults of command line options whose modules need requests, kept here
+# so parsing the options doesn't import it
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 0
+DEFAULT_BACKOFF = 0.0
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CIRCUIT_RESET = 30.0
@@ -0,0 +1,324 @@
+import json
+import socket
+import threading
+import time
+
+from collections import deque
+
+from jitte.core.exceptions import InvalidConfiguration
+
+
+# a script is given up on after the workers running it were lost this often
+MAX_ATTEMPTS = 3
+CONNECT_TIMEOUT = 10.0
+# a worker running a script tells it's alive this often, and is lost when
+# the coordinator hears nothing from it for WORKER_TIMEOUT seconds
+HEARTBEAT_INTERVAL = 5.0
+WORKER_TIMEOUT = 60.0
+
+
+def parse_address(value):
+    """
+    A (host, port) tuple from "host:port", "port" alone means localhost.
+    """
+    host, _, port = value.rpartition(':')
+    try:
+        return (host or '127.0.0.1', int(port))
+    except ValueError:
+        msg = 'Invalid address {0}, use host:port'.format(value)
+        raise InvalidConfiguration(msg)
+
+
+class ConnectionClosed(Exception):
+    pass
+
+
+class Connection(object):
+    """
+    JSON messages over a TCP connection, one per line. Messages may be
+    sent by any number of threads.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.peer = '{0}:{1}'.format(*sock.getpeername()[:2])
+        self._reader = sock.makefile('rb')
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        line = json.dumps(message, default=unicode) + '\n'
+        try:
+            with self._lock:
+                self.sock.sendall(line)
+        except socket.error as exc:
+            raise ConnectionClosed(str(exc))
+
+    def receive(self):
+        try:
+            line = self._reader.readline()
+        except socket.timeout:
+            raise ConnectionClosed('no message from {0} in {1}s'.format(
+                self.peer, self.sock.gettimeout()))
+        except socket.error as exc:
+            raise ConnectionClosed(str(exc))
+        if not line:
+            raise ConnectionClosed('closed by {0}'.format(self.peer))
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self._reader.close()
+            self.sock.close()
+        except socket.error:
+            pass
+
+
+class Coordinator(object):
+    """
+    Spread scripts across worker processes connecting over TCP. Every
+    worker gets one script at a time and streams back the result of each
+    step as it finishes; the results of a script are added to the sink
+    once the whole script ran, so a worker lost halfway leaves nothing
+    behind and its script is handed to another worker. `options` are sent
+    to the workers, which run the scripts with them. A worker silent for
+    `timeout` seconds while running a script, hanging or cut off from the
+    network, is lost as well.
+    """
+
+    def __init__(self, logger, address, scripts, options,
+                 max_attempts=MAX_ATTEMPTS, timeout=WORKER_TIMEOUT):
+        self.logger = logger
+        self.address = address
+        self.options = options
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.pending = deque(scripts)
+        self.remaining = len(scripts)
+        self.attempts = dict.fromkeys(scripts, 0)
+        self.sink = None
+        self.closed = False
+        self._server = None
+        self._condition = threading.Condition()
+
+    def start(self):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(self.address)
+        self._server.listen(16)
+        # the actual port when port 0 was asked for
+        self.address = self._server.getsockname()
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+        self.logger.info('Coordinator listening on {0}:{1}, waiting for '
+                         'workers.'.format(*self.address))
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._server.accept()
+            except socket.error:
+                # the server socket was closed, the run is over
+                return
+            sock.settimeout(self.timeout)
+            thread = threading.Thread(target=self._serve,
+                                      args=(Connection(sock),))
+            thread.daemon = True
+            thread.start()
+
+    def _take(self):
+        """
+        The next script to run, None once every script ran. Waits while
+        the only scripts left are running, one of them may come back, and
+        until the run has a sink for the results.
+        """
+        with self._condition:
+            while self.remaining and (self.sink is None or not self.pending):
+                self._condition.wait()
+            if self.pending:
+                script = self.pending.popleft()
+                self.attempts[script] += 1
+                return script
+            return None
+
+    def _finish(self, script, results):
+        with self._condition:
+            if self.closed:
+                return
+            for result in results:
+                self.sink.add(result)
+            self.remaining -= 1
+            self._condition.notify_all()
+
+    def _lost(self, connection, script, exc):
+        with self._condition:
+            if self.closed:
+                return
+            if self.attempts[script] < self.max_attempts:
+                self.logger.warning('Worker {0} lost running {1} ({2}), '
+                                    'running it again.'.format(
+                                        connection.peer, script, exc))
+                self.pending.appendleft(script)
+            else:
+                self.logger.error('Worker {0} lost running {1} ({2}), '
+                                  'giving up after {3} attempts.'.format(
+                                      connection.peer, script, exc,
+                                      self.attempts[script]))
+                self.remaining -= 1
+            self._condition.notify_all()
+
+    def _run_script(self, connection, script):
+        connection.send({'type': 'script', 'script': script})
+        results = []
+        while True:
+            message = connection.receive()
+            if message['type'] == 'result':
+                results.append(message['result'])
+            elif message['type'] == 'error':
+                self.logger.error(message['error'])
+                self._finish(script, [])
+                return
+            elif message['type'] == 'done':
+                self._finish(script, results)
+                return
+            # anything else, like a heartbeat, only tells the worker is alive
+
+    def _serve(self, connection):
+        self.logger.info('Worker {0} connected.'.format(connection.peer))
+        try:
+            connection.send({'type': 'options', 'options': self.options})
+            while True:
+                script = self._take()
+                if script is None:
+                    connection.send({'type': 'stop'})
+                    return
+                try:
+                    self._run_script(connection, script)
+                except (ConnectionClosed, ValueError) as exc:
+                    self._lost(connection, script, exc)
+                    return
+        except ConnectionClosed:
+            pass
+        finally:
+            connection.close()
+
+    def run(self, sink):
+        """
+        Wait for the workers to run every script, adding the results to
+        the sink. The sink is returned.
+        """
+        if self._server is None:
+            self.start()
+        with self._condition:
+            self.sink = sink
+            self._condition.notify_all()
+        try:
+            with self._condition:
+                while self.remaining:
+                    # a timeout keeps the wait interruptible by Ctrl+C
+                    self._condition.wait(1.0)
+        finally:
+            self.close()
+        return sink
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self.remaining = 0
+            self.pending.clear()
+            self._condition.notify_all()
+        if self._server is not None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            self._server.close()
+
+
+class RemoteSink(object):
+    """
+    Sink of a worker, sending every result to the coordinator at once.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def add(self, result):
+        self.connection.send({'type': 'result', 'result': result})
+
+
+class Worker(object):
+    """
+    Run the scripts handed out by a coordinator. `start(options)` is
+    called with the options of the coordinator and returns the Runner of
+    the scripts. A heartbeat is sent every `heartbeat` seconds, so slow
+    steps don't pass for a hanging worker.
+    """
+
+    def __init__(self, logger, address, start,
+                 connect_timeout=CONNECT_TIMEOUT,
+                 heartbeat=HEARTBEAT_INTERVAL):
+        self.logger = logger
+        self.address = address
+        self.start = start
+        self.connect_timeout = connect_timeout
+        self.heartbeat = heartbeat
+
+    def connect(self):
+        """
+        Connect to the coordinator, waiting for it to start listening.
+        """
+        deadline = time.time() + self.connect_timeout
+        while True:
+            try:
+                return Connection(socket.create_connection(self.address))
+            except socket.error as exc:
+                if time.time() >= deadline:
+                    msg = 'Unable to connect to {0}:{1}: {2}'.format(
+                        self.address[0], self.address[1], exc)
+                    raise InvalidConfiguration(msg)
+                time.sleep(0.1)
+
+    def _beat(self, connection, stopped):
+        while not stopped.wait(self.heartbeat):
+            try:
+                connection.send({'type': 'heartbeat'})
+            except ConnectionClosed:
+                return
+
+    def run(self):
+        """
+        Run scripts until the coordinator has no more of them. Returns the
+        number of scripts run.
+        """
+        connection = self.connect()
+        scripts = 0
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self._beat,
+                                     args=(connection, stopped))
+        heartbeat.daemon = True
+        heartbeat.start()
+        try:
+            runner = self.start(connection.receive()['options'])
+            while True:
+                message = connection.receive()
+                if message['type'] == 'stop':
+                    break
+                script = message['script']
+                try:
+                    suite = runner.load(script)
+                except (InvalidConfiguration, SystemExit) as exc:
+                    error = str(exc) or 'Invalid test script {0}'.format(
+                        script)
+                    connection.send({'type': 'error', 'error': error})
+                    continue
+                self.logger.info('Running {0}'.format(script))
+                runner.run_suites([suite], RemoteSink(connection))
+                connection.send({'type': 'done'})
+                scripts += 1
+        except ConnectionClosed as exc:
+            self.logger.error('Lost the coordinator: {0}'.format(exc))
+        finally:
+            stopped.set()
+            connection.close()
+        return scripts
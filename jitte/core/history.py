@@ -0,0 +1,154 @@
+import sqlite3
+import time
+
+from jitte.core.stats import Histogram
+
+
+DEFAULT_RECENT_RUNS = 5
+DEFAULT_BASELINE_RUNS = 20
+DEFAULT_THRESHOLD = 0.2
+# slower by less than this many seconds is noise, whatever the ratio
+DEFAULT_MIN_CHANGE = 0.001
+TRACKED_PERCENTILES = (('p50', 50.0), ('p95', 95.0))
+
+SCHEMA = ('CREATE TABLE IF NOT EXISTS runs ('
+          ' id INTEGER PRIMARY KEY,'
+          ' started REAL NOT NULL,'
+          ' timestamp TEXT NOT NULL,'
+          ' title TEXT)',
+          'CREATE TABLE IF NOT EXISTS results ('
+          ' run INTEGER NOT NULL REFERENCES runs (id),'
+          ' script TEXT,'
+          ' step TEXT NOT NULL,'
+          ' url TEXT,'
+          ' result TEXT NOT NULL,'
+          ' duration REAL NOT NULL)',
+          'CREATE INDEX IF NOT EXISTS runs_started ON runs (started)',
+          'CREATE INDEX IF NOT EXISTS results_step ON results '
+          '(script, step, run)',
+          'CREATE INDEX IF NOT EXISTS results_url ON results (url, run)')
+
+
+def window(durations):
+    """
+    The percentiles of the durations of a window of runs, None for a
+    window without any.
+    """
+    if not durations:
+        return None
+    histogram = Histogram()
+    for duration in durations:
+        histogram.record(duration)
+    stats = {'count': histogram.count}
+    for name, percent in TRACKED_PERCENTILES:
+        stats[name] = histogram.percentile(percent)
+    return stats
+
+
+class History(object):
+    """
+    The results of every run kept in a SQLite file, so the latency of each
+    step can be followed across runs. Runs are numbered in the order they
+    were recorded.
+    """
+
+    def __init__(self, logger, path):
+        self.logger = logger
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+
+    def record(self, timestamp, title, results):
+        """
+        Insert the results of a run in one transaction. Returns the number
+        of the run. Steps reused by --watch are left out, their duration
+        is the one of the run they were sent in.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO runs (started, timestamp, title) '
+                'VALUES (?, ?, ?)', (time.time(), timestamp, title))
+            run = cursor.lastrowid
+            rows = ((run, result.get('script'), result['step'],
+                     result.get('url'), result['result'],
+                     float(result.get('duration') or 0))
+                    for result in results if not result.get('reused'))
+            self.connection.executemany(
+                'INSERT INTO results (run, script, step, url, result, '
+                'duration) VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return run
+
+    def steps(self, script=None):
+        """
+        The (script, step, url) of every recorded step, of one script only
+        when given.
+        """
+        query = 'SELECT DISTINCT script, step, url FROM results'
+        arguments = ()
+        if script is not None:
+            query += ' WHERE script = ?'
+            arguments = (script,)
+        return sorted(self.connection.execute(query, arguments))
+
+    def durations(self, script, step, url, runs):
+        """
+        The durations of the passed executions of a step in the last `runs`
+        runs which executed it, by run, oldest run first.
+        """
+        rows = self.connection.execute(
+            'SELECT run, duration FROM results '
+            'WHERE script IS ? AND step = ? AND url IS ? AND result = ? '
+            'AND run IN (SELECT DISTINCT run FROM results '
+            '            WHERE script IS ? AND step = ? AND url IS ? '
+            '            ORDER BY run DESC LIMIT ?) '
+            'ORDER BY run', (script, step, url, 'OK',
+                             script, step, url, runs))
+        by_run = []
+        for run, duration in rows:
+            if not by_run or by_run[-1][0] != run:
+                by_run.append((run, []))
+            by_run[-1][1].append(duration)
+        return by_run
+
+    def trends(self, recent=DEFAULT_RECENT_RUNS,
+               baseline=DEFAULT_BASELINE_RUNS, threshold=DEFAULT_THRESHOLD,
+               script=None, min_change=DEFAULT_MIN_CHANGE):
+        """
+        The latency of every step in its last `recent` runs against the
+        `baseline` runs before them. A step regressed when its recent p50
+        or p95 is more than `threshold` (0.2 is 20%) and at least
+        `min_change` seconds above the baseline. Only passed executions
+        count, failures are often fast.
+        """
+        trends = []
+        for step_script, step, url in self.steps(script):
+            by_run = self.durations(step_script, step, url, recent + baseline)
+            recent_runs = by_run[-recent:]
+            baseline_runs = by_run[:-recent] if len(by_run) > recent else []
+            recent_stats = window([duration for run, durations in recent_runs
+                                   for duration in durations])
+            baseline_stats = window([duration
+                                     for run, durations in baseline_runs
+                                     for duration in durations])
+            regressed = []
+            if recent_stats and baseline_stats:
+                for name, percent in TRACKED_PERCENTILES:
+                    if (recent_stats[name] >
+                            baseline_stats[name] * (1 + threshold) and
+                            recent_stats[name] - baseline_stats[name] >=
+                            min_change):
+                        regressed.append(name)
+            trends.append({'script': step_script,
+                           'step': step,
+                           'url': url,
+                           'medians': [window(durations)['p50']
+                                       for run, durations in by_run],
+                           'recent': recent_stats,
+                           'baseline': baseline_stats,
+                           'regressed': regressed})
+        return trends
+
+    def close(self):
+        self.connection.close()
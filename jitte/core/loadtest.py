@@ -0,0 +1,88 @@
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from jitte.core.stats import SuiteStats
+
+
+class LoadTest(object):
+    """
+    Replay a test suite many times, for a number of iterations or for a
+    fixed duration, optionally paced to a target rate of iterations per
+    second, with `concurrency` iterations in flight at most.
+    """
+
+    def __init__(self, logger, suite, iterations=None, duration=None,
+                 rate=None, concurrency=1):
+        self.logger = logger
+        self.suite = suite
+        if iterations is None and duration is None:
+            iterations = 1
+        self.iterations = iterations
+        self.duration = duration
+        self.rate = rate
+        self.concurrency = max(1, concurrency)
+        self.stats = SuiteStats()
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._start = None
+
+    def _next_iteration(self):
+        """
+        Hand out the next iteration number, or None when the run is over.
+        """
+        with self._lock:
+            if self.iterations is not None and self._issued >= self.iterations:
+                return None
+            iteration = self._issued
+            self._issued += 1
+
+        if self.rate:
+            # iterations are scheduled on a fixed timeline, so a slow reply
+            # doesn't lower the rate as long as there are free workers
+            delay = self._start + iteration / float(self.rate) - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        if (self.duration is not None and
+                time.time() - self._start >= self.duration):
+            return None
+
+        return iteration
+
+    def _worker(self, worker_id):
+        iterations = 0
+        while self._next_iteration() is not None:
+            self.stats.record(self.suite.run())
+            iterations += 1
+        return iterations
+
+    def run(self):
+        """
+        Return one aggregated result per step, each with its latency figures
+        under the 'latency' key, and the load run totals.
+        """
+        self._start = time.time()
+        workers = ThreadPool(self.concurrency)
+        try:
+            iterations = sum(workers.map(self._worker,
+                                         range(self.concurrency)))
+        finally:
+            workers.close()
+            workers.join()
+        elapsed = time.time() - self._start
+
+        results = self.stats.as_results(elapsed)
+        requests = sum(result['latency']['count'] for result in results)
+        load = {'iterations': iterations,
+                'concurrency': self.concurrency,
+                'elapsed': '{0:.3f}'.format(elapsed),
+                'requests': requests,
+                'throughput': '{0:.2f}'.format(
+                    requests / elapsed if elapsed else 0.0)}
+        self.logger.info('{0} iterations, {1} requests in {2}s '
+                         '({3} req/s)'.format(iterations,
+                                              requests,
+                                              load['elapsed'],
+                                              load['throughput']))
+        return results, load
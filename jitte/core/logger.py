@@ -2,10 +2,16 @@ import sys
 import logging
 
 
-logging.getLogger('').setLevel(logging.DEBUG)
 logger = logging.getLogger('jitte')
 
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(logging.Formatter('%(message)s'))
 
-logger.addHandler(handler)
+def configure_logging(level=logging.DEBUG):
+    """
+    Print the messages of jitte to stdout. Only the command line does it,
+    importing jitte leaves the logging configuration alone.
+    """
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(level)
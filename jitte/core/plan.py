@@ -0,0 +1,160 @@
+from jitte.core.assumptions import AssumptionEvaluator
+
+
+def walk(next_steps, entry):
+    """
+    The steps reachable from the entry one following "next", `next_steps`
+    by step, in the order they're found, and the "next" edges leading back
+    to an earlier step of the same path. Targets missing from `next_steps`
+    are left out.
+    """
+    order = []
+    loops = []
+    visiting = set()
+    visited = set()
+
+    def visit(step_id):
+        visiting.add(step_id)
+        visited.add(step_id)
+        order.append(step_id)
+        for target in next_steps[step_id]:
+            if target not in next_steps:
+                continue
+            if target in visiting:
+                loops.append((step_id, target))
+            elif target not in visited:
+                visit(target)
+        visiting.remove(step_id)
+
+    visit(entry)
+    return order, loops
+
+
+def direct_parents(next_steps, depends_on, loops):
+    """
+    The steps each step of `depends_on` directly runs after: those leading
+    to it with "next", except to loop back, and those it depends on.
+    """
+    loops = set(loops)
+    parents = dict((step_id, set(deps))
+                   for step_id, deps in depends_on.items())
+    for step_id, targets in next_steps.items():
+        for target in targets:
+            if target in parents and (step_id, target) not in loops:
+                parents[target].add(step_id)
+    return parents
+
+
+def ancestors(parents):
+    """
+    The steps every step runs after, from the steps it directly follows or
+    depends on, `parents` by step.
+    """
+    found = {}
+    for step_id in parents:
+        seen = set()
+        pending = list(parents[step_id])
+        while pending:
+            parent = pending.pop()
+            if parent not in seen:
+                seen.add(parent)
+                pending.extend(parents.get(parent, ()))
+        # a step depending on itself through others never runs at all
+        seen.discard(step_id)
+        found[step_id] = seen
+    return found
+
+
+class Step(object):
+    """
+    One validated step of a test script. Steps are immutable, so a plan can
+    be executed any number of times, by any number of threads.
+    """
+    FIELDS = ('step_id', 'method', 'url', 'assume', 'data', 'headers',
+              'next', 'depends_on', 'stream', 'cache')
+    __slots__ = FIELDS + ('evaluator',)
+
+    def __init__(self, step_id, method, url, assume, data, headers,
+                 next=(), depends_on=(), stream=None, cache=True):
+        values = {'step_id': step_id,
+                  'method': method,
+                  'url': url,
+                  'assume': tuple(assume),
+                  'data': tuple(data),
+                  'headers': headers,
+                  'next': tuple(next),
+                  'depends_on': tuple(depends_on),
+                  'stream': stream,
+                  'cache': cache,
+                  # the assumptions compiled once, for every run of the step
+                  'evaluator': AssumptionEvaluator(assume)}
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Step {0} is immutable'.format(self.step_id))
+
+    def __delattr__(self, name):
+        raise AttributeError('Step {0} is immutable'.format(self.step_id))
+
+    def __eq__(self, other):
+        if not isinstance(other, Step):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self.FIELDS)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash((self.step_id, self.method, self.url))
+
+
+class Plan(object):
+    """
+    The compiled steps of a test script, reachable from the entry step,
+    with the "next" edges leading back to an earlier step of the same path.
+    """
+    __slots__ = ('steps', 'entry', 'order', 'loops')
+
+    def __init__(self, steps, entry="1"):
+        self.steps = steps
+        self.entry = entry
+        self.order, self.loops = walk(self.next_steps(), entry)
+
+    def next_steps(self):
+        return dict((step_id, step.next)
+                    for step_id, step in self.steps.items())
+
+    def chain(self):
+        """
+        The steps in the order they run one after another, following the
+        first "next" of every step until the end or a loop.
+        """
+        chain = []
+        step_id = self.entry
+        while step_id is not None and step_id not in chain:
+            chain.append(step_id)
+            next_steps = self.steps[step_id].next
+            step_id = next_steps[0] if next_steps else None
+        return chain
+
+    def ancestors(self):
+        """
+        The steps each step always runs after: the steps leading to it with
+        "next", except to loop back, and those it depends on.
+        """
+        depends_on = dict((step_id, step.depends_on)
+                          for step_id, step in self.steps.items())
+        return ancestors(direct_parents(self.next_steps(), depends_on,
+                                        self.loops))
+
+    def is_graph(self):
+        """
+        True if any step branches to several steps or waits for others.
+        """
+        for step in self.steps.values():
+            if len(step.next) > 1 or step.depends_on:
+                return True
+        return False
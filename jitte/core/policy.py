@@ -0,0 +1,72 @@
+import threading
+
+
+class ScriptProgress(object):
+    """
+    The failed and skipped steps of one run of a script.
+    """
+
+    def __init__(self):
+        self.failures = 0
+        self.failed = set()
+        self._lock = threading.Lock()
+
+    def record(self, step_id, result):
+        with self._lock:
+            if result['result'] != 'OK':
+                self.failed.add(step_id)
+            if result['result'] == 'FAILED':
+                self.failures += 1
+
+
+class RunPolicy(object):
+    """
+    When to stop sending requests. One policy is shared by every script of
+    a run: `fail_fast` stops the run at the first failed step,
+    `max_failures` after that many failed steps in the whole run, and
+    `max_script_failures` stops a single script after that many of its own
+    steps failed. With `skip_dependents` the steps following a failed one,
+    or depending on it, are skipped instead of being sent with a missing
+    or wrong previous reply.
+    """
+
+    def __init__(self, fail_fast=False, max_failures=None,
+                 max_script_failures=None, skip_dependents=False):
+        if fail_fast:
+            max_failures = 1
+        self.max_failures = max_failures
+        self.max_script_failures = max_script_failures
+        self.skip_dependents = skip_dependents
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """
+        Forget the failures, for another run of the scripts.
+        """
+        with self._lock:
+            self.failures = 0
+
+    def record(self, progress, step_id, result):
+        progress.record(step_id, result)
+        if result['result'] == 'FAILED':
+            with self._lock:
+                self.failures += 1
+
+    def skip_cause(self, progress, parents):
+        """
+        Why a step whose previous or required steps are `parents` must not
+        run, None if it may.
+        """
+        if (self.max_failures is not None and
+                self.failures >= self.max_failures):
+            return 'Run stopped after {0} failed steps.'.format(self.failures)
+        if (self.max_script_failures is not None and
+                progress.failures >= self.max_script_failures):
+            return 'Script stopped after {0} failed steps.'.format(
+                progress.failures)
+        if self.skip_dependents:
+            for parent in parents:
+                if parent in progress.failed:
+                    return 'Step {0} did not pass.'.format(parent)
+        return None
@@ -0,0 +1,94 @@
+import cProfile
+import os
+import pstats
+import threading
+
+
+# functions defined under this directory are jitte's own code
+PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP_FUNCTIONS = 40
+
+
+class Profiler(object):
+    """
+    Profile a run with cProfile, in the calling thread and in every thread
+    started while the profiler is running, like the workers of a Runner.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    def _start_thread(self, *args):
+        # installed as the profile function of new threads, replaced by the
+        # thread's own profiler on the first call it sees
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def start(self):
+        threading.setprofile(self._start_thread)
+        self._start_thread()
+
+    def stop(self):
+        threading.setprofile(None)
+        for profile in self.profiles:
+            profile.disable()
+
+    def stats(self):
+        """
+        The statistics of every profiled thread merged together.
+        """
+        profiles = []
+        for profile in self.profiles:
+            profile.create_stats()
+            if profile.stats:
+                profiles.append(profile)
+        return pstats.Stats(*profiles)
+
+    def counters(self, stats):
+        """
+        Calls, own time and cumulative time of every jitte function, most
+        expensive first, as (name, calls, own, cumulative) tuples.
+        """
+        counters = []
+        for (filename, line, name), values in stats.stats.items():
+            path = os.path.abspath(filename)
+            if not path.startswith(PACKAGE_PATH + os.sep):
+                continue
+            calls, own, cumulative = values[1], values[2], values[3]
+            module = os.path.relpath(path, os.path.dirname(PACKAGE_PATH))
+            counters.append(('{0}:{1}({2})'.format(module, line, name),
+                             calls, own, cumulative))
+        counters.sort(key=lambda counter: counter[3], reverse=True)
+        return counters
+
+    def write(self, result_path, timestamp):
+        """
+        Write the pstats file, loadable with the pstats module or tools
+        like snakeviz, and a plain text summary next to the report.
+        """
+        if not os.path.isdir(result_path):
+            os.makedirs(result_path)
+        stats = self.stats()
+        stats_path = os.path.join(result_path,
+                                  'profile-{0}.pstats'.format(timestamp))
+        stats.dump_stats(stats_path)
+
+        summary_path = os.path.join(result_path,
+                                    'profile-{0}.txt'.format(timestamp))
+        with open(summary_path, 'w') as file_obj:
+            file_obj.write('jitte functions by cumulative time\n\n')
+            file_obj.write('{0:>10} {1:>10} {2:>10}  {3}\n'.format(
+                'calls', 'own', 'cumulative', 'function'))
+            for name, calls, own, cumulative in self.counters(stats):
+                file_obj.write('{0:>10} {1:>10.5f} {2:>10.5f}  {3}\n'.format(
+                    calls, own, cumulative, name))
+            file_obj.write('\nAll functions\n\n')
+            stats.stream = file_obj
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+
+        self.logger.info('Profile written to {0}'.format(stats_path))
+        return stats_path, summary_path
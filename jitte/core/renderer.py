@@ -6,7 +6,11 @@ from datetime import datetime
 
 from jinja2 import Environment, PackageLoader
 
-ASSETS_PATH = "templates/assets"
+from jitte.core.writers import TIMESTAMP_FORMAT
+
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                           "templates",
+                           "assets")
 
 
 class Renderer(object):
@@ -16,44 +20,39 @@ class Renderer(object):
         self.env = Environment(loader=PackageLoader('jitte', 'templates'))
         self.summary = summary
 
-    def render(self, result_path):
-        timestamp = datetime.strftime(datetime.now(), '%Y-%m-%d-%H-%M-%S')
+    def render(self, result_path, timestamp=None):
+        if timestamp is None:
+            timestamp = datetime.strftime(datetime.now(), TIMESTAMP_FORMAT)
         template = self.env.get_template('template.html')
-        # show result
-        s1 = "Tests run: {0}".format(self.summary['total'])
-        s2 = "{0} failed. {1} passed.".format(self.summary['fail'],
-                                              self.summary['pass'])
-        self.printnice(s1, s2, "=")
         # write to file
         filepath = os.path.join(result_path,
                                 'result-{0}.html'.format(timestamp))
         self.copy(ASSETS_PATH, result_path)
+        # the report is written piece by piece while the template iterates
+        # the tests, which may be read lazily from the result file
         with open(filepath, 'w') as output_file:
-            output_file.write(template.render(report=self.summary))
+            for chunk in template.generate(report=self.summary):
+                output_file.write(chunk.encode('utf-8'))
 
     def copy(self, src, dst):
-        try:
-            shutil.copytree(src, dst)
-        except OSError as exc:  # python >2.5
-            if exc.errno == errno.ENOTDIR:
-                shutil.copy(src, dst)
-            else:
-                raise
-
-    def printnice(self, s1, s2, headerchar):
-        size = 0
-        header = ""
-        s1_size = len(s1)
-        s2_size = len(s2)
-        if (s1_size > s2_size):
-            size = s1_size
-        else:
-            size = s2_size
-
-        for i in range(0, size):
-            header = header + str(headerchar)
-
-        print header
-        print s1
-        print s2
-        print header
+        # the destination may already exist, e.g. holding the result file
+        if not os.path.isdir(src):
+            shutil.copy(src, dst)
+            return
+
+        for root, dirs, files in os.walk(src):
+            target = os.path.join(dst, os.path.relpath(root, src))
+            try:
+                os.makedirs(target)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+            for filename in files:
+                source = os.path.join(root, filename)
+                copied = os.path.join(target, filename)
+                # assets left by an earlier report are not copied again
+                if (os.path.exists(copied) and
+                        os.path.getsize(copied) == os.path.getsize(source) and
+                        os.path.getmtime(copied) >= os.path.getmtime(source)):
+                    continue
+                shutil.copy2(source, target)
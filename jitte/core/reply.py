@@ -0,0 +1,218 @@
+import codecs
+import json
+import tempfile
+import time
+
+from requests.exceptions import RequestException
+
+from jitte.core.exceptions import TestError
+from jitte.core.stream import find_json_paths, SPOOL_SIZE
+from jitte.core.xpath import compile_xpath, load_etree
+
+
+def parse_json(source):
+    try:
+        return json.loads(source)
+    except Exception as exc:
+        raise TestError('JSON Parse error: {0}'.format(exc))
+
+
+def parse_xml(source):
+    try:
+        return load_etree().fromstring(source)
+    except Exception as exc:
+        raise TestError('XML Parse error: {0}'.format(exc))
+
+
+def walk_json(document, path):
+    try:
+        for item in path:
+            document = document[item]
+    except (KeyError, IndexError, TypeError):
+        raise TestError('JSON Key {0} not found'.format(item))
+
+    return document
+
+
+def evaluate_xpath(document, xpath):
+    try:
+        (result,) = compile_xpath(xpath)(document)
+        return result
+    except Exception as exc:
+        msg = 'XPath {0} evaluation error: {1}'.format(xpath, exc)
+        raise TestError(msg)
+
+
+class Reply(object):
+    """
+    Wrap a reply so its body is decoded and parsed at most once per format.
+    The same instance is shared by the assumptions of a step and the
+    send_data of the steps using it as their previous reply.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.status_code
+        self._text = None
+        self._documents = {}
+        # seconds spent parsing the body, in every format asked for
+        self.parse_time = 0.0
+
+    @classmethod
+    def wrap(cls, reply):
+        if isinstance(reply, cls):
+            return reply
+        return cls(reply)
+
+    @property
+    def text(self):
+        # requests decodes the content again on every access of .text
+        if self._text is None:
+            self._text = self.response.text
+        return self._text
+
+    @property
+    def headers(self):
+        return getattr(self.response, 'headers', {})
+
+    def _document(self, doc_format, parse):
+        # a body that fails to parse is not parsed again, the error is kept.
+        # Concurrent steps sharing this reply may at worst parse it twice.
+        if doc_format not in self._documents:
+            start = time.time()
+            try:
+                self._documents[doc_format] = (parse(), None)
+            except TestError as exc:
+                self._documents[doc_format] = (None, exc)
+            self.parse_time += time.time() - start
+
+        document, error = self._documents[doc_format]
+        if error is not None:
+            raise error
+        return document
+
+    def json(self):
+        return self._document('json', lambda: parse_json(self.text))
+
+    def xml(self):
+        return self._document('xml', lambda: parse_xml(self.text))
+
+
+class StreamedReply(Reply):
+    """
+    A reply whose body is read in chunks, only once, into a temporary file
+    that stays in memory while it's small. Only a bounded excerpt of the
+    body is kept for the report.
+    """
+
+    def __init__(self, response, limits):
+        super(StreamedReply, self).__init__(response)
+        self.limits = limits
+        self.size = 0
+        self.excerpt = ''
+        self.body = None
+        self.error = None
+        # seconds spent reading the body from the connection
+        self.read_time = 0.0
+
+    def _decoder(self):
+        encoding = self.response.encoding or 'utf-8'
+        try:
+            return codecs.getincrementaldecoder(encoding)('replace')
+        except LookupError:
+            return codecs.getincrementaldecoder('utf-8')('replace')
+
+    def consume(self, scanners=()):
+        """
+        Read the body, feeding the decoded chunks to the text scanners.
+        """
+        if self.error is not None:
+            raise self.error
+        if self.body is not None:
+            return
+
+        decoder = self._decoder()
+        body = tempfile.SpooledTemporaryFile(SPOOL_SIZE)
+        excerpt = []
+        excerpt_size = 0
+        # characters and bytes don't match, the excerpt is cut when some
+        # decoded text didn't fit in it
+        truncated = False
+        max_body = self.limits.max_body
+        start = time.time()
+        try:
+            chunks = self.response.iter_content(self.limits.chunk_size)
+            for chunk in chunks:
+                self.size += len(chunk)
+                text = decoder.decode(chunk)
+                text_excerpt = text[:self.limits.excerpt_size - excerpt_size]
+                excerpt.append(text_excerpt)
+                excerpt_size += len(text_excerpt)
+                truncated = truncated or len(text_excerpt) < len(text)
+                if max_body is not None and self.size > max_body:
+                    body.close()
+                    msg = 'Reply body exceeds {0} bytes'.format(max_body)
+                    self.error = TestError(msg)
+                    raise self.error
+                body.write(chunk)
+                for scanner in scanners:
+                    scanner.feed(text)
+            text = decoder.decode('', True)
+            for scanner in scanners:
+                scanner.feed(text)
+        except RequestException as exc:
+            # the connection broke while the body was read
+            body.close()
+            self.error = TestError('Request failed: {0}'.format(exc))
+            raise self.error
+        finally:
+            self.response.close()
+            self.read_time = time.time() - start
+            self.excerpt = ''.join(excerpt)
+            if truncated:
+                self.excerpt += '...'
+
+        self.body = body
+
+    def close(self):
+        """
+        Give the connection back without reading the rest of the body.
+        """
+        if self.body is None and self.error is None:
+            self.response.close()
+            self.error = TestError('Reply body was not read')
+
+    def _rewind(self):
+        self.consume()
+        self.body.seek(0)
+        return self.body
+
+    @property
+    def text(self):
+        # the whole body is decoded only if something asks for it
+        return self._decoder().decode(self._rewind().read(), True)
+
+    def json(self):
+        def parse():
+            try:
+                return json.load(self._rewind())
+            except Exception as exc:
+                raise TestError('JSON Parse error: {0}'.format(exc))
+
+        return self._document('json', parse)
+
+    def xml(self):
+        def parse():
+            try:
+                return load_etree().parse(self._rewind()).getroot()
+            except Exception as exc:
+                raise TestError('XML Parse error: {0}'.format(exc))
+
+        return self._document('xml', parse)
+
+    def find_json(self, paths):
+        """
+        Collect the values at the given key paths in one incremental pass,
+        without building the whole document.
+        """
+        return find_json_paths(self._rewind(), paths)
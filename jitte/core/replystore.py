@@ -0,0 +1,159 @@
+import threading
+
+from jitte.core.exceptions import TestError, ReplyNotAvailable
+from jitte.core.reply import Reply, walk_json, evaluate_xpath
+
+
+def reference_key(value_type, value):
+    # json paths are lists in the script, hashable tuples here
+    if value_type == 'json':
+        return (value_type, tuple(value))
+    return (value_type, value)
+
+
+def step_references(step):
+    """
+    The (step id, key) of every value a step reads with "from".
+    """
+    items = [(pkg[key], pkg[key]['value']) for pkg in step.data
+             for key in ('param_name', 'param_value') if key in pkg]
+    items.extend((assumption, assumption['got'])
+                 for assumption in step.assume)
+    for item, value in items:
+        if item.get('from') is not None:
+            yield item['from'], reference_key(item['type'], value)
+
+
+def plan_references(plan):
+    """
+    The values read with "from" by the steps of a plan, by the step whose
+    reply they're read from.
+    """
+    references = {}
+    for step in plan.steps.values():
+        for source, key in step_references(step):
+            references.setdefault(source, set()).add(key)
+    return references
+
+
+def plan_readers(plan):
+    """
+    The steps reading values with "from", by the step whose reply they're
+    read from. None when the plan loops, a step may then run again.
+    """
+    if plan.loops:
+        return None
+    readers = {}
+    for step in plan.steps.values():
+        for source, key in step_references(step):
+            readers.setdefault(source, set()).add(step.step_id)
+    return readers
+
+
+def reads_previous_reply(step):
+    """
+    True if a step sends a value of the reply of the step before it.
+    """
+    for pkg in step.data:
+        for key in ('param_name', 'param_value'):
+            item = pkg.get(key)
+            if (item is not None and item['type'] in ('json', 'xpath') and
+                    item.get('from') is None):
+                return True
+    return False
+
+
+def read_replies(plan):
+    """
+    The steps whose reply is read once they ran: with "from", or as the
+    previous reply by a step they lead to or one depending on them.
+    """
+    read = set(plan_references(plan))
+    for step in plan.steps.values():
+        if reads_previous_reply(step):
+            read.update(step.depends_on)
+            read.update(step_id for step_id, other in plan.steps.items()
+                        if step.step_id in other.next)
+    return read
+
+
+def extract(reply, value_type, value):
+    if value_type == 'json':
+        return walk_json(reply.json(), value)
+    result = evaluate_xpath(reply.xml(), value)
+    if isinstance(result, basestring):
+        # lxml strings keep a reference to the whole parsed document
+        result = unicode(result)
+    return result
+
+
+class ReplyStore(object):
+    """
+    The values the steps of a run read from the replies of earlier steps,
+    named with "from". The script tells up front which values of which
+    replies are read, only those are extracted once a step finished, and
+    its reply itself is not kept. The values of a step are dropped once
+    every step reading them ran, when `readers` tells which ones do.
+    """
+
+    def __init__(self, references, read=None, readers=None):
+        self.references = references
+        # the steps whose reply is read later, None when not known
+        self.read = read
+        # the steps still to read the values of each step
+        self.readers = readers
+        self.values = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_plan(cls, plan):
+        return cls(plan_references(plan), read_replies(plan),
+                   plan_readers(plan))
+
+    def reply_read(self, step_id):
+        """
+        True if the reply of a step may be read once it ran.
+        """
+        return self.read is None or step_id in self.read
+
+    def keep(self, step_id, reply):
+        """
+        Extract the referenced values of a step's reply, a value which
+        can't be found is stored as the error reading it raised.
+        """
+        wanted = self.references.get(step_id)
+        if not wanted or reply is None:
+            return
+        reply = Reply.wrap(reply)
+        values = {}
+        for key in wanted:
+            try:
+                values[key] = extract(reply, *key)
+            except TestError as exc:
+                values[key] = exc
+        with self._lock:
+            self.values[step_id] = values
+
+    def finished(self, step_id):
+        """
+        A step ran or was skipped, drop the values it was the last one to
+        read.
+        """
+        if self.readers is None:
+            return
+        with self._lock:
+            for source, readers in self.readers.items():
+                if step_id in readers:
+                    readers.remove(step_id)
+                    if not readers:
+                        self.values.pop(source, None)
+
+    def get(self, step_id, value_type, value):
+        with self._lock:
+            values = self.values.get(step_id)
+        if values is None:
+            raise ReplyNotAvailable('reply of step {0}'.format(step_id))
+        stored = values[reference_key(value_type, value)]
+        if isinstance(stored, TestError):
+            raise stored
+        return stored
@@ -0,0 +1,95 @@
+import glob
+import os
+
+from multiprocessing.pool import ThreadPool
+
+from jitte.core.testsuite import TestSuite
+from jitte.core.sink import ResultList
+from jitte.core.dataset import DatasetRun
+
+
+SCRIPT_EXTENSION = '.json'
+
+
+class Runner(object):
+    """
+    Run many independent test scripts concurrently. Only whole scripts are
+    spread across the workers, the steps of a script are scheduled by its
+    own TestSuite. Any other keyword argument is passed on to the suites.
+    """
+
+    def __init__(self, logger, pool, workers=1, concurrency=None,
+                 dataset=None, **suite_options):
+        self.logger = logger
+        self.pool = pool
+        self.workers = max(1, workers)
+        self.concurrency = concurrency
+        self.dataset = dataset
+        self.suite_options = suite_options
+
+    def collect(self, paths):
+        """
+        Expand directories and glob patterns into a sorted list of scripts.
+        """
+        scripts = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    scripts.extend(os.path.join(root, filename)
+                                   for filename in files
+                                   if filename.endswith(SCRIPT_EXTENSION))
+            elif glob.has_magic(path):
+                scripts.extend(glob.glob(path))
+            else:
+                scripts.append(path)
+
+        # the same script might be matched by more than one path
+        return sorted(set(scripts))
+
+    def run(self, paths, sink=None):
+        """
+        Run the collected scripts, adding their results to the sink as the
+        steps finish. The sink, a list by default, is returned.
+        """
+        sink = sink if sink is not None else ResultList()
+        scripts = self.collect(paths)
+        if not scripts:
+            self.logger.error('No test scripts found.')
+            return sink
+
+        # scripts are loaded up front so configuration errors stop the whole
+        # run instead of a single worker
+        suites = [self.load(script) for script in scripts]
+        return self.run_suites(suites, sink)
+
+    def load(self, script):
+        return TestSuite(self.logger, script, self.pool, **self.suite_options)
+
+    def run_suites(self, suites, sink, replies=None):
+        """
+        Run loaded suites. `replies` maps scripts to the replies dict their
+        TestSuite.run stores and reuses.
+        """
+        replies = replies or {}
+        if not suites:
+            return sink
+        if self.dataset is not None:
+            # the dataset rows of a script are spread across the workers
+            for suite in suites:
+                DatasetRun(self.logger,
+                           suite,
+                           self.dataset,
+                           self.workers,
+                           self.concurrency).run(sink)
+            return sink
+
+        workers = ThreadPool(min(self.workers, len(suites)))
+        try:
+            workers.map(lambda suite: suite.run(
+                self.concurrency, sink,
+                replies=replies.get(suite.testfile)), suites)
+        finally:
+            workers.close()
+            workers.join()
+
+        return sink
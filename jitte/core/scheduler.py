@@ -0,0 +1,120 @@
+import sys
+import Queue
+
+from multiprocessing.pool import ThreadPool
+
+
+class StepGraph(object):
+    """
+    Dependencies between the steps of a plan. A step depends on every step
+    pointing to it with "next" and on the steps listed in its "depends_on".
+    """
+
+    def __init__(self, logger, plan):
+        self.logger = logger
+        self.plan = plan
+        self.dependencies = {}
+        self.parents = {}
+        self._build()
+
+    def _build(self):
+        # following a loop would never let its target run
+        loops = set(self.plan.loops)
+        if loops:
+            self.logger.warning('WARNING! possible infinite loop.')
+
+        pointing = dict((step_id, []) for step_id in self.plan.order)
+        for step_id in self.plan.order:
+            for target in self.plan.steps[step_id].next:
+                if ((step_id, target) not in loops and
+                        step_id not in pointing[target]):
+                    pointing[target].append(step_id)
+
+        for step_id in self.plan.order:
+            explicit = list(self.plan.steps[step_id].depends_on)
+            # the reply of the first explicit dependency, otherwise of the
+            # step pointing here, is passed on as the previous reply
+            ordered = explicit + [dep for dep in pointing[step_id]
+                                  if dep not in explicit]
+            self.dependencies[step_id] = ordered
+            self.parents[step_id] = ordered[0] if ordered else None
+
+    def dependents(self):
+        counts = dict.fromkeys(self.dependencies, 0)
+        for deps in self.dependencies.values():
+            for dep in deps:
+                counts[dep] += 1
+        return counts
+
+
+class GraphScheduler(object):
+    """
+    Execute a step graph, running every step whose dependencies finished
+    concurrently, at most `concurrency` of them at a time.
+    """
+
+    def __init__(self, logger, graph, concurrency=1):
+        self.logger = logger
+        self.graph = graph
+        self.concurrency = max(1, concurrency)
+
+    def _work(self, execute, step_id, p_reply):
+        try:
+            return step_id, execute(step_id, p_reply), None
+        except Exception:
+            return step_id, None, sys.exc_info()
+
+    def run(self, execute):
+        """
+        `execute(step_id, p_reply)` runs one step, delivers its result and
+        returns its reply. Returns the number of executed steps.
+        """
+        waiting = dict((step_id, set(deps)) for step_id, deps
+                       in self.graph.dependencies.items())
+        remaining_dependents = self.graph.dependents()
+        replies = {}
+        executed = 0
+        finished = Queue.Queue()
+        running = 0
+
+        pool = ThreadPool(self.concurrency)
+        try:
+            while True:
+                ready = [step_id for step_id, deps in waiting.items()
+                         if not deps]
+                for step_id in sorted(ready):
+                    del waiting[step_id]
+                    parent = self.graph.parents[step_id]
+                    pool.apply_async(self._work,
+                                     (execute, step_id, replies.get(parent)),
+                                     callback=finished.put)
+                    running += 1
+                    for dep in self.graph.dependencies[step_id]:
+                        # replies are released once all dependents started
+                        remaining_dependents[dep] -= 1
+                        if remaining_dependents[dep] == 0:
+                            replies.pop(dep, None)
+
+                if not running:
+                    break
+
+                step_id, outcome, exc_info = finished.get()
+                running -= 1
+                if exc_info is not None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+
+                executed += 1
+                if remaining_dependents[step_id]:
+                    replies[step_id] = outcome
+                for deps in waiting.values():
+                    deps.discard(step_id)
+        finally:
+            pool.close()
+            pool.join()
+
+        if waiting:
+            msg = ('Steps {0} not executed, their dependencies form '
+                   'a cycle.'.format(', '.join(sorted(waiting))))
+            self.logger.error(msg)
+
+        return executed
@@ -0,0 +1,132 @@
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+from requests.packages.urllib3.connection import (HTTPConnection,
+                                                  HTTPSConnection)
+from requests.packages.urllib3.connectionpool import (HTTPConnectionPool,
+                                                      HTTPSConnectionPool)
+
+from jitte.core.timing import connection_phases
+from jitte.core.defaults import (DEFAULT_POOL_SIZE, DEFAULT_RETRIES,
+                                 DEFAULT_BACKOFF)
+
+
+RETRY_STATUS_CODES = (502, 503, 504)
+
+
+class TimedConnectionMixin(object):
+
+    def _new_conn(self):
+        # name resolution and the TCP handshake
+        start = time.time()
+        try:
+            return super(TimedConnectionMixin, self)._new_conn()
+        finally:
+            connection_phases.record('connect', time.time() - start)
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+
+    def connect(self):
+        start = time.time()
+        connected = connection_phases.phases.get('connect', 0.0)
+        try:
+            super(TimedHTTPSConnection, self).connect()
+        finally:
+            connect = connection_phases.phases.get('connect', 0.0) - connected
+            connection_phases.record('tls', time.time() - start - connect)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    Adapter whose new connections report their setup time to the
+    connection_phases of the requesting thread.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool}
+
+
+class ConnectionPool(object):
+    """
+    Shared HTTP session reused by every step of one or more test suites, so
+    chained requests against the same host keep their connections open.
+    """
+
+    def __init__(self, logger, pool_size=DEFAULT_POOL_SIZE, keep_alive=True,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 cassette=None, cache=None, throttle=None):
+        self.logger = logger
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.retries = retries
+        self.backoff = backoff
+        # a Cassette records the replies, or serves them without a network
+        self.cassette = cassette
+        # an HttpCache serving GET requests of the steps which allow it
+        self.cache = cache
+        # a Throttle limiting the requests sent to every host
+        self.throttle = throttle
+        self.session, self.origin_session = self._create_sessions()
+
+    def _create_sessions(self):
+        """
+        The shared session, and the session of the steps bypassing the HTTP
+        cache. Both use the same connections.
+        """
+        adapter = self._create_adapter()
+        origin_session = self._create_session(adapter)
+        if self.cache is None:
+            return origin_session, origin_session
+        return (self._create_session(self.cache.adapter(adapter)),
+                origin_session)
+
+    def _create_session(self, adapter):
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+
+        return session
+
+    def _create_adapter(self):
+        # retry only connection level failures and gateway errors, the final
+        # reply is always returned so assumptions can still inspect it
+        retry = Retry(total=self.retries,
+                      backoff_factor=self.backoff,
+                      status_forcelist=RETRY_STATUS_CODES,
+                      raise_on_status=False)
+        adapter = TimedHTTPAdapter(pool_connections=self.pool_size,
+                                   pool_maxsize=self.pool_size,
+                                   max_retries=retry)
+        if self.throttle is not None:
+            adapter = self.throttle.adapter(adapter)
+        if self.cassette is not None:
+            adapter = self.cassette.adapter(adapter)
+        return adapter
+
+    def close(self):
+        self.session.close()
+        self.origin_session.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.throttle is not None:
+            self.throttle.close()
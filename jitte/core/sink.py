@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+
+from jitte.core.summary import Summary
+
+
+class ResultList(list):
+    """
+    The default sink, keeping every result in memory.
+    """
+
+    def add(self, result):
+        self.append(result)
+
+
+class ResultFile(object):
+    """
+    The results stored in a JSON Lines file, read back lazily every time
+    they are iterated.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, 'r') as file_obj:
+            for line in file_obj:
+                yield json.loads(line)
+
+
+class ResultSink(object):
+    """
+    Write every result to a JSON Lines file as soon as it's added, so the
+    results are on disk even if the run dies, and count them for the
+    summary instead of keeping them in memory.
+    """
+
+    def __init__(self, logger, result_path, timestamp):
+        self.logger = logger
+        if not os.path.isdir(result_path):
+            os.makedirs(result_path)
+        self.path = os.path.join(result_path,
+                                 'result-{0}.jsonl'.format(timestamp))
+        self.summary = Summary(logger)
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'w')
+
+    def add(self, result):
+        line = json.dumps(result, default=unicode)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.summary.add(result)
+
+    def close(self):
+        self._file.close()
+
+    def results(self):
+        return ResultFile(self.path)
+
+    def create_summary(self, title):
+        return self.summary.create_summary(title, self.results())
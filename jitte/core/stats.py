@@ -0,0 +1,155 @@
+import math
+import threading
+
+
+# a power of two range is split into 2**SUB_BUCKET_BITS buckets, which keeps
+# the relative error of a recorded value below 1/128
+SUB_BUCKET_BITS = 7
+PERCENTILES = (('p50', 50.0), ('p90', 90.0), ('p99', 99.0), ('p999', 99.9))
+
+
+class Histogram(object):
+    """
+    Log-linear latency histogram in the spirit of HdrHistogram. Values are
+    recorded in microseconds into buckets whose width grows with the value,
+    so memory stays constant no matter how many values are recorded.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        shift = max(0, value.bit_length() - SUB_BUCKET_BITS)
+        return (value >> shift) << shift
+
+    def record(self, seconds):
+        value = int(seconds * 1000000)
+        bucket = self._bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent):
+        """
+        Return the upper bound of the bucket holding the given percentile in
+        seconds, capped by the largest recorded value.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = max(1, int(math.ceil(self.count * percent / 100.0)))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                shift = max(0, bucket.bit_length() - SUB_BUCKET_BITS)
+                upper = bucket + (1 << shift) - 1
+                return min(upper, self.max) / 1000000.0
+
+        return self.max / 1000000.0
+
+    def mean(self):
+        if not self.count:
+            return 0.0
+        return self.total / 1000000.0 / self.count
+
+
+class StepStats(object):
+    """
+    Aggregate the results of one step executed many times.
+    """
+
+    def __init__(self, step, url):
+        self.step = step
+        self.url = url
+        self.histogram = Histogram()
+        self.errors = 0
+        self.cause = ''
+        self.assumptions = []
+
+    def record(self, result):
+        self.histogram.record(float(result['duration']))
+        self.assumptions = result.get('assumptions', self.assumptions)
+        if result['result'] != 'OK':
+            self.errors += 1
+            # keep only the first failure, all others are counted
+            if not self.cause:
+                self.cause = result['cause'] or 'Assumption failed.'
+
+    def latency(self, elapsed):
+        count = self.histogram.count
+        latency = {'count': count,
+                   'errors': self.errors,
+                   'error_rate': '{0:.2%}'.format(
+                       float(self.errors) / count if count else 0.0),
+                   'throughput': '{0:.2f}'.format(
+                       count / elapsed if elapsed else 0.0),
+                   'mean': '{0:.5f}'.format(self.histogram.mean()),
+                   'max': '{0:.5f}'.format(
+                       (self.histogram.max or 0) / 1000000.0)}
+        for name, percent in PERCENTILES:
+            latency[name] = '{0:.5f}'.format(
+                self.histogram.percentile(percent))
+        return latency
+
+    def as_result(self, elapsed):
+        """
+        Build a result in the same shape TestCase produces, summarizing all
+        executions of the step.
+        """
+        count = self.histogram.count
+        cause = ''
+        if self.errors:
+            cause = '{0} of {1} failed. First failure: {2}'.format(
+                self.errors, count, self.cause)
+        return {'step': self.step,
+                'url': self.url,
+                'result': 'FAILED' if self.errors else 'OK',
+                'cause': cause,
+                'duration': '{0:.5f}'.format(self.histogram.mean()),
+                'assumptions': self.assumptions,
+                'latency': self.latency(elapsed)}
+
+
+class SuiteStats(object):
+    """
+    Aggregate the results of a test suite run many times, concurrently,
+    one StepStats per step in the order the steps first ran.
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self.order = []
+        self._lock = threading.Lock()
+
+    def record(self, results):
+        with self._lock:
+            for result in results:
+                step = result['step']
+                if step not in self.steps:
+                    self.steps[step] = StepStats(step, result['url'])
+                    self.order.append(step)
+                self.steps[step].record(result)
+
+    def as_results(self, elapsed):
+        with self._lock:
+            return [self.steps[step].as_result(elapsed)
+                    for step in self.order]
@@ -0,0 +1,158 @@
+import json
+
+from jitte.core.exceptions import TestError
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_EXCERPT_SIZE = 4 * 1024
+# streamed bodies larger than this are kept in a temporary file
+SPOOL_SIZE = 1024 * 1024
+
+SCALAR_EVENTS = ('null', 'boolean', 'integer', 'double', 'number', 'string')
+
+_NOT_LOADED = object()
+# the optional ijson module, None when it isn't installed
+ijson = _NOT_LOADED
+
+
+def load_ijson():
+    global ijson
+    if ijson is _NOT_LOADED:
+        try:
+            import ijson as module
+        except ImportError:
+            module = None
+        ijson = module
+    return ijson
+
+
+class StreamLimits(object):
+    """
+    Settings of streamed steps. `enabled` streams every step which doesn't
+    choose otherwise with its "stream" key.
+    """
+
+    def __init__(self, enabled=False, excerpt_size=DEFAULT_EXCERPT_SIZE,
+                 max_body=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.enabled = enabled
+        self.excerpt_size = excerpt_size
+        self.max_body = max_body
+        self.chunk_size = chunk_size
+
+
+class TextScanner(object):
+    """
+    Evaluate a text assumption on a body arriving in chunks, keeping only
+    as much of it as the expected value is long.
+    """
+
+    def __init__(self, condition, expected):
+        self.condition = condition
+        self.expected = expected or ''
+        self.found = False
+        self.equal = True
+        self.position = 0
+        self.tail = ''
+
+    def feed(self, chunk):
+        if self.condition in ('in', 'nin') and not self.found:
+            # the expected value may span the boundary of two chunks
+            window = self.tail + chunk
+            self.found = self.expected in window
+            keep = len(self.expected) - 1
+            self.tail = window[-keep:] if keep > 0 else ''
+        elif self.condition in ('eq', 'neq') and self.equal:
+            end = self.position + len(chunk)
+            self.equal = self.expected[self.position:end] == chunk
+            self.position = end
+
+    def result(self):
+        if self.condition == 'in':
+            return self.found
+        if self.condition == 'nin':
+            return not self.found
+        equal = self.equal and self.position == len(self.expected)
+        if self.condition == 'eq':
+            return equal
+        if self.condition == 'neq':
+            return not equal
+        # the body is never None, so it is never empty
+        return self.condition != 'empty'
+
+
+def _walk(document, path):
+    try:
+        for item in path:
+            document = document[item]
+    except (KeyError, IndexError, TypeError):
+        raise TestError('JSON Key {0} not found'.format(item))
+    return document
+
+
+def find_json_paths(fileobj, paths):
+    """
+    Return a dict of the values found at the given key paths of a JSON
+    document, reading it incrementally with ijson when it's installed.
+    Paths which are not found are missing from the dict.
+    """
+    wanted = set(tuple(path) for path in paths)
+    found = {}
+    ijson = load_ijson()
+    if ijson is None:
+        try:
+            document = json.load(fileobj)
+        except Exception as exc:
+            raise TestError('JSON Parse error: {0}'.format(exc))
+        for path in wanted:
+            try:
+                found[path] = _walk(document, path)
+            except TestError:
+                pass
+        return found
+
+    # every frame is [key, is_array], the keys of all frames form the path.
+    # A builder is [ObjectBuilder, depth, path] of a container being built.
+    frames = []
+    builders = []
+    try:
+        for prefix, event, value in ijson.parse(fileobj):
+            if event == 'map_key':
+                frames[-1][0] = value
+            elif event in ('end_map', 'end_array'):
+                frames.pop()
+            elif frames and frames[-1][1]:
+                frames[-1][0] += 1
+
+            for builder in builders:
+                builder[0].event(event, value)
+                if event in ('start_map', 'start_array'):
+                    builder[1] += 1
+                elif event in ('end_map', 'end_array'):
+                    builder[1] -= 1
+                if builder[1] == 0:
+                    found[builder[2]] = builder[0].value
+            builders = [builder for builder in builders if builder[1]]
+
+            if event in SCALAR_EVENTS or event in ('start_map',
+                                                   'start_array'):
+                path = tuple(frame[0] for frame in frames)
+                if path in wanted:
+                    if event in SCALAR_EVENTS:
+                        found[path] = value
+                    else:
+                        builder = ijson.common.ObjectBuilder()
+                        builder.event(event, value)
+                        builders.append([builder, 1, path])
+
+            if event == 'start_map':
+                frames.append([None, False])
+            elif event == 'start_array':
+                frames.append([-1, True])
+
+            if len(found) == len(wanted):
+                # the rest of the document is not needed
+                break
+    except ijson.JSONError as exc:
+        raise TestError('JSON Parse error: {0}'.format(exc))
+
+    return found
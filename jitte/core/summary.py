@@ -10,25 +10,43 @@
 
 class Summary(object):
 
-    def __init__(self, logger, results):
+    def __init__(self, logger, results=()):
         self.logger = logger
-        self.results = results
-
-    def create_summary(self, title):
-        test_total = len(self.results)
-        ok = 0
-        fail = 0
+        self.results = list(results)
+        self.total = 0
+        self.ok = 0
+        self.fail = 0
+        self.skipped = 0
         for test in self.results:
-            if test['result'] == 'OK':
-                ok = ok + 1
-            elif test['result'] == 'FAILED':
-                fail = fail + 1
-            else:
-                msg = "Unknown test result: {0}".format(test['result'])
-                self.logger.error(msg)
+            self.add(test)
+
+    def add(self, test):
+        """
+        Count one more result, without keeping it.
+        """
+        self.total = self.total + 1
+        if test['result'] == 'OK':
+            self.ok = self.ok + 1
+        elif test['result'] == 'FAILED':
+            self.fail = self.fail + 1
+        elif test['result'] == 'SKIPPED':
+            self.skipped = self.skipped + 1
+        else:
+            msg = "Unknown test result: {0}".format(test['result'])
+            self.logger.error(msg)
+
+    def create_summary(self, title, tests=None):
+        """
+        Build the report from the counted results. The listed tests are the
+        results given to the constructor unless an iterable is passed.
+        """
+        test_total = self.total
+        ok = self.ok
+        fail = self.fail
 
-        pass_pct = float(ok) / test_total
-        fail_pct = float(fail) / test_total
+        # a run without any collected script has nothing to divide by
+        pass_pct = float(ok) / test_total if test_total else 0.0
+        fail_pct = float(fail) / test_total if test_total else 0.0
         summary = {
             "title": title,
             "date": 'timestamphere',
@@ -37,6 +55,7 @@ class Summary(object):
             "pass_pct": '{0:.2%}'.format(pass_pct),
             "fail": fail,
             "fail_pct": '{0:.2%}'.format(fail_pct),
-            "tests": self.results
+            "skipped": self.skipped,
+            "tests": self.results if tests is None else tests
         }
         return summary
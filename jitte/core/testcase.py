@@ -1,22 +1,50 @@
-import json
 import time
 
 import requests
-from lxml import etree
 
+from jitte.core.assumptions import AssumptionEvaluator, CHECKS
+from jitte.core.dataset import substitute
 from jitte.core.exceptions import TestError, ReplyNotAvailable
+from jitte.core.reply import (Reply, StreamedReply, parse_json, parse_xml,
+                              walk_json, evaluate_xpath)
+from jitte.core.stream import TextScanner
+from jitte.core.timing import Timings, NullTimings, connection_phases
+
+
+# an assumption value which could not be found
+MISSING = object()
 
 
 class TestCase(object):
 
-    def __init__(self, logger, method, url, assume, data, headers, p_reply):
+    def __init__(self, logger, method, url, assume, data, headers, p_reply,
+                 session=None, stream=None, row=None, timings=False,
+                 store=None, keep_reply=True):
         self.logger = logger
         self.method = method
-        self.url = url
-        self.assume = assume
+        # ${field} placeholders are replaced by the fields of a dataset row
+        self.url = substitute(url, row)
+        # the assumptions, or their evaluator compiled once per step
+        self.evaluator = AssumptionEvaluator.wrap(assume)
+        self.assume = self.evaluator.assumptions
         self.data = data
         self.headers = headers
+        if row is not None:
+            self.headers = dict((name, substitute(value, row))
+                                for name, value in headers.items())
         self.p_reply = p_reply
+        self.row = row
+        # fall back to the module level API, which opens a new connection
+        # for every request, when no shared session is supplied
+        self.session = session if session is not None else requests
+        # StreamLimits of a streamed step, None reads the reply at once
+        self.stream = stream
+        self.timings = Timings() if timings else NullTimings()
+        # ReplyStore of the values read from earlier replies with "from"
+        self.store = store
+        # whether a later step reads the reply, an unread streamed body is
+        # dropped otherwise
+        self.keep_reply = keep_reply
 
     def invoke(self):
         start = time.time()
@@ -24,7 +52,10 @@ class TestCase(object):
                   'result': 'FAILED',
                   'reply': None}
         try:
-            reply = self._make_request()
+            if self.stream is not None:
+                reply = StreamedReply(self._make_request(), self.stream)
+            else:
+                reply = Reply(self._make_request())
         except TestError as te:
             result['cause'] = str(te)
         else:
@@ -33,34 +64,75 @@ class TestCase(object):
                 cause = 'Got status_code: {0}'.format(reply.status_code)
                 result['cause'] = cause
             else:
-                process_result = self._process_reply(reply)
+                if self.stream is not None:
+                    process_result = self._process_stream(reply)
+                else:
+                    process_result = self._process_reply(reply)
                 if process_result:
                     result.update(process_result)
                 else:
                     result['result'] = 'OK'
+            if self.stream is not None:
+                self._finish_stream(reply)
+                self.timings.record('body', reply.read_time)
+            self.timings.record('parse', reply.parse_time)
 
         result['duration'] = '{0:.5f}'.format(time.time() - start)
+        if self.timings.enabled:
+            result['timings'] = self.timings.as_dict()
         return result
 
+    def _finish_stream(self, reply):
+        # a streamed body left unread holds its connection: it's read now
+        # when a later step needs the reply, dropped otherwise
+        if not self.keep_reply:
+            reply.close()
+            return
+        try:
+            reply.consume()
+        except TestError:
+            # kept in the reply, raised to the step reading it
+            pass
+
     def _make_request(self):
         self.logger.info('Requesting => {0}'.format(self.url))
         try:
-            send_data = self._process_data(self.data)
-        except ReplyNotAvailable:
-            msg = 'Request failed, previous reply not available.'
+            with self.timings.measure('prepare'):
+                send_data = self._process_data(self.data)
+        except ReplyNotAvailable as exc:
+            msg = 'Request failed, {0} not available.'.format(
+                str(exc) or 'previous reply')
             raise TestError(msg)
 
+        # with timings the body is read separately from the headers, so the
+        # time to the first byte and the body transfer can be told apart
+        stream = self.stream is not None or self.timings.enabled
+        connection_phases.reset()
+        start = time.time()
         try:
             key = 'params' if isinstance(send_data, dict) else 'data'
             kwargs = {key: send_data}
-            reply = requests.request(self.method,
-                                     self.url,
-                                     headers=self.headers,
-                                     **kwargs)
+            reply = self.session.request(self.method,
+                                         self.url,
+                                         headers=self.headers,
+                                         stream=stream,
+                                         **kwargs)
+            elapsed = time.time() - start
+            if self.stream is None and self.timings.enabled:
+                with self.timings.measure('body'):
+                    reply.content
         except requests.exceptions.RequestException as exc:
             msg = 'Request failed: {0}'.format(exc)
             raise TestError(msg)
 
+        # new connections of the pool report their setup time, a reused
+        # connection has none
+        for phase in ('connect', 'tls'):
+            if phase in connection_phases.phases:
+                seconds = connection_phases.phases[phase]
+                self.timings.record(phase, seconds)
+                elapsed -= seconds
+        self.timings.record('ttfb', max(elapsed, 0.0))
         return reply
 
     def _process_data(self, raw_data):
@@ -75,87 +147,186 @@ class TestCase(object):
             param_value = param['param_value']
 
             name = self._parse_value(param_name['type'],
-                                     param_name['value'])
+                                     param_name['value'],
+                                     param_name.get('from'))
             value = self._parse_value(param_value['type'],
-                                      param_value['value'])
+                                      param_value['value'],
+                                      param_value.get('from'))
             params[name] = value
 
         return params
 
+    def _walk_json(self, document, value):
+        return walk_json(document, value)
+
     def _find_in_json(self, source, value):
-        try:
-            prev_json = json.loads(source)
-        except Exception as exc:
-            raise TestError('JSON Parse error: {0}'.format(exc))
-        try:
-            for item in value:
-                prev_json = prev_json[item]
-        except KeyError:
-            raise TestError('JSON Key {0} not found'.format(item))
+        return self._walk_json(parse_json(source), value)
 
-        return prev_json
+    def _evaluate_xpath(self, document, xpath):
+        return evaluate_xpath(document, xpath)
 
     def _find_by_xpath(self, source, xpath):
-        try:
-            prev_xml = etree.fromstring(source)
-        except Exception as exc:
-            raise TestError('XML Parse error: {0}'.format(exc))
-
-        try:
-            (result,) = prev_xml.xpath(xpath)
-            return result
-        except Exception as exc:
-            msg = 'XPath {0} evaluation error: {1}'.format(xpath, exc)
-            raise TestError(msg)
+        return self._evaluate_xpath(parse_xml(source), xpath)
 
-    def _parse_value(self, p_type, value):
+    def _parse_value(self, p_type, value, source=None):
+        if source is not None:
+            # a value of an earlier step's reply, kept by the store
+            if self.store is None:
+                raise ReplyNotAvailable('reply of step {0}'.format(source))
+            return self.store.get(source, p_type, value)
         if p_type in ('json', 'xpath') and self.p_reply is None:
             raise ReplyNotAvailable()
 
-        if p_type == 'json':
-            return self._find_in_json(self.p_reply.text, value)
+        if p_type == 'row':
+            try:
+                return self.row[value]
+            except (KeyError, TypeError):
+                raise TestError('Dataset field {0} not found'.format(value))
+        elif p_type == 'json':
+            p_reply = Reply.wrap(self.p_reply)
+            return self._walk_json(p_reply.json(), value)
         elif p_type == 'xpath':
-            return self._find_by_xpath(self.p_reply.text, value)
+            p_reply = Reply.wrap(self.p_reply)
+            return self._evaluate_xpath(p_reply.xml(), value)
         else:
             return value
 
     def _process_reply(self, reply):
-        for assumption in self.assume:
-            assumption_type = assumption['type']
-            cond = assumption['pass_if']
-            expected = assumption['expected']
-            assumption_got = assumption['got']
-
-            if not self._check(assumption_type,
-                               cond,
-                               expected,
-                               assumption_got,
-                               reply):
-                return {'assumption': assumption,
-                        'condition': cond,
-                        'got': reply.text}
-
-    def _check(self, assumption_type, cond, expected, assumption_got, got):
-        try:
-            if assumption_type == 'json':
-                got = self._find_in_json(got.text, assumption_got)
-            elif assumption_type == 'xpath':
-                got = self._find_by_xpath(got.text, assumption_got)
-            elif assumption_type == 'status_code':
-                got = str(got.status_code)
+        """
+        Evaluate every assumption of the reply. The JSON values of all the
+        assumptions are found in one walk of the parsed document.
+        """
+        evaluator = self.evaluator
+        timed = self.timings.enabled
+        json_values = None
+        failures = []
+        for assumption, check, path in zip(evaluator.assumptions,
+                                           evaluator.checks,
+                                           evaluator.json):
+            if timed:
+                start = time.time()
+                parse_time = reply.parse_time
+            if path is not None:
+                if json_values is None:
+                    json_values = self._find_json(reply)
+                got = json_values.get(path, MISSING)
             else:
-                got = got.text
+                got = self._got(assumption, reply)
+            passed = got is not MISSING and check(got, assumption['expected'])
+            if timed:
+                # parsing the body is reported on its own
+                self.timings.record_assumption(
+                    time.time() - start - (reply.parse_time - parse_time))
+            if not passed:
+                failures.append((assumption, got))
+
+        if failures:
+            return self._failed(failures, reply.text)
+
+    def _find_json(self, reply):
+        try:
+            return self.evaluator.find_json(reply.json())
         except TestError:
+            return {}
+
+    def _process_stream(self, reply):
+        """
+        Evaluate the assumptions of a streamed reply. The body is read once,
+        text assumptions are checked chunk by chunk and JSON values are
+        collected in a single incremental pass over the stored body.
+        """
+        evaluator = self.evaluator
+        scanners = {}
+        for index, assumption in enumerate(evaluator.assumptions):
+            if assumption['type'] in ('text', 'file'):
+                scanners[index] = TextScanner(assumption['pass_if'],
+                                              assumption['expected'])
+
+        # status code assumptions alone never read the body, it's read later
+        # only if the next step takes its data from this reply
+        try:
+            if scanners:
+                reply.consume(scanners.values())
+            json_values = (reply.find_json(evaluator.json_paths)
+                           if evaluator.json_paths else {})
+        except TestError as te:
+            return {'cause': str(te), 'got': reply.excerpt}
+
+        failures = []
+        for index, assumption in enumerate(evaluator.assumptions):
+            start = time.time()
+            parse_time = reply.parse_time
+            if index in scanners:
+                got = MISSING
+                passed = scanners[index].result()
+            else:
+                if evaluator.json[index] is not None:
+                    got = json_values.get(evaluator.json[index], MISSING)
+                else:
+                    got = self._got(assumption, reply)
+                passed = (got is not MISSING and
+                          evaluator.checks[index](got,
+                                                  assumption['expected']))
+            self.timings.record_assumption(time.time() - start -
+                                           (reply.parse_time - parse_time))
+            if not passed:
+                failures.append((assumption, got))
+
+        if failures:
+            return self._failed(failures, reply.excerpt)
+
+    def _failed(self, failures, got):
+        """
+        The result of a step whose assumptions in `failures`, (assumption,
+        value found) pairs, did not pass. The first one is reported as the
+        failed assumption, every one of them under 'failures'.
+        """
+        assumption = failures[0][0]
+        failed = []
+        for failed_assumption, value in failures:
+            failure = {'assumption': failed_assumption}
+            # text assumptions got the whole body, reported once as 'got'
+            if value is not MISSING and failed_assumption['type'] not in (
+                    'text', 'file'):
+                failure['got'] = value
+            failed.append(failure)
+        return {'assumption': assumption,
+                'condition': assumption['pass_if'],
+                'got': got,
+                'failures': failed}
+
+    def _got(self, assumption, reply):
+        """
+        The value an assumption is checked against, MISSING when it can't
+        be found.
+        """
+        try:
+            return self._find(assumption['type'], assumption['got'], reply,
+                              assumption.get('from'))
+        except (TestError, ReplyNotAvailable):
+            return MISSING
+
+    def _find(self, assumption_type, assumption_got, reply, source=None):
+        # the parsed body is cached on the reply and shared by all checks
+        reply = Reply.wrap(reply)
+        if source is not None:
+            return self._parse_value(assumption_type, assumption_got, source)
+        elif assumption_type == 'json':
+            return self._walk_json(reply.json(), assumption_got)
+        elif assumption_type == 'xpath':
+            return self._evaluate_xpath(reply.xml(), assumption_got)
+        elif assumption_type == 'status_code':
+            return str(reply.status_code)
+        return reply.text
+
+    def _check(self, assumption_type, cond, expected, assumption_got, got,
+               source=None):
+        try:
+            got = self._find(assumption_type, assumption_got, got, source)
+        except (TestError, ReplyNotAvailable):
             return False
         else:
             return self._validate(got, expected, cond)
 
     def _validate(self, got, expected, condition):
-        checks = {'eq': lambda x, y: x == y,
-                  'neq': lambda x, y: x != y,
-                  'in': lambda x, y: y in x,
-                  'nin': lambda x, y: y not in x,
-                  'empty': lambda x, y: x is None,
-                  'nempty': lambda x, y: x is not None,
-                  'ninja': lambda x, y: True}
-        return checks[condition](got, expected)
+        return CHECKS[condition](got, expected)
@@ -1,18 +1,44 @@
 import json
 
 from jitte.core.testcase import TestCase
+from jitte.core.plan import Step, Plan
+from jitte.core.session import ConnectionPool
+from jitte.core.stream import StreamLimits
+from jitte.core.sink import ResultList
+from jitte.core.scheduler import StepGraph, GraphScheduler
+from jitte.core.policy import RunPolicy, ScriptProgress
+from jitte.core.replystore import ReplyStore, step_references
+from jitte.core.xpath import compile_xpath, load_etree
 from jitte.core.exceptions import InvalidConfiguration
 
 
 VALID_ASSUMPTION_TYPES = ('text', 'file', 'status_code', 'json', 'xpath')
 VALID_CONDITIONS = ('eq', 'neq', 'in', 'nin', 'ninja', 'empty', 'nempty')
-VALID_PARAM_TYPES = ('static', 'file', 'xpath', 'json')
+VALID_PARAM_TYPES = ('static', 'file', 'xpath', 'json', 'row')
+# types of the values which can be read from an earlier step's reply
+REPLY_VALUE_TYPES = ('json', 'xpath')
+ENTRY_STEP = "1"
+# assumptions are checked cheapest first, the status code never needs the
+# body, text needs it decoded and json/xpath need it parsed as well
+ASSUMPTION_COST = {'status_code': 0, 'text': 1, 'file': 1, 'json': 2,
+                   'xpath': 2}
 
 
 class TestSuite(object):
 
-    def __init__(self, logger, testfile):
+    def __init__(self, logger, testfile, pool=None, stream=None,
+                 timings=False, policy=None):
         self.logger = logger
+        self.testfile = testfile
+        self.pool = pool
+        self.stream = stream or StreamLimits()
+        # report the time spent in each phase of every step
+        self.timings = timings
+        # a RunPolicy shared with the other suites of the run decides when
+        # the remaining steps are skipped
+        self.policy = policy or RunPolicy()
+        # payload files read by the steps, besides the script itself
+        self.files = []
         try:
             with open(testfile, 'r') as file_obj:
                 s = file_obj.read()
@@ -26,6 +52,42 @@ class TestSuite(object):
             self.logger.error(msg)
             exit()
 
+        self._compile_xpaths()
+        self.plan = self.compile()
+
+    def _xpath_expressions(self, request_data):
+        def is_xpath(item):
+            return (isinstance(item, dict) and
+                    unicode(item.get('type', '')).lower() == 'xpath')
+
+        for assumption in request_data.get('assume', list()):
+            if is_xpath(assumption):
+                yield assumption.get('got')
+
+        for pkg in request_data.get('send_data', list()):
+            if not isinstance(pkg, dict):
+                continue
+            for param in (pkg.get('param_name'), pkg.get('param_value')):
+                if is_xpath(param):
+                    yield param.get('value')
+
+    def _compile_xpaths(self):
+        """
+        Compile every XPath expression of the script up front, so syntax
+        errors are reported before the first request is sent.
+        """
+        for step_id, request_data in self.tests.items():
+            for expression in self._xpath_expressions(request_data):
+                if not isinstance(expression, basestring):
+                    # reported by the assumption and send_data validation
+                    continue
+                try:
+                    compile_xpath(expression)
+                except load_etree().XPathSyntaxError as exc:
+                    msg = 'Invalid XPath {0} in step {1}: {2}'.format(
+                        expression, step_id, exc)
+                    raise InvalidConfiguration(msg)
+
     def _clean_method(self, step_id, method):
         cleaned_method = method.lower()
         if cleaned_method not in ("get", "head", "post", "put", "delete"):
@@ -43,6 +105,7 @@ class TestSuite(object):
         return url
 
     def _read_file(self, filepath):
+        self.files.append(filepath)
         try:
             with open(filepath, 'r') as file_obj:
                 return file_obj.read()
@@ -90,14 +153,19 @@ class TestSuite(object):
                 raise InvalidConfiguration(msg)
 
             if assumption_type == 'file':
-                expected = self.__read_file(expected)
+                expected = self._read_file(expected)
 
             valid_assumption = {'type': assumption_type,
                                 'pass_if': pass_if,
                                 'expected': expected,
                                 'got': assumption_got}
+            source = self._clean_source(step_id, assumption, assumption_type)
+            if source is not None:
+                valid_assumption['from'] = source
             cleaned_assumptions.append(valid_assumption)
 
+        cleaned_assumptions.sort(
+            key=lambda assumption: ASSUMPTION_COST[assumption['type']])
         return cleaned_assumptions
 
     def _clean_data(self, step_id, data):
@@ -126,7 +194,7 @@ class TestSuite(object):
                     # read the file ahead and return the data it contains
                     assert isinstance(param['value'], basestring)
                     return self._read_file(param['value'])
-                if param_type in ('static', 'xpath'):
+                if param_type in ('static', 'xpath', 'row'):
                     assert isinstance(param['value'], basestring)
                 elif param_type == 'json':
                     # json param must be a list of strings
@@ -151,6 +219,10 @@ class TestSuite(object):
             value = check_value(param_value, param_value_type)
             clean_pkg = {'param_value': {'type': param_value_type,
                                          'value': value}}
+            source = self._clean_source(step_id, param_value,
+                                        param_value_type)
+            if source is not None:
+                clean_pkg['param_value']['from'] = source
 
             if param_value_type == 'file':
                 # in case of files param_name is not needed and only
@@ -164,11 +236,28 @@ class TestSuite(object):
 
             clean_pkg['param_name'] = {'type': param_name_type,
                                        'value': value}
+            source = self._clean_source(step_id, param_name, param_name_type)
+            if source is not None:
+                clean_pkg['param_name']['from'] = source
 
             cleaned_data.append(clean_pkg)
 
         return cleaned_data
 
+    def _clean_source(self, step_id, item, item_type):
+        """
+        The step named by "from", whose reply a json or xpath value is read
+        from instead of the previous reply.
+        """
+        source = item.get('from')
+        if source is None:
+            return None
+        if (not isinstance(source, basestring) or
+                item_type not in REPLY_VALUE_TYPES):
+            msg = 'Invalid from in step {0}'.format(step_id)
+            raise InvalidConfiguration(msg)
+        return source
+
     def _clean_headers(self, step_id, headers):
         if isinstance(headers, dict):
             for hdr_name, hdr_value in headers.items():
@@ -197,37 +286,219 @@ class TestSuite(object):
                  "data": data,
                  "headers": headers}
 
-    def run(self):
-        p_reply = None
-        next_step = "1"
-        executed_steps = []
-        results = []
+    def _clean_steps(self, step_id, key, steps):
+        """
+        Normalize "next" and "depends_on", a step id or a list of them.
+        """
+        if steps is None:
+            return ()
+        if isinstance(steps, basestring):
+            return (steps,)
+        if (isinstance(steps, list) and
+                all(isinstance(item, basestring) for item in steps)):
+            return tuple(steps)
+
+        msg = 'Invalid {0} in step {1}'.format(key, step_id)
+        raise InvalidConfiguration(msg)
 
-        while next_step is not None:
-            executed_steps.append(next_step)
-            try:
-                request_data = self.tests[next_step]
-            except KeyError:
-                self.logger.error('Step {0} not found.'.format(next_step))
-                break
+    def _clean_flag(self, step_id, key, value):
+        """
+        Check an optional true/false key like "stream" or "cache".
+        """
+        if value is None or isinstance(value, bool):
+            return value
 
-            cleaned = self._clean(next_step,
+        msg = 'Invalid {0} in step {1}'.format(key, step_id)
+        raise InvalidConfiguration(msg)
+
+    def compile(self):
+        """
+        Validate every step reachable from the first one and build the
+        execution plan, which can then be run any number of times without
+        validating the steps or reading their files again.
+        """
+        steps = {}
+        pending = [ENTRY_STEP]
+        while pending:
+            step_id = pending.pop()
+            if step_id in steps:
+                continue
+            request_data = self.tests.get(step_id)
+            if not isinstance(request_data, dict):
+                raise InvalidConfiguration('Step {0} not found.'.format(
+                    step_id))
+
+            cleaned = self._clean(step_id,
                                   request_data.get('method', ''),
                                   request_data.get('url', None),
                                   request_data.get('assume', list()),
                                   request_data.get('send_data', list()),
                                   request_data.get('headers', dict()))
-            cleaned['p_reply'] = p_reply
-            t = TestCase(self.logger, **cleaned)
-            result = t.invoke()
-            result['step'] = next_step
-            result['url'] = request_data.get('url', None)
-            result['assumptions'] = cleaned['assume']
-            p_reply = result.pop('reply')
-            results.append(result)
-
-            next_step = request_data.get('next', None)
+            next_steps = self._clean_steps(step_id,
+                                           'next',
+                                           request_data.get('next'))
+            depends_on = self._clean_steps(step_id,
+                                           'depends_on',
+                                           request_data.get('depends_on'))
+            stream = self._clean_flag(step_id,
+                                      'stream',
+                                      request_data.get('stream'))
+            cache = self._clean_flag(step_id,
+                                     'cache',
+                                     request_data.get('cache'))
+            steps[step_id] = Step(step_id,
+                                  next=next_steps,
+                                  depends_on=depends_on,
+                                  stream=stream,
+                                  cache=cache is not False,
+                                  **cleaned)
+            pending.extend(reversed(next_steps))
+
+        for step in steps.values():
+            for dep in step.depends_on:
+                if dep not in steps:
+                    msg = ('Step {0} depends on unreachable '
+                           'step {1}.'.format(step.step_id, dep))
+                    raise InvalidConfiguration(msg)
+
+        plan = Plan(steps, ENTRY_STEP)
+        # a reply is read once its step ran, so only from a step which
+        # always runs before the one reading it
+        ancestors = plan.ancestors()
+        for step in steps.values():
+            for source, key in step_references(step):
+                if source not in steps:
+                    msg = ('Step {0} reads the reply of unreachable '
+                           'step {1}.'.format(step.step_id, source))
+                    raise InvalidConfiguration(msg)
+                if source not in ancestors[step.step_id]:
+                    msg = ('Step {0} reads the reply of step {1}, which '
+                           'does not run before it.'.format(step.step_id,
+                                                           source))
+                    raise InvalidConfiguration(msg)
+
+        return plan
+
+    def run(self, concurrency=None, sink=None, row=None, replies=None):
+        """
+        Execute the steps one after another following their "next" keys, or
+        with the graph engine when a step concurrency is requested or the
+        script has branches. Every result is added to the sink as soon as
+        its step finished, the sink (a list by default) is returned. The
+        fields of a dataset row are available to the steps.
+
+        Steps run one after another store their (result, reply) in the
+        `replies` dict when one is given, and steps already in it are not
+        sent again, their stored result and reply are used instead.
+        """
+        sink = sink if sink is not None else ResultList()
+        # an externally supplied pool is shared with other suites and is
+        # closed by its owner, a pool created here lives only for this run
+        pool = self.pool or ConnectionPool(self.logger)
+        progress = ScriptProgress()
+        # only the values later steps read with "from" outlive a reply
+        store = ReplyStore.for_plan(self.plan)
+        try:
+            if concurrency is not None or self.plan.is_graph():
+                self._run_graph(pool, concurrency or 1, sink, row, progress,
+                                store)
+            else:
+                self._run_steps(pool, sink, row, progress, store, replies)
+        finally:
+            if self.pool is None:
+                pool.close()
+
+        return sink
+
+    def _skipped(self, step_id, cause):
+        step = self.plan.steps[step_id]
+        return {'step': step_id,
+                'url': step.url,
+                'script': self.testfile,
+                'assumptions': list(step.assume),
+                'result': 'SKIPPED',
+                'cause': 'Skipped. {0}'.format(cause),
+                'duration': '0.00000'}
+
+    def _execute(self, step_id, p_reply, pool, row, progress, store,
+                 parents=(), keep_reply=False):
+        """
+        Run a step and record its result, or skip it when the policy says
+        so. `parents` are the steps it follows or depends on. The reply is
+        kept readable when `keep_reply` or a later step reads it.
+        """
+        cause = self.policy.skip_cause(progress, parents)
+        if cause is not None:
+            result = self._skipped(step_id, cause)
+            self.policy.record(progress, step_id, result)
+            store.finished(step_id)
+            return result, None
+
+        step = self.plan.steps[step_id]
+        # steps opting out of the HTTP cache always reach the service
+        session = pool.session if step.cache else pool.origin_session
+        stream = self.stream.enabled if step.stream is None else step.stream
+        t = TestCase(self.logger,
+                     step.method,
+                     step.url,
+                     step.evaluator,
+                     step.data,
+                     step.headers,
+                     p_reply,
+                     session,
+                     self.stream if stream else None,
+                     row,
+                     self.timings,
+                     store,
+                     keep_reply or store.reply_read(step_id))
+        result = t.invoke()
+        result['step'] = step_id
+        result['url'] = step.url
+        result['script'] = self.testfile
+        result['assumptions'] = list(step.assume)
+        reply = result.pop('reply')
+        store.keep(step_id, reply)
+        store.finished(step_id)
+        self.policy.record(progress, step_id, result)
+        return result, reply
+
+    def _run_graph(self, pool, concurrency, sink, row, progress, store):
+        graph = StepGraph(self.logger, self.plan)
+        scheduler = GraphScheduler(self.logger, graph, concurrency)
+
+        def execute(step_id, p_reply):
+            result, reply = self._execute(step_id, p_reply, pool, row,
+                                          progress, store,
+                                          graph.dependencies[step_id])
+            sink.add(result)
+            return reply
+
+        scheduler.run(execute)
+
+    def _run_steps(self, pool, sink, row, progress, store, replies=None):
+        p_reply = None
+        next_step = self.plan.entry
+        executed_steps = []
+
+        while next_step is not None:
+            parents = executed_steps[-1:]
+            executed_steps.append(next_step)
+            if replies is not None and next_step in replies:
+                result, p_reply = replies[next_step]
+                result = dict(result, reused=True)
+                store.keep(next_step, p_reply)
+                store.finished(next_step)
+                self.policy.record(progress, next_step, result)
+            else:
+                # replies kept for a later run may be read by changed steps
+                result, p_reply = self._execute(next_step, p_reply, pool,
+                                                row, progress, store, parents,
+                                                replies is not None)
+                if replies is not None:
+                    replies[next_step] = (result, p_reply)
+            sink.add(result)
+
+            next_steps = self.plan.steps[next_step].next
+            next_step = next_steps[0] if next_steps else None
             if next_step in executed_steps:
                 self.logger.warning('WARNING! possible infinite loop.')
-
-        return results
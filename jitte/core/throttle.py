@@ -0,0 +1,295 @@
+import threading
+import time
+
+from urlparse import urlparse
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import RequestException
+
+from jitte.core.defaults import DEFAULT_CIRCUIT_RESET
+
+
+# replies telling the host is overloaded, the concurrency limit backs off
+OVERLOAD_STATUS_CODES = (429, 503)
+# replies counted as failures by the circuit breaker, like connection errors
+FAILURE_STATUS_CODES = (502, 503, 504)
+# a reply slower than this many times the moving average means overload
+LATENCY_TOLERANCE = 2.0
+# weight of the latest reply in the moving average of the latency
+LATENCY_WEIGHT = 0.2
+
+
+class CircuitOpen(RequestException):
+    pass
+
+
+class TokenBucket(object):
+    """
+    At most `rate` requests per second, `burst` of them at once after an
+    idle period. Requests over the rate wait their turn in order.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.time, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = max(1.0, burst or self.rate)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token, return the seconds to wait until it's available.
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
+
+class ConcurrencyLimit(object):
+    """
+    At most `limit` requests in flight. An adaptive limit starts at
+    `maximum`, is halved when a reply says the host is overloaded (429,
+    503 or a latency over LATENCY_TOLERANCE times its moving average) and
+    grows back by one for every `limit` good replies. Replies to requests
+    sent before the last decrease don't decrease it again.
+    """
+
+    def __init__(self, maximum, adaptive=True, minimum=1,
+                 tolerance=LATENCY_TOLERANCE):
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self.adaptive = adaptive
+        self.tolerance = tolerance
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self.average = None
+        self.decreases = 0
+        self._sent = 0
+        self._decreased_at = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Wait for a free slot. Returns the ticket to release it with.
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            self._sent += 1
+            return self._sent
+
+    def _overloaded(self, latency, status):
+        if status in OVERLOAD_STATUS_CODES:
+            return True
+        return (self.average is not None and
+                latency > self.average * self.tolerance)
+
+    def release(self, ticket, latency=None, status=None):
+        """
+        Free the slot of a request, with the latency and status of its
+        reply, both None when it got none.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if self.adaptive and latency is not None:
+                if self._overloaded(latency, status):
+                    if ticket > self._decreased_at:
+                        self.limit = max(float(self.minimum), self.limit / 2)
+                        self._decreased_at = self._sent
+                        self.decreases += 1
+                else:
+                    self.limit = min(self.maximum,
+                                     self.limit + 1.0 / self.limit)
+                if self.average is None:
+                    self.average = latency
+                else:
+                    self.average += LATENCY_WEIGHT * (latency - self.average)
+            self._condition.notify_all()
+
+
+class CircuitBreaker(object):
+    """
+    Stop sending requests to a host after `failures` failed ones in a row
+    (connection errors and 502/503/504). After `reset_timeout` seconds a
+    single trial request is let through, closing the circuit again if it
+    succeeds.
+    """
+
+    def __init__(self, failures, reset_timeout=DEFAULT_CIRCUIT_RESET,
+                 clock=time.time):
+        self.threshold = max(1, failures)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def check(self, host, trial=True):
+        """
+        Raise CircuitOpen when no request may be sent to the host. Once
+        the reset timeout passed, the request checking with `trial` is the
+        trial one, a check without it only tells a trial is possible.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_timeout - self.clock()
+            if remaining > 0 or self._trial:
+                msg = ('Circuit open for {0} after {1} failed requests in a '
+                       'row, retrying in {2:.1f}s'.format(
+                           host, self.failures, max(0.0, remaining)))
+                raise CircuitOpen(msg)
+            self._trial = trial
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened_at is None and
+                               self.failures >= self.threshold):
+                if self.opened_at is None:
+                    self.trips += 1
+                self.opened_at = self.clock()
+                self._trial = False
+
+
+class HostLimits(object):
+    """
+    The rate, concurrency and circuit breaker of one host, each one None
+    when not limited.
+    """
+
+    def __init__(self, host, bucket=None, limit=None, breaker=None):
+        self.host = host
+        self.bucket = bucket
+        self.limit = limit
+        self.breaker = breaker
+
+    def acquire(self):
+        if self.breaker is not None:
+            self.breaker.check(self.host, trial=False)
+        ticket = self.limit.acquire() if self.limit is not None else None
+        try:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            # the circuit may have opened while the request waited its turn
+            if self.breaker is not None:
+                self.breaker.check(self.host)
+        except CircuitOpen:
+            if self.limit is not None:
+                self.limit.release(ticket)
+            raise
+        return ticket
+
+    def release(self, ticket, latency=None, status=None):
+        # the circuit is updated before a queued request gets the slot
+        if self.breaker is not None:
+            if status is None or status in FAILURE_STATUS_CODES:
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+        if self.limit is not None:
+            self.limit.release(ticket, latency, status)
+
+
+class Throttle(object):
+    """
+    Limits of the requests sent to every host: `rate` requests per second
+    with bursts of `burst`, at most `concurrency` of them in flight, a
+    limit backing off on overload when `adaptive`, and a circuit breaker
+    tripping after `breaker_failures` failed requests in a row.
+    """
+
+    def __init__(self, logger, rate=None, burst=None, concurrency=None,
+                 adaptive=False, breaker_failures=None,
+                 breaker_reset=DEFAULT_CIRCUIT_RESET):
+        self.logger = logger
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+    def adapter(self, adapter):
+        return ThrottlingAdapter(adapter, self)
+
+    def host(self, host):
+        with self._lock:
+            if host not in self.hosts:
+                self.hosts[host] = self._create(host)
+            return self.hosts[host]
+
+    def _create(self, host):
+        bucket = limit = breaker = None
+        if self.rate:
+            bucket = TokenBucket(self.rate, self.burst)
+        if self.concurrency:
+            limit = ConcurrencyLimit(self.concurrency, self.adaptive)
+        if self.breaker_failures:
+            breaker = CircuitBreaker(self.breaker_failures,
+                                     self.breaker_reset)
+        return HostLimits(host, bucket, limit, breaker)
+
+    def close(self):
+        for host in sorted(self.hosts):
+            limits = self.hosts[host]
+            if limits.limit is not None and limits.limit.decreases:
+                self.logger.info('{0}: concurrency backed off {1} times, '
+                                 'limit {2}'.format(host,
+                                                    limits.limit.decreases,
+                                                    int(limits.limit.limit)))
+            if limits.breaker is not None and limits.breaker.trips:
+                self.logger.warning('{0}: circuit opened {1} times'.format(
+                    host, limits.breaker.trips))
+
+
+class ThrottlingAdapter(BaseAdapter):
+    """
+    Send a request once its host's limits allow it, fail it at once when
+    the host's circuit is open.
+    """
+
+    def __init__(self, adapter, throttle):
+        super(ThrottlingAdapter, self).__init__()
+        self.adapter = adapter
+        self.throttle = throttle
+
+    def send(self, request, **kwargs):
+        limits = self.throttle.host(urlparse(request.url).netloc)
+        ticket = limits.acquire()
+        start = time.time()
+        try:
+            response = self.adapter.send(request, **kwargs)
+        except Exception:
+            limits.release(ticket)
+            raise
+        limits.release(ticket, time.time() - start, response.status_code)
+        return response
+
+    def close(self):
+        self.adapter.close()
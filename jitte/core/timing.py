@@ -0,0 +1,89 @@
+import threading
+import time
+
+from contextlib import contextmanager
+
+
+# phases of a step in the order they happen
+PHASES = ('prepare', 'connect', 'tls', 'ttfb', 'body', 'parse')
+
+
+def format_seconds(seconds):
+    return '{0:.5f}'.format(seconds)
+
+
+class Timings(object):
+    """
+    Time spent in each phase of a step, and by each evaluated assumption.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.phases = {}
+        self.assumptions = []
+
+    def record(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, phase):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(phase, time.time() - start)
+
+    def record_assumption(self, seconds):
+        self.assumptions.append(seconds)
+
+    def as_dict(self):
+        timings = dict((phase, format_seconds(self.phases[phase]))
+                       for phase in PHASES if phase in self.phases)
+        timings['assumptions'] = [format_seconds(seconds)
+                                  for seconds in self.assumptions]
+        return timings
+
+
+class _NullContext(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class NullTimings(object):
+    """
+    Stand-in used when timings are disabled, recording nothing.
+    """
+    enabled = False
+    _context = _NullContext()
+
+    def record(self, phase, seconds):
+        pass
+
+    def measure(self, phase):
+        return self._context
+
+    def record_assumption(self, seconds):
+        pass
+
+
+class ConnectionPhases(threading.local):
+    """
+    Connection setup time of the request sent by the current thread, filled
+    in by the connections of the shared pool when a new one is opened.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+
+    def record(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+connection_phases = ConnectionPhases()
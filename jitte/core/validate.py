@@ -0,0 +1,229 @@
+import json
+
+from jitte.core.testsuite import TestSuite, ENTRY_STEP, REPLY_VALUE_TYPES
+from jitte.core.plan import walk, direct_parents, ancestors
+from jitte.core.xpath import compile_xpath, load_etree
+from jitte.core.exceptions import InvalidConfiguration
+
+
+def step_order(step_id):
+    # numbered steps in numeric order, any other name after them
+    try:
+        return (0, int(step_id), step_id)
+    except ValueError:
+        return (1, 0, step_id)
+
+
+class ScriptValidator(TestSuite):
+    """
+    Check a test script without sending any request. Unlike loading a
+    TestSuite, which stops at the first invalid step it reaches, every step
+    of the script is checked, reachable or not, and all the errors found
+    are returned at once: invalid steps, XPath syntax errors, missing
+    files, "next" and "depends_on" pointing to missing steps, unreachable
+    steps, loops, and send_data reading a reply or a dataset field which
+    can't be there. `dataset_fields` are the fields of the rows the script
+    will run with, None when it runs without a dataset.
+    """
+
+    def __init__(self, logger, testfile, dataset_fields=None):
+        self.logger = logger
+        self.testfile = testfile
+        self.dataset_fields = dataset_fields
+        self.files = []
+        self.tests = {}
+        self.errors = []
+
+    def _check(self, clean, *args):
+        """
+        Call a cleaning method, recording its error instead of raising it.
+        """
+        try:
+            return clean(*args)
+        except InvalidConfiguration as exc:
+            self.errors.append(str(exc))
+        except (AttributeError, TypeError):
+            # a list or an object where the other is expected
+            self.errors.append('Invalid step {0}.'.format(args[0]))
+        return None
+
+    def _load(self):
+        try:
+            with open(self.testfile, 'r') as file_obj:
+                tests = json.load(file_obj)
+        except ValueError as exc:
+            self.errors.append('Invalid test configuration file {0}: '
+                               '{1}'.format(self.testfile, exc))
+            return False
+        except IOError:
+            self.errors.append('Test configuration file {0} not '
+                               'found'.format(self.testfile))
+            return False
+
+        if not isinstance(tests, dict):
+            self.errors.append('Invalid test configuration file {0}: the '
+                               'steps must be a JSON object'.format(
+                                   self.testfile))
+            return False
+        self.tests = tests
+        return True
+
+    def _check_step(self, step_id, request_data):
+        self._check(self._clean_method, step_id,
+                    unicode(request_data.get('method', '')))
+        self._check(self._clean_url, step_id, request_data.get('url', None))
+        assumptions = self._check(self._clean_assumptions, step_id,
+                                  request_data.get('assume', list()))
+        data = self._check(self._clean_data, step_id,
+                           request_data.get('send_data', list()))
+        self._check(self._clean_headers, step_id,
+                    request_data.get('headers', dict()))
+        self._check(self._clean_flag, step_id, 'stream',
+                    request_data.get('stream'))
+        self._check(self._clean_flag, step_id, 'cache',
+                    request_data.get('cache'))
+        next_steps = self._check(self._clean_steps, step_id, 'next',
+                                 request_data.get('next'))
+        depends_on = self._check(self._clean_steps, step_id, 'depends_on',
+                                 request_data.get('depends_on'))
+        return {'assume': assumptions or [],
+                'data': data or [],
+                'next': next_steps or (),
+                'depends_on': depends_on or ()}
+
+    def _check_xpaths(self, step_id, request_data):
+        for expression in self._xpath_expressions(request_data):
+            if not isinstance(expression, basestring):
+                continue
+            try:
+                compile_xpath(expression)
+            except load_etree().XPathSyntaxError as exc:
+                self.errors.append('Invalid XPath {0} in step {1}: {2}'.format(
+                    expression, step_id, exc))
+
+    def _check_targets(self, steps):
+        for step_id in sorted(steps, key=step_order):
+            for key in ('next', 'depends_on'):
+                for target in steps[step_id][key]:
+                    if target not in self.tests:
+                        self.errors.append('Step {0} has {1} step {2}, which '
+                                           'is not found.'.format(step_id, key,
+                                                                  target))
+
+    def _check_dependencies(self, steps, dependencies):
+        """
+        A step depending on itself, directly or through other steps, would
+        never run.
+        """
+        done = set()
+        visiting = []
+
+        def visit(step_id):
+            visiting.append(step_id)
+            for dep in sorted(dependencies[step_id], key=step_order):
+                if dep not in dependencies:
+                    if dep in steps:
+                        self.errors.append('Step {0} depends on unreachable '
+                                           'step {1}.'.format(step_id, dep))
+                elif dep in visiting:
+                    cycle = visiting[visiting.index(dep):] + [dep]
+                    self.errors.append('Steps {0} depend on each other and '
+                                       'never run.'.format(
+                                           ' -> '.join(cycle)))
+                elif dep not in done:
+                    visit(dep)
+            visiting.pop()
+            done.add(step_id)
+
+        for step_id in sorted(dependencies, key=step_order):
+            if step_id not in done:
+                visit(step_id)
+
+    def _check_sources(self, step_id, step, reachable, before):
+        """
+        The replies a step reads with "from" must be of steps which always
+        run before it, `before`.
+        """
+        sources = [assumption.get('from') for assumption in step['assume']]
+        sources.extend(param.get('from') for pkg in step['data']
+                       for param in pkg.values())
+        for source in sorted(set(sources) - set([None]), key=step_order):
+            if source not in reachable:
+                self.errors.append('Step {0} reads the reply of step {1}, '
+                                   'which never runs.'.format(step_id,
+                                                              source))
+            elif source not in before:
+                self.errors.append('Step {0} reads the reply of step {1}, '
+                                   'which does not run before it.'.format(
+                                       step_id, source))
+
+    def _check_params(self, step_id, data):
+        for pkg in data:
+            for param in (pkg.get('param_name'), pkg.get('param_value')):
+                if param is None:
+                    continue
+                if (param['type'] in REPLY_VALUE_TYPES and
+                        param.get('from') is None and
+                        step_id == ENTRY_STEP):
+                    self.errors.append('Step {0} sends a value of the '
+                                       'previous reply, but runs first.'.format(
+                                           step_id))
+                if param['type'] == 'row':
+                    if self.dataset_fields is None:
+                        self.errors.append('Step {0} sends the dataset field '
+                                           '{1}, but runs without a '
+                                           'dataset.'.format(step_id,
+                                                             param['value']))
+                    elif param['value'] not in self.dataset_fields:
+                        self.errors.append('Step {0} sends the dataset field '
+                                           '{1}, which is not in the '
+                                           'dataset.'.format(step_id,
+                                                             param['value']))
+
+    def validate(self):
+        """
+        The errors found in the script, an empty list when it is valid.
+        """
+        self.errors = []
+        if not self._load():
+            return self.errors
+
+        steps = {}
+        for step_id in sorted(self.tests, key=step_order):
+            request_data = self.tests[step_id]
+            if not isinstance(request_data, dict):
+                self.errors.append('Step {0} is not a JSON object.'.format(
+                    step_id))
+                continue
+            steps[step_id] = self._check_step(step_id, request_data)
+            self._check_xpaths(step_id, request_data)
+
+        self._check_targets(steps)
+        if ENTRY_STEP not in steps:
+            self.errors.append('Step {0} not found.'.format(ENTRY_STEP))
+            return self.errors
+
+        # the same walk and dependencies as the plan the steps run with
+        next_steps = dict((step_id, steps[step_id]['next'])
+                          for step_id in steps)
+        reachable, loops = walk(next_steps, ENTRY_STEP)
+        for step_id in sorted(steps, key=step_order):
+            if step_id not in reachable:
+                self.errors.append('Step {0} is unreachable from step '
+                                   '{1}.'.format(step_id, ENTRY_STEP))
+        for step_id, target in loops:
+            self.errors.append('Step {0} loops back to step {1} with '
+                               '"next" and never ends.'.format(step_id,
+                                                               target))
+        dependencies = direct_parents(
+            dict((step_id, next_steps[step_id]) for step_id in reachable),
+            dict((step_id, steps[step_id]['depends_on'])
+                 for step_id in reachable),
+            loops)
+        self._check_dependencies(steps, dependencies)
+        before = ancestors(dependencies)
+        for step_id in reachable:
+            self._check_sources(step_id, steps[step_id], reachable,
+                                before[step_id])
+            self._check_params(step_id, steps[step_id]['data'])
+        return self.errors
@@ -0,0 +1,167 @@
+import os
+import time
+
+from jitte.core.exceptions import InvalidConfiguration
+
+
+DEFAULT_INTERVAL = 1.0
+
+
+class WatchedScript(object):
+    """
+    A script as of its last run: the suite, the files it was loaded from
+    with their modification times, its results and the replies of its
+    steps.
+    """
+
+    def __init__(self, script, suite, mtimes):
+        self.script = script
+        self.suite = suite
+        self.mtimes = mtimes
+        self.results = []
+        self.replies = {}
+
+
+def modification_time(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+class ScriptResults(object):
+    """
+    Sink keeping the results of every script while passing them on.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.results = {}
+
+    def add(self, result):
+        self.results.setdefault(result['script'], []).append(result)
+        self.sink.add(result)
+
+
+class Watcher(object):
+    """
+    Run the scripts again whenever their files change, polling the
+    modification times of the scripts and of the payload files they read.
+    The runner, with its connection pool, stays the same between rounds.
+    A changed script runs again from its first modified step, the replies
+    of the steps before it are reused when the script has no branches or
+    loops and runs one step at a time; unchanged scripts are not run at
+    all, their previous results are reported again.
+    """
+
+    def __init__(self, logger, runner, paths, interval=DEFAULT_INTERVAL):
+        self.logger = logger
+        self.runner = runner
+        self.paths = paths
+        self.interval = interval
+        self.scripts = {}
+
+    def _changed(self, script):
+        watched = self.scripts.get(script)
+        if watched is None:
+            return True
+        return any(modification_time(path) != mtime
+                   for path, mtime in watched.mtimes.items())
+
+    def changed(self):
+        """
+        The scripts which are new, changed or gone since the last round.
+        """
+        scripts = self.runner.collect(self.paths)
+        changed = [script for script in scripts if self._changed(script)]
+        changed.extend(script for script in self.scripts
+                       if script not in scripts)
+        return changed
+
+    def _reusable(self, previous, suite):
+        """
+        The replies of the steps before the first modified one.
+        """
+        plan = suite.plan
+        if (previous is None or previous.suite is None or
+                self.runner.concurrency is not None or self.runner.dataset or
+                plan.is_graph() or plan.loops):
+            return {}
+
+        reusable = {}
+        for step_id in plan.chain():
+            step = previous.suite.plan.steps.get(step_id)
+            if step != plan.steps[step_id] or step_id not in previous.replies:
+                break
+            # a skipped step is run, what made it skip may have changed
+            if previous.replies[step_id][0]['result'] == 'SKIPPED':
+                break
+            reusable[step_id] = previous.replies[step_id]
+        return reusable
+
+    def _load(self, script):
+        mtimes = {script: modification_time(script)}
+        try:
+            suite = self.runner.load(script)
+        except (InvalidConfiguration, SystemExit) as exc:
+            # a script being edited may well be invalid for a while
+            if isinstance(exc, InvalidConfiguration):
+                self.logger.error(str(exc))
+            self.logger.error('Not running {0} until it changes.'.format(
+                script))
+            return WatchedScript(script, None, mtimes)
+
+        for path in suite.files:
+            mtimes[path] = modification_time(path)
+        return WatchedScript(script, suite, mtimes)
+
+    def run_round(self, sink, changed=None):
+        """
+        Run the changed scripts and report the results of all of them to
+        the sink. Returns the scripts which were run.
+        """
+        changed = self.changed() if changed is None else changed
+        # every round is a run of its own, failures of the last one don't
+        # count towards --fail-fast or --max-failures
+        policy = self.runner.suite_options.get('policy')
+        if policy is not None:
+            policy.reset()
+        loaded = []
+        for script in changed:
+            previous = self.scripts.pop(script, None)
+            if not os.path.exists(script):
+                continue
+            watched = self._load(script)
+            if watched.suite is not None:
+                watched.replies = self._reusable(previous, watched.suite)
+                loaded.append(watched)
+            self.scripts[script] = watched
+
+        for script in sorted(self.scripts):
+            watched = self.scripts[script]
+            if watched not in loaded:
+                for result in watched.results:
+                    sink.add(result)
+
+        collected = ScriptResults(sink)
+        self.runner.run_suites([watched.suite for watched in loaded],
+                               collected,
+                               dict((watched.script, watched.replies)
+                                    for watched in loaded))
+        for watched in loaded:
+            watched.results = collected.results.get(watched.script, [])
+            reused = sum(1 for result in watched.results
+                         if result.get('reused'))
+            self.logger.info('{0}: {1} steps run, {2} reused'.format(
+                watched.script, len(watched.results) - reused, reused))
+        return [watched.script for watched in loaded]
+
+    def wait(self):
+        """
+        Block until a script or one of its files changes.
+        """
+        while True:
+            changed = self.changed()
+            if changed:
+                return changed
+            time.sleep(self.interval)
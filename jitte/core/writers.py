@@ -0,0 +1,175 @@
+import json
+import os
+import re
+
+from xml.sax.saxutils import escape, quoteattr
+
+
+TIMESTAMP_FORMAT = '%Y-%m-%d-%H-%M-%S'
+# characters XML 1.0 doesn't allow, not even escaped
+XML_ILLEGAL = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def xml_text(value):
+    """
+    A value as unicode text which can be written in an XML document.
+    """
+    if isinstance(value, str):
+        value = value.decode('utf-8', 'replace')
+    elif not isinstance(value, unicode):
+        value = unicode(value)
+    return XML_ILLEGAL.sub(u'', value)
+
+
+def printnice(s1, s2, headerchar):
+    size = max(len(s1), len(s2))
+    header = str(headerchar) * size
+
+    print header
+    print s1
+    print s2
+    print header
+
+
+def print_summary(summary):
+    s1 = "Tests run: {0}".format(summary['total'])
+    s2 = "{0} failed. {1} passed.".format(summary['fail'], summary['pass'])
+    if summary.get('skipped'):
+        s2 += " {0} skipped.".format(summary['skipped'])
+    printnice(s1, s2, "=")
+
+
+def _percentile_change(trend, name):
+    recent = trend['recent'][name]
+    baseline = trend['baseline']
+    if not baseline:
+        return '{0} {1:.5f}s'.format(name, recent)
+    change = (recent / baseline[name] - 1) if baseline[name] else 0.0
+    return '{0} {1:.5f}s (baseline {2:.5f}s, {3:+.1%})'.format(
+        name, recent, baseline[name], change)
+
+
+def print_history(trends):
+    """
+    The latency of every step in its recent runs against its baseline, and
+    the median of each run, oldest first.
+    """
+    for trend in trends:
+        if trend['recent'] is None:
+            continue
+        flag = ''
+        if trend['regressed']:
+            flag = '  REGRESSED {0}'.format(', '.join(trend['regressed']))
+        print '{0} step {1} {2}{3}'.format(trend['script'], trend['step'],
+                                          trend['url'], flag)
+        print '    {0}  {1}'.format(_percentile_change(trend, 'p50'),
+                                    _percentile_change(trend, 'p95'))
+        print '    trend: {0}'.format(' '.join('{0:.5f}'.format(median)
+                                               for median in trend['medians']))
+
+
+class HtmlWriter(object):
+    """
+    The HTML report with its assets.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def write(self, summary, result_path, timestamp):
+        # jinja2 is loaded only when an HTML report is requested
+        from jitte.core.renderer import Renderer
+        Renderer(self.logger, summary).render(result_path, timestamp)
+
+
+class JUnitWriter(object):
+    """
+    JUnit XML, every step is a testcase named after its script.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def _testcase(self, test):
+        name = u'Test {0} {1}'.format(xml_text(test['step']),
+                                      xml_text(test.get('url') or ''))
+        attributes = u'classname={0} name={1} time={2}'.format(
+            quoteattr(xml_text(test.get('script') or '')),
+            quoteattr(name),
+            quoteattr(xml_text(test.get('duration') or '0')))
+        if test['result'] == 'OK':
+            return u'  <testcase {0}/>\n'.format(attributes)
+        if test['result'] == 'SKIPPED':
+            return u'  <testcase {0}>\n    <skipped message={1}/>\n' \
+                   u'  </testcase>\n'.format(attributes,
+                                              quoteattr(xml_text(
+                                                  test['cause'])))
+
+        message = test.get('cause') or u'Assumption failed.'
+        details = []
+        # every failed assumption, results of older runs only have the first
+        failures = test.get('failures') or (
+            [{'assumption': test['assumption']}]
+            if test.get('assumption') else [])
+        for failure in failures:
+            details.append(u'Assumption: {0}'.format(
+                json.dumps(failure['assumption'], default=unicode)))
+            if 'got' in failure:
+                details.append(u'Found: {0}'.format(
+                    json.dumps(failure['got'], default=unicode)))
+        if test.get('got'):
+            details.append(u'Got: {0}'.format(xml_text(test['got'])))
+        return (u'  <testcase {0}>\n'
+                u'    <failure message={1}>{2}</failure>\n'
+                u'  </testcase>\n').format(attributes,
+                                           quoteattr(xml_text(message)),
+                                           escape(xml_text(
+                                               u'\n'.join(details))))
+
+    def write(self, summary, result_path, timestamp):
+        filepath = os.path.join(result_path,
+                                'result-{0}.xml'.format(timestamp))
+        with open(filepath, 'w') as output_file:
+            output_file.write('<?xml version="1.0" encoding="utf-8"?>\n')
+            output_file.write(
+                u'<testsuite name={0} tests="{1}" failures="{2}" '
+                u'errors="0" skipped="{3}">\n'.format(
+                    quoteattr(xml_text(summary['title'])),
+                    summary['total'],
+                    summary['fail'],
+                    summary.get('skipped', 0)).encode('utf-8'))
+            for test in summary['tests']:
+                output_file.write(self._testcase(test).encode('utf-8'))
+            output_file.write('</testsuite>\n')
+
+
+class JsonLinesWriter(object):
+    """
+    One JSON object per step in result-<timestamp>.jsonl, which a run
+    already wrote while executing, and the summary counters in
+    result-<timestamp>.summary.json.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def write(self, summary, result_path, timestamp):
+        filepath = os.path.join(result_path,
+                                'result-{0}.jsonl'.format(timestamp))
+        if not os.path.exists(filepath):
+            with open(filepath, 'w') as output_file:
+                for test in summary['tests']:
+                    output_file.write(json.dumps(test, default=unicode))
+                    output_file.write('\n')
+
+        filepath = os.path.join(result_path,
+                                'result-{0}.summary.json'.format(timestamp))
+        counters = dict((key, value) for key, value in summary.items()
+                        if key != 'tests')
+        with open(filepath, 'w') as output_file:
+            json.dump(counters, output_file, default=unicode)
+
+
+WRITERS = {'html': HtmlWriter,
+           'junit': JUnitWriter,
+           'jsonl': JsonLinesWriter}
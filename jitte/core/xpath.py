@@ -0,0 +1,22 @@
+# compiled expressions are shared by every step and script of a run
+_compiled = {}
+
+
+def load_etree():
+    """
+    lxml is imported only once a script needs XPath or XML.
+    """
+    from lxml import etree
+    return etree
+
+
+def compile_xpath(expression):
+    """
+    Return the compiled form of an XPath expression, compiling it only the
+    first time it's seen. Raises etree.XPathSyntaxError on invalid syntax.
+    """
+    try:
+        return _compiled[expression]
+    except KeyError:
+        compiled = _compiled[expression] = load_etree().XPath(expression)
+        return compiled
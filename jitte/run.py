@@ -1,20 +1,58 @@
+import os
+import sys
 import argparse
 
-from jitte.core.testsuite import TestSuite
-from jitte.core.renderer import Renderer
+from contextlib import contextmanager
+from datetime import datetime
+
+# modules importing requests, lxml or jinja2 are imported by the functions
+# needing them, so parsing the options and --help stay fast
+from jitte.core.defaults import (DEFAULT_POOL_SIZE, DEFAULT_RETRIES,
+                                 DEFAULT_BACKOFF, DEFAULT_CACHE_SIZE,
+                                 DEFAULT_CIRCUIT_RESET)
+from jitte.core.stream import StreamLimits, DEFAULT_EXCERPT_SIZE
+from jitte.core.policy import RunPolicy
+from jitte.core.watch import Watcher, DEFAULT_INTERVAL
+from jitte.core.distributed import parse_address, CONNECT_TIMEOUT
+from jitte.core.exceptions import InvalidConfiguration
+from jitte.core.sink import ResultSink
 from jitte.core.summary import Summary
-from jitte.core.logger import logger
+from jitte.core.writers import (WRITERS, TIMESTAMP_FORMAT, print_summary,
+                                print_history)
+from jitte.core.logger import logger, configure_logging
+
+
+def formats(value):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    for name in names:
+        if name not in WRITERS:
+            msg = 'unknown format {0}, choose from {1}'.format(
+                name, ', '.join(sorted(WRITERS)))
+            raise argparse.ArgumentTypeError(msg)
+    return names
+
+
+def address(value):
+    try:
+        return parse_address(value)
+    except InvalidConfiguration as exc:
+        raise argparse.ArgumentTypeError(str(exc))
 
 
-def parse_options():
+# options of a run the coordinator sends to its workers
+WORKER_OPTIONS = ('pool_size', 'keep_alive', 'retries', 'retry_backoff',
+                  'stream', 'max_body', 'excerpt_size', 'timings',
+                  'fail_fast', 'max_failures', 'max_script_failures',
+                  'skip_dependents', 'cache', 'cache_dir', 'cache_size',
+                  'rate_limit', 'burst', 'max_host_concurrency',
+                  'adaptive_concurrency', 'circuit_breaker', 'circuit_reset',
+                  'record', 'replay', 'workers', 'concurrency', 'dataset')
+
+
+def add_common_options(parser):
     """
-    Process command line arguments
+    Options shared by every command
     """
-    parser = argparse.ArgumentParser()
-
-    parser.add_argument("testpath",
-                        type=str,
-                        help="Test configuration file path")
     parser.add_argument("resultpath",
                         type=str,
                         help="Result file path")
@@ -25,16 +63,684 @@ def parse_options():
                         default="Summary",
                         dest="result_title",
                         help="Result file title")
+    parser.add_argument("-f",
+                        "--format",
+                        action="store",
+                        type=formats,
+                        default=["html"],
+                        dest="formats",
+                        help="Comma separated result formats: html,junit,jsonl")
+    parser.add_argument("--pool-size",
+                        action="store",
+                        type=int,
+                        default=DEFAULT_POOL_SIZE,
+                        dest="pool_size",
+                        help="Connections kept open per host")
+    parser.add_argument("--retries",
+                        action="store",
+                        type=int,
+                        default=DEFAULT_RETRIES,
+                        dest="retries",
+                        help="Retries on connection errors and 502/503/504")
+    parser.add_argument("--retry-backoff",
+                        action="store",
+                        type=float,
+                        default=DEFAULT_BACKOFF,
+                        dest="retry_backoff",
+                        help="Backoff factor in seconds between retries")
+    parser.add_argument("--no-keep-alive",
+                        action="store_false",
+                        default=True,
+                        dest="keep_alive",
+                        help="Close the connection after every request")
+    parser.add_argument("--stream",
+                        action="store_true",
+                        default=False,
+                        dest="stream",
+                        help="Stream the replies of every step")
+    parser.add_argument("--max-body",
+                        action="store",
+                        type=int,
+                        default=None,
+                        dest="max_body",
+                        help="Fail streamed steps with larger reply bodies")
+    parser.add_argument("--excerpt-size",
+                        action="store",
+                        type=int,
+                        default=DEFAULT_EXCERPT_SIZE,
+                        dest="excerpt_size",
+                        help="Characters of streamed bodies kept for report")
+    parser.add_argument("--timings",
+                        action="store_true",
+                        default=False,
+                        dest="timings",
+                        help="Report the time spent in each phase of a step")
+    parser.add_argument("--profile",
+                        action="store_true",
+                        default=False,
+                        dest="profile",
+                        help="Profile jitte itself, write the stats to resultpath")
+    parser.add_argument("--fail-fast",
+                        action="store_true",
+                        default=False,
+                        dest="fail_fast",
+                        help="Skip every remaining step after a failure")
+    parser.add_argument("--max-failures",
+                        action="store",
+                        type=int,
+                        default=None,
+                        dest="max_failures",
+                        help="Skip every remaining step after N failures")
+    parser.add_argument("--max-script-failures",
+                        action="store",
+                        type=int,
+                        default=None,
+                        dest="max_script_failures",
+                        help="Skip the rest of a script after N failures")
+    parser.add_argument("--skip-dependents",
+                        action="store_true",
+                        default=False,
+                        dest="skip_dependents",
+                        help="Skip the steps following or needing a failed one")
+    parser.add_argument("--cache",
+                        action="store_true",
+                        default=False,
+                        dest="cache",
+                        help="Cache the replies of GET steps as HTTP allows")
+    parser.add_argument("--cache-dir",
+                        action="store",
+                        type=str,
+                        default=None,
+                        dest="cache_dir",
+                        help="Keep the cached replies in this directory too")
+    parser.add_argument("--cache-size",
+                        action="store",
+                        type=int,
+                        default=DEFAULT_CACHE_SIZE,
+                        dest="cache_size",
+                        help="Cached replies kept in memory")
+    parser.add_argument("--rate-limit",
+                        action="store",
+                        type=float,
+                        default=None,
+                        dest="rate_limit",
+                        help="Requests per second sent to each host")
+    parser.add_argument("--burst",
+                        action="store",
+                        type=int,
+                        default=None,
+                        dest="burst",
+                        help="Requests sent at once to an idle host")
+    parser.add_argument("--max-host-concurrency",
+                        action="store",
+                        type=int,
+                        default=None,
+                        dest="max_host_concurrency",
+                        help="Requests in flight to each host at most")
+    parser.add_argument("--adaptive-concurrency",
+                        action="store_true",
+                        default=False,
+                        dest="adaptive_concurrency",
+                        help="Send fewer requests at once to overloaded hosts")
+    parser.add_argument("--circuit-breaker",
+                        action="store",
+                        type=int,
+                        default=None,
+                        dest="circuit_breaker",
+                        help="Fail requests to a host after N failed in a row")
+    parser.add_argument("--circuit-reset",
+                        action="store",
+                        type=float,
+                        default=DEFAULT_CIRCUIT_RESET,
+                        dest="circuit_reset",
+                        help="Seconds before a tripped host is tried again")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record",
+                          action="store",
+                          type=str,
+                          default=None,
+                          dest="record",
+                          help="Record the replies into a cassette directory")
+    cassette.add_argument("--replay",
+                          action="store",
+                          type=str,
+                          default=None,
+                          dest="replay",
+                          help="Serve the replies recorded in a cassette")
 
-    return parser.parse_args()
 
+def parse_options(args):
+    """
+    Process command line arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("testpath",
+                        type=str,
+                        nargs="+",
+                        help="Test configuration file, directory or glob")
+    add_common_options(parser)
+    parser.add_argument("-w",
+                        "--workers",
+                        action="store",
+                        type=int,
+                        default=1,
+                        dest="workers",
+                        help="Number of test scripts run concurrently")
+    parser.add_argument("-c",
+                        "--concurrency",
+                        action="store",
+                        type=int,
+                        default=None,
+                        dest="concurrency",
+                        help=("Run independent steps of a script "
+                              "concurrently, at most N at a time"))
+    parser.add_argument("--dataset",
+                        action="store",
+                        type=str,
+                        default=None,
+                        dest="dataset",
+                        help="Run the scripts once per CSV or JSON Lines row")
+    parser.add_argument("--watch",
+                        action="store_true",
+                        default=False,
+                        dest="watch",
+                        help="Run the scripts again whenever their files change")
+    parser.add_argument("--watch-interval",
+                        action="store",
+                        type=float,
+                        default=DEFAULT_INTERVAL,
+                        dest="watch_interval",
+                        help="Seconds between checks for changed files")
+    parser.add_argument("--validate",
+                        action="store_true",
+                        default=False,
+                        dest="validate",
+                        help="Only check the scripts, send no request")
+    parser.add_argument("--history-db",
+                        action="store",
+                        type=str,
+                        default=None,
+                        dest="history_db",
+                        help="Add the results to this SQLite file")
+    parser.add_argument("--coordinator",
+                        action="store",
+                        type=address,
+                        default=None,
+                        dest="coordinator",
+                        help=("Listen on host:port and let 'jitte worker' "
+                              "processes run the scripts"))
+
+    options = parser.parse_args(args)
+    if options.coordinator and (options.watch or options.record):
+        parser.error('--coordinator can be used with neither --watch '
+                     'nor --record')
+    return options
+
+
+def parse_validate_options(args):
+    """
+    Process command line arguments of the validate command
+    """
+    parser = argparse.ArgumentParser(prog="jitte validate")
+
+    parser.add_argument("testpath",
+                        type=str,
+                        nargs="+",
+                        help="Test configuration file, directory or glob")
+    parser.add_argument("--dataset",
+                        action="store",
+                        type=str,
+                        default=None,
+                        dest="dataset",
+                        help="The CSV or JSON Lines rows the scripts run with")
+
+    return parser.parse_args(args)
+
+
+def parse_worker_options(args):
+    """
+    Process command line arguments of the worker command
+    """
+    parser = argparse.ArgumentParser(prog="jitte worker")
+
+    parser.add_argument("coordinator",
+                        type=address,
+                        help="host:port of the coordinator")
+    parser.add_argument("--connect-timeout",
+                        action="store",
+                        type=float,
+                        default=CONNECT_TIMEOUT,
+                        dest="connect_timeout",
+                        help="Seconds to wait for the coordinator to start")
+
+    return parser.parse_args(args)
+
+
+def parse_history_options(args):
+    """
+    Process command line arguments of the history command
+    """
+    from jitte.core.history import (DEFAULT_RECENT_RUNS,
+                                    DEFAULT_BASELINE_RUNS, DEFAULT_THRESHOLD,
+                                    DEFAULT_MIN_CHANGE)
+    parser = argparse.ArgumentParser(prog="jitte history")
+
+    parser.add_argument("history_db",
+                        type=str,
+                        help="SQLite file written with --history-db")
+    parser.add_argument("--script",
+                        action="store",
+                        type=str,
+                        default=None,
+                        dest="script",
+                        help="Only the steps of this script")
+    parser.add_argument("--runs",
+                        action="store",
+                        type=int,
+                        default=DEFAULT_RECENT_RUNS,
+                        dest="runs",
+                        help="Recent runs compared to the baseline")
+    parser.add_argument("--baseline",
+                        action="store",
+                        type=int,
+                        default=DEFAULT_BASELINE_RUNS,
+                        dest="baseline",
+                        help="Runs before the recent ones making the baseline")
+    parser.add_argument("--threshold",
+                        action="store",
+                        type=float,
+                        default=DEFAULT_THRESHOLD,
+                        dest="threshold",
+                        help="Flag a p50 or p95 slower by more than this ratio")
+    parser.add_argument("--min-change",
+                        action="store",
+                        type=float,
+                        default=DEFAULT_MIN_CHANGE,
+                        dest="min_change",
+                        help="Seconds a p50 or p95 must be slower by at least")
+
+    return parser.parse_args(args)
 
-if __name__ == '__main__':
-    options = parse_options()
-    test_suite = TestSuite(logger, options.testpath)
-    results = test_suite.run()
+
+def parse_load_options(args):
+    """
+    Process command line arguments of the load command
+    """
+    parser = argparse.ArgumentParser(prog="jitte load")
+
+    parser.add_argument("testpath",
+                        type=str,
+                        help="Test configuration file path")
+    add_common_options(parser)
+    parser.add_argument("-n",
+                        "--iterations",
+                        action="store",
+                        type=int,
+                        default=None,
+                        dest="iterations",
+                        help="Number of times the script is replayed")
+    parser.add_argument("-d",
+                        "--duration",
+                        action="store",
+                        type=float,
+                        default=None,
+                        dest="duration",
+                        help="Replay the script for this many seconds")
+    parser.add_argument("-r",
+                        "--rate",
+                        action="store",
+                        type=float,
+                        default=None,
+                        dest="rate",
+                        help="Target script iterations started per second")
+    parser.add_argument("-c",
+                        "--concurrency",
+                        action="store",
+                        type=int,
+                        default=1,
+                        dest="concurrency",
+                        help="Number of iterations running at the same time")
+
+    return parser.parse_args(args)
+
+
+def create_cassette(options):
+    from jitte.core.cassette import Cassette
+    if options.record:
+        return Cassette(options.record, record=True)
+    if options.replay:
+        return Cassette(options.replay)
+    return None
+
+
+def create_cache(options):
+    from jitte.core.cache import HttpCache
+    if options.cache or options.cache_dir:
+        return HttpCache(logger, options.cache_size, options.cache_dir)
+    return None
+
+
+def create_throttle(options, pool_size):
+    from jitte.core.throttle import Throttle
+    concurrency = options.max_host_concurrency
+    if options.adaptive_concurrency and not concurrency:
+        # backing off from the connections the pool keeps open
+        concurrency = pool_size
+    if not (options.rate_limit or concurrency or options.circuit_breaker):
+        return None
+    return Throttle(logger,
+                    rate=options.rate_limit,
+                    burst=options.burst,
+                    concurrency=concurrency,
+                    adaptive=options.adaptive_concurrency,
+                    breaker_failures=options.circuit_breaker,
+                    breaker_reset=options.circuit_reset)
+
+
+def create_pool(options, connections):
+    from jitte.core.session import ConnectionPool
+    # every concurrently running step needs its own connection to the host
+    pool_size = max(options.pool_size, connections)
+    return ConnectionPool(logger,
+                          pool_size=pool_size,
+                          keep_alive=options.keep_alive,
+                          retries=options.retries,
+                          backoff=options.retry_backoff,
+                          cassette=create_cassette(options),
+                          cache=create_cache(options),
+                          throttle=create_throttle(options, pool_size))
+
+
+def create_policy(options):
+    return RunPolicy(fail_fast=options.fail_fast,
+                     max_failures=options.max_failures,
+                     max_script_failures=options.max_script_failures,
+                     skip_dependents=options.skip_dependents)
+
+
+def create_stream_limits(options):
+    return StreamLimits(enabled=options.stream,
+                        excerpt_size=options.excerpt_size,
+                        max_body=options.max_body)
+
+
+@contextmanager
+def profiling(options, timestamp):
+    if not options.profile:
+        yield
+        return
+
+    from jitte.core.profiling import Profiler
+    profiler = Profiler(logger)
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        profiler.write(options.resultpath, timestamp)
+
+
+def write_results(options, summary, timestamp):
+    print_summary(summary)
+    for name in options.formats:
+        WRITERS[name](logger).write(summary, options.resultpath, timestamp)
+
+
+def run(args):
+    options = parse_options(args)
+    if options.validate:
+        sys.exit(validate_scripts(options))
+    timestamp = datetime.strftime(datetime.now(), TIMESTAMP_FORMAT)
+    with profiling(options, timestamp):
+        if options.watch:
+            watch_scripts(options)
+        elif options.coordinator:
+            coordinate_scripts(options, timestamp)
+        else:
+            run_scripts(options, timestamp)
+
+
+def create_runner(options, pool):
+    from jitte.core.runner import Runner
+    from jitte.core.dataset import Dataset
+    dataset = Dataset(options.dataset) if options.dataset else None
+    return Runner(logger,
+                  pool,
+                  options.workers,
+                  options.concurrency,
+                  dataset,
+                  stream=create_stream_limits(options),
+                  timings=options.timings,
+                  policy=create_policy(options))
+
+
+def report(options, timestamp, run_into, recorded=None):
+    """
+    Call run_into with the sink of the results, then write them. Only the
+    results `recorded` accepts are added to the history.
+    """
+    sink = ResultSink(logger, options.resultpath, timestamp)
+    try:
+        run_into(sink)
+    finally:
+        sink.close()
+
+    summary = sink.create_summary(options.result_title)
+    write_results(options, summary, timestamp)
+    if options.history_db:
+        results = sink.results()
+        if recorded is not None:
+            results = (result for result in results if recorded(result))
+        record_history(options, timestamp, results)
+    if 'jsonl' not in options.formats:
+        os.remove(sink.path)
+
+
+def record_history(options, timestamp, results):
+    from jitte.core.history import History
+    history = History(logger, options.history_db)
+    try:
+        run = history.record(timestamp, options.result_title, results)
+    finally:
+        history.close()
+    logger.info('Results added to {0} as run {1}.'.format(options.history_db,
+                                                          run))
+
+
+def history(args):
+    """
+    Report the latency trend of every step, exit with status 1 when a step
+    got slower.
+    """
+    options = parse_history_options(args)
+    if not os.path.exists(options.history_db):
+        logger.error('History {0} not found'.format(options.history_db))
+        sys.exit(1)
+
+    from jitte.core.history import History
+    history_db = History(logger, options.history_db)
+    try:
+        trends = history_db.trends(options.runs, options.baseline,
+                                   options.threshold, options.script,
+                                   options.min_change)
+    finally:
+        history_db.close()
+    print_history(trends)
+    regressed = [trend for trend in trends if trend['regressed']]
+    if regressed:
+        logger.error('{0} steps got slower.'.format(len(regressed)))
+        sys.exit(1)
+
+
+def run_scripts(options, timestamp):
+    pool = create_pool(options, options.workers * (options.concurrency or 1))
+    runner = create_runner(options, pool)
+    try:
+        report(options,
+               timestamp,
+               lambda sink: runner.run(options.testpath, sink))
+    finally:
+        pool.close()
+
+
+def watch_scripts(options):
+    # the interpreter, the loaded modules and the open connections are
+    # kept for every round
+    pool = create_pool(options, options.workers * (options.concurrency or 1))
+    watcher = Watcher(logger,
+                      create_runner(options, pool),
+                      options.testpath,
+                      options.watch_interval)
+    changed = None
+    try:
+        while True:
+            timestamp = datetime.strftime(datetime.now(), TIMESTAMP_FORMAT)
+            ran = []
+            # the results of unchanged scripts were recorded when they ran
+            report(options,
+                   timestamp,
+                   lambda sink: ran.extend(watcher.run_round(sink, changed)),
+                   lambda result: result['script'] in ran)
+            logger.info('Watching for changes, press Ctrl+C to stop.')
+            changed = watcher.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+
+
+def coordinate_scripts(options, timestamp):
+    from jitte.core.runner import Runner
+    from jitte.core.distributed import Coordinator
+    # scripts are loaded here as well, so configuration errors stop the
+    # whole run before any worker gets a script
+    runner = Runner(logger, None)
+    scripts = runner.collect(options.testpath)
+    for script in scripts:
+        runner.load(script)
+    if not scripts:
+        logger.error('No test scripts found.')
+
+    coordinator = Coordinator(logger,
+                              options.coordinator,
+                              scripts,
+                              dict((name, getattr(options, name))
+                                   for name in WORKER_OPTIONS))
+    report(options, timestamp, coordinator.run)
+
+
+def worker(args):
+    options = parse_worker_options(args)
+    from jitte.core.distributed import Worker
+    pools = []
+
+    def start(run_options):
+        run_options = argparse.Namespace(**run_options)
+        pool = create_pool(run_options,
+                           run_options.workers *
+                           (run_options.concurrency or 1))
+        pools.append(pool)
+        return create_runner(run_options, pool)
+
+    try:
+        Worker(logger, options.coordinator, start,
+               options.connect_timeout).run()
+    except InvalidConfiguration as exc:
+        logger.error(str(exc))
+        sys.exit(1)
+    finally:
+        for pool in pools:
+            pool.close()
+
+
+def load(args):
+    options = parse_load_options(args)
+    timestamp = datetime.strftime(datetime.now(), TIMESTAMP_FORMAT)
+    with profiling(options, timestamp):
+        run_load(options, timestamp)
+
+
+def run_load(options, timestamp):
+    from jitte.core.testsuite import TestSuite
+    from jitte.core.loadtest import LoadTest
+    pool = create_pool(options, options.concurrency)
+    test_suite = TestSuite(logger,
+                           options.testpath,
+                           pool,
+                           create_stream_limits(options),
+                           options.timings,
+                           create_policy(options))
+    load_test = LoadTest(logger,
+                         test_suite,
+                         iterations=options.iterations,
+                         duration=options.duration,
+                         rate=options.rate,
+                         concurrency=options.concurrency)
+    try:
+        results, load_totals = load_test.run()
+    finally:
+        pool.close()
 
     summary_gen = Summary(logger, results)
     summary = summary_gen.create_summary(options.result_title)
+    summary['load'] = load_totals
+
+    if not os.path.isdir(options.resultpath):
+        os.makedirs(options.resultpath)
+    write_results(options, summary, timestamp)
+
+
+def dataset_fields(path):
+    from jitte.core.dataset import Dataset
+    for row in Dataset(path):
+        return set(row)
+    return set()
+
+
+def validate_scripts(options):
+    """
+    Check every script without sending any request and log all the errors
+    found. Returns the exit status, 1 when a script is invalid.
+    """
+    from jitte.core.runner import Runner
+    from jitte.core.validate import ScriptValidator
+    try:
+        fields = dataset_fields(options.dataset) if options.dataset else None
+    except InvalidConfiguration as exc:
+        logger.error(str(exc))
+        return 1
+
+    scripts = Runner(logger, None).collect(options.testpath)
+    if not scripts:
+        logger.error('No test scripts found.')
+        return 1
+
+    invalid = 0
+    for script in scripts:
+        errors = ScriptValidator(logger, script, fields).validate()
+        if errors:
+            invalid += 1
+            logger.error('{0}: {1} errors'.format(script, len(errors)))
+            for error in errors:
+                logger.error('  {0}'.format(error))
+    logger.info('{0} scripts checked, {1} invalid.'.format(len(scripts),
+                                                           invalid))
+    return 1 if invalid else 0
+
+
+def validate(args):
+    sys.exit(validate_scripts(parse_validate_options(args)))
 
-    r = Renderer(logger, summary).render(options.resultpath)
+
+COMMANDS = {'load': load, 'validate': validate, 'worker': worker,
+            'history': history}
+
+
+if __name__ == '__main__':
+    configure_logging()
+    arguments = sys.argv[1:]
+    if arguments and arguments[0] in COMMANDS:
+        COMMANDS[arguments[0]](arguments[1:])
+    else:
+        run(arguments)
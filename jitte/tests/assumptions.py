@@ -0,0 +1,38 @@
+import unittest
+
+from jitte.core.assumptions import (AssumptionEvaluator, json_trie,
+                                    find_json)
+
+
+class AssumptionsMethods(unittest.TestCase):
+
+    def test_find_json_in_one_pass(self):
+        document = {'user': {'id': 1, 'tags': ['a', 'b']}, 'ok': True}
+        paths = [('user', 'id'), ('user', 'tags', 1), ('ok',),
+                 ('user', 'missing'), ('user', 'tags', 5), ('ok', 'x')]
+        self.assertEqual(find_json(document, json_trie(paths)),
+                         {('user', 'id'): 1,
+                          ('user', 'tags', 1): 'b',
+                          ('ok',): True})
+
+    def test_shared_prefix_walked_once(self):
+        path, children = json_trie([('a', 'b'), ('a', 'c'), ('d',)])
+        self.assertEqual(path, None)
+        self.assertEqual(sorted(key for key, child in children), ['a', 'd'])
+
+    def test_evaluator(self):
+        assumptions = [{'type': 'status_code', 'pass_if': 'eq',
+                        'expected': '200', 'got': None},
+                       {'type': 'json', 'pass_if': 'neq', 'expected': 'x',
+                        'got': ['a']},
+                       {'type': 'json', 'pass_if': 'eq', 'expected': 'x',
+                        'got': ['a'], 'from': '1'}]
+        evaluator = AssumptionEvaluator(assumptions)
+        self.assertEqual(evaluator.json, (None, ('a',), None))
+        self.assertEqual(evaluator.json_paths, [('a',)])
+        self.assertTrue(evaluator.checks[1]('y', 'x'))
+        self.assertTrue(AssumptionEvaluator.wrap(evaluator) is evaluator)
+
+
+if __name__ == '__main__':
+    unittest.main()
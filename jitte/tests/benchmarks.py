@@ -0,0 +1,33 @@
+import json
+import shutil
+import tempfile
+import unittest
+
+from jitte.benchmarks.run import compare, write_script
+
+
+class BenchmarkMethods(unittest.TestCase):
+
+    def test_compare_flags_regressions(self):
+        previous = {'suite': {'steps_per_sec': 100.0, 'memory_peak': 1000,
+                              'steps': 10}}
+        current = {'suite': {'steps_per_sec': 80.0, 'memory_peak': 1050,
+                             'steps': 20},
+                   'render': {'elapsed': 1.0}}
+        changes = dict(((name, metric), regressed)
+                       for name, metric, old, new, change, regressed
+                       in compare(previous, current, 0.1))
+        self.assertEqual(changes, {('suite', 'steps_per_sec'): True,
+                                   ('suite', 'memory_peak'): False})
+
+    def test_write_script_graph(self):
+        directory = tempfile.mkdtemp()
+        try:
+            step = {'url': 'http://localhost/json', 'method': 'GET'}
+            path = write_script(directory, 'graph', [step] * 3, graph=True)
+            with open(path) as file_obj:
+                script = json.load(file_obj)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(script['1']['next'], ['2', '3'])
+        self.assertFalse('next' in script['2'])
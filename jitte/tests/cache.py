@@ -0,0 +1,166 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+from jitte.core.cache import HttpCache, CacheEntry
+from jitte.tests.mocks import MockedLogger
+
+
+class OriginAdapter(BaseAdapter):
+    """
+    Reply with the given headers, or 304 to a matching If-None-Match.
+    """
+
+    def __init__(self, headers, not_modified_headers=None):
+        super(OriginAdapter, self).__init__()
+        self.headers = headers
+        self.not_modified_headers = not_modified_headers
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.raw = io.BytesIO()
+        etag = self.headers.get('ETag')
+        if etag and request.headers.get('If-None-Match') == etag:
+            response.status_code = 304
+            response._content = ''
+            if self.not_modified_headers is not None:
+                response.headers.update(self.not_modified_headers)
+                return response
+        else:
+            response.status_code = 200
+            response._content = 'body {0}'.format(len(self.sent))
+        response.headers.update(self.headers)
+        return response
+
+    def close(self):
+        pass
+
+
+class HttpCacheMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def session(self, headers, cache=None, not_modified_headers=None):
+        self.origin = OriginAdapter(headers, not_modified_headers)
+        self.cache = cache or HttpCache(MockedLogger(), size=2)
+        session = requests.Session()
+        session.mount('http://', self.cache.adapter(self.origin))
+        return session
+
+    def test_fresh_reply_served_locally(self):
+        session = self.session({'Cache-Control': 'max-age=60'})
+        texts = [session.get('http://localhost/a').text for _ in range(3)]
+        self.assertEqual(texts, ['body 1'] * 3)
+        self.assertEqual(len(self.origin.sent), 1)
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_stale_reply_revalidated(self):
+        session = self.session({'ETag': '"v1"', 'Cache-Control': 'no-cache'})
+        texts = [session.get('http://localhost/a').text for _ in range(2)]
+        self.assertEqual(texts, ['body 1'] * 2)
+        self.assertEqual(self.origin.sent[1].headers['If-None-Match'], '"v1"')
+        self.assertEqual(self.cache.revalidated, 1)
+
+    def test_revalidated_reply_keeps_its_lifetime(self):
+        session = self.session({'ETag': '"v1"', 'Cache-Control': 'max-age=60'},
+                               not_modified_headers={'ETag': '"v1"'})
+        session.get('http://localhost/a')
+        self.cache.entries['http://localhost/a'].expires = 0
+        session.get('http://localhost/a')
+        self.assertEqual(self.cache.revalidated, 1)
+        # fresh again for max-age, though the 304 had no Cache-Control
+        self.assertEqual(session.get('http://localhost/a').text, 'body 1')
+        self.assertEqual(len(self.origin.sent), 2)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_requests_with_credentials_not_cached(self):
+        session = self.session({'Cache-Control': 'max-age=60'})
+        for user in ('ann', 'bob'):
+            response = session.get('http://localhost/a',
+                                   headers={'Authorization': user})
+            self.assertEqual(response.text,
+                             'body {0}'.format(len(self.origin.sent)))
+        session.get('http://localhost/a', cookies={'session': 'ann'})
+        self.assertEqual(len(self.origin.sent), 3)
+        self.assertEqual(list(self.cache.entries), [])
+
+    def test_no_store_and_post_not_cached(self):
+        session = self.session({'Cache-Control': 'no-store'})
+        session.get('http://localhost/a')
+        session.get('http://localhost/a')
+        session.post('http://localhost/a')
+        self.assertEqual(len(self.origin.sent), 3)
+
+    def test_least_recently_used_evicted(self):
+        session = self.session({'Cache-Control': 'max-age=60'})
+        for path in ('a', 'b', 'a', 'c'):
+            session.get('http://localhost/' + path)
+        self.assertEqual(list(self.cache.entries),
+                         ['http://localhost/a', 'http://localhost/c'])
+
+    def test_disk_store_survives_the_cache(self):
+        headers = {'Cache-Control': 'max-age=60'}
+        session = self.session(headers, HttpCache(MockedLogger(),
+                                                  path=self.path))
+        session.get('http://localhost/a')
+        session = self.session(headers, HttpCache(MockedLogger(),
+                                                  path=self.path))
+        self.assertEqual(session.get('http://localhost/a').text, 'body 1')
+        self.assertEqual(len(self.origin.sent), 0)
+
+    def test_streamed_reply_cached_when_small(self):
+        session = self.session({'Cache-Control': 'max-age=60',
+                                'Content-Length': '6'})
+        session.get('http://localhost/a', stream=True)
+        self.assertEqual(session.get('http://localhost/a').text, 'body 1')
+        self.assertEqual(len(self.origin.sent), 1)
+
+    def test_streamed_reply_of_unknown_size_not_cached(self):
+        for headers in ({'Cache-Control': 'max-age=60'},
+                        {'Cache-Control': 'max-age=60',
+                         'Content-Length': str(10 * 1024 * 1024)}):
+            session = self.session(headers)
+            session.get('http://localhost/a', stream=True)
+            self.assertEqual(list(self.cache.entries), [])
+
+    def test_disk_store_limited_to_size(self):
+        headers = {'Cache-Control': 'max-age=60'}
+        cache = HttpCache(MockedLogger(), size=2, path=self.path)
+        session = self.session(headers, cache)
+        for mtime, path in enumerate(('a', 'b', 'c')):
+            session.get('http://localhost/' + path)
+            # the least recently used entry is the one modified first
+            name = cache._file('http://localhost/' + path) + '.json'
+            os.utime(name, (mtime, mtime))
+        session.get('http://localhost/d')
+        self.assertEqual(len(os.listdir(self.path)), 4)
+        self.assertFalse(os.path.exists(
+            cache._file('http://localhost/a') + '.json'))
+        self.assertFalse(os.path.exists(
+            cache._file('http://localhost/b') + '.body'))
+
+    def test_expires_header(self):
+        response = Response()
+        response.status_code = 200
+        response._content = ''
+        response.headers.update({
+            'Date': 'Sun, 18 Oct 2026 10:00:00 GMT',
+            'Expires': 'Sun, 18 Oct 2026 10:01:00 GMT'})
+        request = requests.Request('GET', 'http://localhost/').prepare()
+        entry = CacheEntry.from_response(request, response, 1000)
+        self.assertEqual(entry.expires, 1060)
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+from jitte.core.cassette import Cassette, ReplyNotRecorded, BODIES_DIR
+from jitte.core.exceptions import InvalidConfiguration
+
+
+class CountingAdapter(BaseAdapter):
+    """
+    Reply with the number of requests sent so far.
+    """
+
+    def __init__(self):
+        super(CountingAdapter, self).__init__()
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers['Content-Type'] = 'text/plain; charset=utf-8'
+        response._content = 'same' if 'same' in request.url else str(
+            self.sent)
+        if 'small' in request.url:
+            response.headers['Content-Length'] = str(len(response._content))
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+class CassetteMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def session(self, cassette, adapter=None):
+        session = requests.Session()
+        session.mount('http://', cassette.adapter(adapter))
+        return session
+
+    def record(self, urls):
+        cassette = Cassette(self.path, record=True)
+        session = self.session(cassette, CountingAdapter())
+        for url in urls:
+            session.get(url)
+        session.close()
+
+    def test_replay_in_recorded_order(self):
+        self.record(['http://localhost/a', 'http://localhost/a'])
+        session = self.session(Cassette(self.path))
+        texts = [session.get('http://localhost/a').text for _ in range(3)]
+        self.assertEqual(texts, ['1', '2', '2'])
+
+    def test_identical_bodies_stored_once(self):
+        self.record(['http://localhost/same', 'http://localhost/same/too'])
+        bodies = os.listdir(os.path.join(self.path, BODIES_DIR))
+        self.assertEqual(len(bodies), 1)
+
+    def test_request_not_recorded(self):
+        self.record(['http://localhost/a'])
+        session = self.session(Cassette(self.path))
+        self.assertRaises(ReplyNotRecorded,
+                          session.post,
+                          'http://localhost/a',
+                          data='body')
+
+    def test_streamed_body_recorded_when_small(self):
+        cassette = Cassette(self.path, record=True)
+        session = self.session(cassette, CountingAdapter())
+        session.get('http://localhost/small', stream=True)
+        session.get('http://localhost/large', stream=True)
+        session.close()
+        session = self.session(Cassette(self.path))
+        self.assertEqual(session.get('http://localhost/small').text, '1')
+        self.assertRaises(ReplyNotRecorded,
+                          session.get,
+                          'http://localhost/large')
+
+    def test_missing_cassette(self):
+        self.assertRaises(InvalidConfiguration,
+                          Cassette,
+                          os.path.join(self.path, 'missing'))
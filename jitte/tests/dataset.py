@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jitte.core.dataset import Dataset, DatasetRun, substitute
+from jitte.core.sink import ResultList
+from jitte.core.exceptions import InvalidConfiguration
+from jitte.tests.mocks import MockedLogger
+
+
+class MockedSuite(object):
+
+    testfile = 'test.json'
+
+    def run(self, concurrency=None, sink=None, row=None):
+        result = 'FAILED' if row['uid'] == '2' else 'OK'
+        return [{'step': '1', 'url': 'http://localhost/${uid}',
+                 'result': result, 'cause': 'bad', 'duration': '0.1'}]
+
+
+class DatasetMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def create_file(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, 'w') as file_obj:
+            file_obj.write(content)
+        return path
+
+    def test_read_csv(self):
+        path = self.create_file('rows.csv', 'uid,name\n1,ann\n2,bob\n')
+        rows = list(Dataset(path))
+        self.assertEqual(rows, [{'uid': '1', 'name': 'ann'},
+                                {'uid': '2', 'name': 'bob'}])
+
+    def test_read_json_lines(self):
+        path = self.create_file('rows.jsonl', '{"uid": 1}\n\n{"uid": 2}\n')
+        self.assertEqual(list(Dataset(path)), [{'uid': 1}, {'uid': 2}])
+
+    def test_invalid_json_lines(self):
+        path = self.create_file('rows.jsonl', '{"uid": 1}\n[1]\n')
+        self.assertRaises(InvalidConfiguration, list, Dataset(path))
+
+    def test_unknown_format(self):
+        self.assertRaises(InvalidConfiguration, Dataset, 'rows.txt')
+
+    def test_substitute(self):
+        row = {'uid': '7'}
+        self.assertEqual(substitute('http://x/${uid}/$other', row),
+                         'http://x/7/$other')
+        self.assertEqual(substitute('http://x/${uid}', None),
+                         'http://x/${uid}')
+
+    def test_run_aggregates_rows(self):
+        path = self.create_file('rows.csv', 'uid\n1\n2\n3\n')
+        run = DatasetRun(MockedLogger(), MockedSuite(), Dataset(path), 2)
+        results = run.run(ResultList())
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['rows'], 3)
+        self.assertEqual(results[0]['result'], 'FAILED')
+        self.assertEqual(results[0]['cause'],
+                         '1 of 3 failed. First failure: bad')
@@ -0,0 +1,140 @@
+import socket
+import threading
+import time
+import unittest
+
+from jitte.core.distributed import (Coordinator, Worker, Connection,
+                                    parse_address)
+from jitte.core.exceptions import InvalidConfiguration
+from jitte.core.sink import ResultList
+from jitte.tests.mocks import MockedLogger
+
+
+class StepRunner(object):
+    """
+    Runs every script as two passing steps, "invalid.json" is invalid.
+    """
+
+    def __init__(self, options):
+        self.options = options
+
+    def load(self, script):
+        if script == 'invalid.json':
+            raise InvalidConfiguration('Invalid script')
+        return script
+
+    def run_suites(self, suites, sink):
+        for suite in suites:
+            for step in ('1', '2'):
+                sink.add({'script': suite, 'step': step, 'result': 'OK'})
+
+
+class SlowStepRunner(StepRunner):
+
+    def run_suites(self, suites, sink):
+        time.sleep(0.5)
+        super(SlowStepRunner, self).run_suites(suites, sink)
+
+
+class DistributedMethods(unittest.TestCase):
+
+    def start(self, scripts, max_attempts=3, timeout=5):
+        coordinator = Coordinator(MockedLogger(), ('127.0.0.1', 0), scripts,
+                                  {'timings': True}, max_attempts, timeout)
+        coordinator.start()
+        return coordinator
+
+    def start_worker(self, coordinator, runner=StepRunner, heartbeat=5):
+        thread = threading.Thread(target=Worker(MockedLogger(),
+                                                coordinator.address,
+                                                runner,
+                                                heartbeat=heartbeat).run)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def run_coordinator(self, coordinator):
+        results = ResultList()
+        thread = threading.Thread(target=coordinator.run, args=(results,))
+        thread.daemon = True
+        thread.start()
+        return thread, results
+
+    def lose_worker(self, coordinator):
+        # a worker taking a script and dying before it's done
+        connection = Connection(socket.create_connection(
+            coordinator.address))
+        self.assertEqual(connection.receive()['type'], 'options')
+        script = connection.receive()['script']
+        connection.send({'type': 'result', 'result': {'script': script}})
+        connection.close()
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('localhost:8000'),
+                         ('localhost', 8000))
+        self.assertEqual(parse_address('8000'), ('127.0.0.1', 8000))
+        self.assertRaises(InvalidConfiguration, parse_address, 'localhost')
+
+    def test_scripts_spread_across_workers(self):
+        scripts = ['a.json', 'b.json', 'c.json', 'invalid.json']
+        coordinator = self.start(scripts)
+        workers = [self.start_worker(coordinator) for _ in range(3)]
+        results = coordinator.run(ResultList())
+        for worker in workers:
+            worker.join(5)
+            self.assertFalse(worker.is_alive())
+        self.assertEqual(sorted((result['script'], result['step'])
+                                for result in results),
+                         [(script, step) for script in scripts[:3]
+                          for step in ('1', '2')])
+
+    def test_lost_worker_script_runs_again(self):
+        coordinator = self.start(['a.json'])
+        thread, results = self.run_coordinator(coordinator)
+        self.lose_worker(coordinator)
+        self.start_worker(coordinator)
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        # the partial results of the lost worker are dropped
+        self.assertEqual([result['step'] for result in results], ['1', '2'])
+        self.assertEqual(coordinator.attempts['a.json'], 2)
+
+    def test_gives_up_after_max_attempts(self):
+        coordinator = self.start(['a.json'], max_attempts=1)
+        thread, results = self.run_coordinator(coordinator)
+        self.lose_worker(coordinator)
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(results, [])
+
+    def test_silent_worker_script_runs_again(self):
+        coordinator = self.start(['a.json'], timeout=0.2)
+        thread, results = self.run_coordinator(coordinator)
+        # a worker taking a script, then hanging with its connection open
+        connection = Connection(socket.create_connection(
+            coordinator.address))
+        connection.receive()
+        connection.receive()
+        self.start_worker(coordinator)
+        thread.join(5)
+        connection.close()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([result['step'] for result in results], ['1', '2'])
+        self.assertEqual(coordinator.attempts['a.json'], 2)
+
+    def test_heartbeat_keeps_slow_worker(self):
+        coordinator = self.start(['a.json'], timeout=0.2)
+        thread, results = self.run_coordinator(coordinator)
+        self.start_worker(coordinator, SlowStepRunner, heartbeat=0.05)
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(coordinator.attempts['a.json'], 1)
+        self.assertEqual(len(results), 2)
+
+    def test_worker_without_coordinator(self):
+        worker = Worker(MockedLogger(), ('127.0.0.1', 1), StepRunner, 0)
+        self.assertRaises(InvalidConfiguration, worker.run)
+
+
+if __name__ == '__main__':
+    unittest.main()
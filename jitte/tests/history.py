@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jitte.core.history import History
+from jitte.tests.mocks import MockedLogger
+
+
+def create_results(duration, failed=0.001):
+    return [{'script': 'a.json', 'step': '1', 'url': 'http://localhost/',
+             'result': 'OK', 'duration': '{0:.5f}'.format(duration)},
+            {'script': 'a.json', 'step': '2', 'url': 'http://localhost/',
+             'result': 'FAILED', 'duration': '{0:.5f}'.format(failed)},
+            {'script': 'a.json', 'step': '3', 'url': 'http://localhost/',
+             'result': 'SKIPPED', 'duration': '0.00000'}]
+
+
+class HistoryMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.history = History(MockedLogger(),
+                               os.path.join(self.root, 'history.db'))
+
+    def tearDown(self):
+        self.history.close()
+        shutil.rmtree(self.root)
+
+    def test_record(self):
+        self.assertEqual(self.history.record('t1', 'Summary',
+                                             create_results(0.1)), 1)
+        self.assertEqual(self.history.record('t2', 'Summary',
+                                             create_results(0.2)), 2)
+        self.assertEqual(self.history.steps(),
+                         [('a.json', '1', 'http://localhost/'),
+                          ('a.json', '2', 'http://localhost/'),
+                          ('a.json', '3', 'http://localhost/')])
+        self.assertEqual(self.history.steps('b.json'), [])
+        self.assertEqual(self.history.durations('a.json', '1',
+                                                'http://localhost/', 1),
+                         [(2, [0.2])])
+
+    def test_reused_steps_not_recorded(self):
+        results = create_results(0.1)
+        results[0]['reused'] = True
+        run = self.history.record('t', 'Summary', results)
+        self.assertEqual(self.history.durations('a.json', '1',
+                                                'http://localhost/', 1), [])
+        self.assertEqual(self.history.connection.execute(
+            'SELECT COUNT(*) FROM results WHERE run = ?', (run,)).fetchone(),
+            (2,))
+
+    def test_regression_flagged(self):
+        for duration in (0.1, 0.1, 0.1, 0.1, 0.2, 0.2):
+            self.history.record('t', 'Summary', create_results(duration))
+        trends = self.history.trends(recent=2, baseline=4)
+        self.assertEqual(len(trends), 3)
+        step = trends[0]
+        self.assertEqual(step['regressed'], ['p50', 'p95'])
+        self.assertEqual(step['recent']['count'], 2)
+        self.assertEqual(step['baseline']['count'], 4)
+        self.assertEqual(len(step['medians']), 6)
+        # failed and skipped steps have no latency
+        self.assertEqual(trends[1]['recent'], None)
+        self.assertEqual(trends[1]['regressed'], [])
+
+    def test_no_regression_within_threshold(self):
+        for duration in (0.1, 0.1, 0.11):
+            self.history.record('t', 'Summary', create_results(duration))
+        self.assertEqual(self.history.trends(recent=1, baseline=2,
+                                             threshold=0.2)[0]['regressed'],
+                         [])
+        # slower by less than min_change is noise
+        self.assertEqual(self.history.trends(recent=1, baseline=2,
+                                             threshold=0.05,
+                                             min_change=0.02)[0]['regressed'],
+                         [])
+        # without a baseline nothing can regress
+        self.assertEqual(self.history.trends(recent=5)[0]['regressed'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
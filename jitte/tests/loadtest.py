@@ -0,0 +1,102 @@
+import threading
+import time
+import unittest
+
+from jitte.core.loadtest import LoadTest
+from jitte.tests.mocks import MockedLogger
+
+
+class MockedSuite(object):
+    """
+    Two steps per run, the second one failing every other run, each run
+    taking `delay` seconds.
+    """
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.started = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def run(self):
+        with self._lock:
+            self.started.append(time.time())
+            number = len(self.started)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return [{'step': '1', 'url': 'http://localhost/a', 'result': 'OK',
+                 'cause': '', 'duration': '0.1'},
+                {'step': '2', 'url': 'http://localhost/b',
+                 'result': 'FAILED' if number % 2 else 'OK',
+                 'cause': 'bad', 'duration': '0.3'}]
+
+
+class LoadTestMethods(unittest.TestCase):
+
+    def test_single_iteration_by_default(self):
+        suite = MockedSuite()
+        results, load = LoadTest(MockedLogger(), suite).run()
+        self.assertEqual(len(suite.started), 1)
+        self.assertEqual(load['iterations'], 1)
+
+    def test_iterations(self):
+        suite = MockedSuite()
+        results, load = LoadTest(MockedLogger(), suite, iterations=5,
+                                 concurrency=2).run()
+        self.assertEqual(len(suite.started), 5)
+        self.assertEqual(load['iterations'], 5)
+        self.assertEqual(load['requests'], 10)
+        self.assertEqual(load['concurrency'], 2)
+
+    def test_results_aggregated_per_step(self):
+        results, load = LoadTest(MockedLogger(), MockedSuite(),
+                                 iterations=5).run()
+        self.assertEqual([result['step'] for result in results], ['1', '2'])
+        self.assertEqual(results[0]['result'], 'OK')
+        self.assertEqual(results[0]['latency']['count'], 5)
+        self.assertEqual(results[0]['latency']['errors'], 0)
+        self.assertEqual(results[1]['result'], 'FAILED')
+        self.assertEqual(results[1]['cause'],
+                         '3 of 5 failed. First failure: bad')
+        self.assertEqual(results[1]['latency']['errors'], 3)
+        self.assertEqual(results[1]['latency']['error_rate'], '60.00%')
+        self.assertAlmostEqual(float(results[1]['duration']), 0.3, 2)
+
+    def test_duration_stops_iterations(self):
+        suite = MockedSuite(delay=0.05)
+        start = time.time()
+        results, load = LoadTest(MockedLogger(), suite, duration=0.2).run()
+        elapsed = time.time() - start
+        self.assertTrue(0.2 <= elapsed < 0.5)
+        self.assertTrue(2 <= load['iterations'] <= 5)
+        self.assertEqual(load['iterations'], len(suite.started))
+
+    def test_iterations_cut_by_duration(self):
+        suite = MockedSuite(delay=0.05)
+        results, load = LoadTest(MockedLogger(), suite, iterations=100,
+                                 duration=0.1).run()
+        self.assertTrue(load['iterations'] < 100)
+
+    def test_rate_paces_iterations(self):
+        suite = MockedSuite()
+        results, load = LoadTest(MockedLogger(), suite, iterations=5,
+                                 rate=20, concurrency=5).run()
+        started = sorted(suite.started)
+        # iteration n starts n / rate seconds after the first one
+        self.assertTrue(started[-1] - started[0] >= 0.19)
+        self.assertTrue(float(load['elapsed']) >= 0.19)
+
+    def test_concurrency_limits_iterations_in_flight(self):
+        suite = MockedSuite(delay=0.05)
+        results, load = LoadTest(MockedLogger(), suite, iterations=9,
+                                 concurrency=3).run()
+        self.assertEqual(suite.max_in_flight, 3)
+        self.assertEqual(load['iterations'], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
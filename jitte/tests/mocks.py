@@ -1,5 +1,3 @@
-
-
 class MockedLogger(object):
 
     def info(self, message):
@@ -8,6 +6,9 @@ class MockedLogger(object):
     def debug(self, message):
         pass
 
+    def warning(self, message):
+        pass
+
     def error(self, message):
         pass
 
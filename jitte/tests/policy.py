@@ -0,0 +1,42 @@
+import unittest
+
+from jitte.core.policy import RunPolicy, ScriptProgress
+
+
+FAILED = {'result': 'FAILED'}
+SKIPPED = {'result': 'SKIPPED'}
+
+
+class RunPolicyMethods(unittest.TestCase):
+
+    def test_default_never_skips(self):
+        policy = RunPolicy()
+        progress = ScriptProgress()
+        policy.record(progress, '1', FAILED)
+        self.assertEqual(policy.skip_cause(progress, ['1']), None)
+
+    def test_max_failures_shared_by_scripts(self):
+        policy = RunPolicy(max_failures=2)
+        first, second = ScriptProgress(), ScriptProgress()
+        policy.record(first, '1', FAILED)
+        self.assertEqual(policy.skip_cause(second, []), None)
+        policy.record(second, '1', FAILED)
+        self.assertTrue(policy.skip_cause(first, []).startswith(
+            'Run stopped'))
+
+    def test_max_script_failures(self):
+        policy = RunPolicy(max_script_failures=1)
+        first, second = ScriptProgress(), ScriptProgress()
+        policy.record(first, '1', FAILED)
+        self.assertTrue(policy.skip_cause(first, []).startswith(
+            'Script stopped'))
+        self.assertEqual(policy.skip_cause(second, []), None)
+
+    def test_skip_dependents_of_skipped_steps(self):
+        policy = RunPolicy(skip_dependents=True)
+        progress = ScriptProgress()
+        policy.record(progress, '1', SKIPPED)
+        self.assertEqual(policy.skip_cause(progress, ['2']), None)
+        self.assertEqual(policy.skip_cause(progress, ['2', '1']),
+                         'Step 1 did not pass.')
+        self.assertEqual(policy.failures, 0)
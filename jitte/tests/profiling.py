@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from jitte.core.profiling import Profiler
+from jitte.core.reply import parse_json
+from jitte.tests.mocks import MockedLogger
+
+
+def parse_in_thread():
+    thread = threading.Thread(target=parse_json, args=('{"leaf": 1}',))
+    thread.start()
+    thread.join()
+
+
+class ProfilerMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.result_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.result_path)
+
+    def test_threads_profiled(self):
+        profiler = Profiler(MockedLogger())
+        profiler.start()
+        try:
+            parse_in_thread()
+        finally:
+            profiler.stop()
+
+        names = [counter[0] for counter in profiler.counters(
+            profiler.stats())]
+        self.assertTrue(any(name.endswith('(parse_json)') for name in names))
+        self.assertEqual(len(profiler.profiles), 2)
+
+    def test_write(self):
+        profiler = Profiler(MockedLogger())
+        profiler.start()
+        parse_json('[]')
+        profiler.stop()
+
+        stats_path, summary_path = profiler.write(self.result_path, 'ts')
+        self.assertEqual(os.path.basename(stats_path), 'profile-ts.pstats')
+        with open(summary_path) as file_obj:
+            self.assertTrue('parse_json' in file_obj.read())
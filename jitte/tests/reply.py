@@ -0,0 +1,46 @@
+import unittest
+
+from jitte.core.reply import Reply
+from jitte.core.exceptions import TestError
+from jitte.tests.mocks import MockedReply
+
+
+class CountingReply(MockedReply):
+
+    def __init__(self, text, status_code):
+        super(CountingReply, self).__init__(text, status_code)
+        self.reads = 0
+
+    @property
+    def text(self):
+        self.reads += 1
+        return self._body
+
+    @text.setter
+    def text(self, value):
+        self._body = value
+
+
+class ReplyMethods(unittest.TestCase):
+
+    def test_json_parsed_once(self):
+        response = CountingReply('{"tree": {"leaf": "this"}}', 200)
+        reply = Reply(response)
+        self.assertTrue(reply.json() is reply.json())
+        self.assertEqual(reply.json()['tree']['leaf'], 'this')
+        self.assertEqual(response.reads, 1)
+
+    def test_xml_parsed_once(self):
+        reply = Reply(MockedReply('<xml><leaf>this</leaf></xml>', 200))
+        self.assertTrue(reply.xml() is reply.xml())
+
+    def test_parse_error_is_kept(self):
+        response = CountingReply('{"tree": this}', 200)
+        reply = Reply(response)
+        self.assertRaises(TestError, reply.json)
+        self.assertRaises(TestError, reply.json)
+        self.assertEqual(response.reads, 1)
+
+    def test_wrap_returns_same_instance(self):
+        reply = Reply(MockedReply('', 200))
+        self.assertTrue(Reply.wrap(reply) is reply)
@@ -0,0 +1,98 @@
+import unittest
+
+from jitte.core.plan import Step, Plan
+from jitte.core.replystore import (ReplyStore, plan_references,
+                                   read_replies)
+from jitte.core.exceptions import TestError, ReplyNotAvailable
+from jitte.tests.mocks import MockedReply
+
+
+def create_plan():
+    assume = [{'type': 'status_code', 'pass_if': 'eq', 'expected': '200',
+               'got': None}]
+    data = [{'param_name': {'type': 'static', 'value': 'token'},
+             'param_value': {'type': 'json', 'value': ['token'],
+                             'from': '1'}}]
+    check = [{'type': 'xpath', 'pass_if': 'eq', 'expected': 'ann',
+              'got': '/user/name/text()', 'from': '2'}]
+    steps = {'1': Step('1', 'post', 'http://localhost/', assume, [], {},
+                       next=['2']),
+             '2': Step('2', 'get', 'http://localhost/', assume, [], {},
+                       next=['3']),
+             '3': Step('3', 'get', 'http://localhost/', check, data, {})}
+    return Plan(steps)
+
+
+class ReplyStoreMethods(unittest.TestCase):
+
+    def test_plan_references(self):
+        self.assertEqual(plan_references(create_plan()),
+                         {'1': set([('json', ('token',))]),
+                          '2': set([('xpath', '/user/name/text()')])})
+
+    def test_read_replies(self):
+        plan = create_plan()
+        self.assertEqual(read_replies(plan), set(['1', '2']))
+        store = ReplyStore.for_plan(plan)
+        self.assertFalse(store.reply_read('3'))
+        data = [{'param_name': {'type': 'static', 'value': 'id'},
+                 'param_value': {'type': 'json', 'value': ['id']}}]
+        steps = {'1': Step('1', 'get', 'http://localhost/', [], [], {},
+                           next=['2']),
+                 '2': Step('2', 'get', 'http://localhost/', [], [], {},
+                           next=['3']),
+                 '3': Step('3', 'get', 'http://localhost/', [], data, {},
+                           depends_on=['1'])}
+        # the previous reply of step 3 is the one of 1 or of 2
+        self.assertEqual(read_replies(Plan(steps)), set(['1', '2']))
+        self.assertTrue(ReplyStore({}).reply_read('3'))
+
+    def test_keeps_referenced_values(self):
+        store = ReplyStore.for_plan(create_plan())
+        store.keep('1', MockedReply('{"token": "abc", "other": [1, 2]}',
+                                    200))
+        store.keep('2', MockedReply('<user><name>ann</name></user>', 200))
+        store.keep('3', MockedReply('{}', 200))
+        self.assertEqual(store.values,
+                         {'1': {('json', ('token',)): 'abc'},
+                          '2': {('xpath', '/user/name/text()'): 'ann'}})
+        self.assertEqual(store.get('1', 'json', ['token']), 'abc')
+        self.assertEqual(type(store.get('2', 'xpath', '/user/name/text()')),
+                         unicode)
+
+    def test_values_dropped_once_read(self):
+        store = ReplyStore.for_plan(create_plan())
+        store.keep('1', MockedReply('{"token": "abc"}', 200))
+        store.keep('2', MockedReply('<user><name>ann</name></user>', 200))
+        store.finished('2')
+        self.assertEqual(sorted(store.values), ['1', '2'])
+        store.finished('3')
+        self.assertEqual(store.values, {})
+
+    def test_values_kept_by_loops(self):
+        plan = create_plan()
+        plan.loops.append(('3', '1'))
+        store = ReplyStore.for_plan(plan)
+        store.keep('1', MockedReply('{"token": "abc"}', 200))
+        store.finished('3')
+        self.assertEqual(store.get('1', 'json', ['token']), 'abc')
+
+    def test_missing_values(self):
+        store = ReplyStore.for_plan(create_plan())
+        self.assertRaises(ReplyNotAvailable, store.get, '1', 'json',
+                          ['token'])
+        store.keep('1', MockedReply('{"user": "ann"}', 200))
+        self.assertRaises(TestError, store.get, '1', 'json', ['token'])
+
+    def test_path_not_matching_document(self):
+        store = ReplyStore({'1': set([('json', ('items', 99, 'name')),
+                                      ('json', ('items', 'name'))])})
+        store.keep('1', MockedReply('{"items": [{"name": "ann"}]}', 200))
+        self.assertRaises(TestError, store.get, '1', 'json',
+                          ['items', 99, 'name'])
+        self.assertRaises(TestError, store.get, '1', 'json',
+                          ['items', 'name'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import argparse
+
+from jitte.run import formats
+
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+class RunMethods(unittest.TestCase):
+
+    def test_import_is_light(self):
+        # a fresh interpreter, the tests themselves import everything
+        check = ('import sys, jitte.run; '
+                 'print(",".join(name for name in '
+                 '("requests", "lxml", "jinja2", "ijson") '
+                 'if name in sys.modules))')
+        env = dict(os.environ, PYTHONPATH=PACKAGE_ROOT)
+        output = subprocess.check_output([sys.executable, '-c', check],
+                                         env=env)
+        self.assertEqual(output.strip(), '')
+
+    def test_formats(self):
+        self.assertEqual(formats('html, jsonl'), ['html', 'jsonl'])
+        self.assertRaises(argparse.ArgumentTypeError, formats, 'pdf')
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from jitte.core.runner import Runner
+from jitte.core.sink import ResultSink
+from jitte.tests.mocks import MockedLogger
+
+
+class MockedSuite(object):
+    """
+    Add a result per step to the sink, one at a time, counting the suites
+    running at once.
+    """
+
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, testfile, steps):
+        self.testfile = testfile
+        self.steps = steps
+        self.replies = None
+
+    def run(self, concurrency=None, sink=None, row=None, replies=None):
+        cls = type(self)
+        with cls.lock:
+            cls.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+        self.replies = replies
+        for step in range(1, self.steps + 1):
+            time.sleep(0.01)
+            sink.add({'script': self.testfile, 'step': str(step),
+                      'result': 'OK', 'cause': ''})
+        with cls.lock:
+            cls.running -= 1
+        return sink
+
+
+class RunnerMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = Runner(MockedLogger(), None, 4)
+        self.root = tempfile.mkdtemp()
+        for path in ('a/test.json', 'a/payload.xml', 'b/c/other.json'):
+            path = os.path.join(self.root, path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_collect_directory(self):
+        expected = [os.path.join(self.root, 'a/test.json'),
+                    os.path.join(self.root, 'b/c/other.json')]
+        result = self.runner.collect([self.root])
+        self.assertEqual(result, expected)
+
+    def test_collect_glob(self):
+        expected = [os.path.join(self.root, 'a/test.json')]
+        result = self.runner.collect([os.path.join(self.root, '*/*.json')])
+        self.assertEqual(result, expected)
+
+    def test_collect_removes_duplicates(self):
+        path = os.path.join(self.root, 'a/test.json')
+        result = self.runner.collect([path, os.path.join(self.root, 'a')])
+        self.assertEqual(result, [path])
+
+    def test_collect_plain_file(self):
+        path = os.path.join(self.root, 'missing.json')
+        result = self.runner.collect([path])
+        self.assertEqual(result, [path])
+
+    def test_suites_results_merged(self):
+        MockedSuite.max_running = 0
+        suites = [MockedSuite('test{0}.json'.format(number), 5)
+                  for number in range(4)]
+        sink = ResultSink(MockedLogger(), self.root, 'now')
+        replies = {'test1.json': {}}
+        self.runner.run_suites(suites, sink, replies)
+        sink.close()
+        self.assertEqual(MockedSuite.max_running, 4)
+        results = list(sink.results())
+        self.assertEqual(len(results), 20)
+        for suite in suites:
+            steps = [result['step'] for result in results
+                     if result['script'] == suite.testfile]
+            # the steps of every script in the order they finished
+            self.assertEqual(steps, ['1', '2', '3', '4', '5'])
+        self.assertTrue(suites[1].replies is replies['test1.json'])
+        self.assertEqual(suites[0].replies, None)
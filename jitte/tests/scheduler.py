@@ -0,0 +1,63 @@
+import threading
+import unittest
+
+from jitte.core.plan import Step, Plan
+from jitte.core.scheduler import StepGraph, GraphScheduler
+from jitte.tests.mocks import MockedLogger
+
+
+def create_plan(edges):
+    steps = {}
+    for step_id, (next_steps, depends_on) in edges.items():
+        steps[step_id] = Step(step_id, 'get', 'http://localhost/', [], [], {},
+                              next=next_steps, depends_on=depends_on)
+    return Plan(steps)
+
+
+class StepGraphMethods(unittest.TestCase):
+
+    def test_branches(self):
+        plan = create_plan({'1': (['2', '3'], []),
+                            '2': (['4'], []),
+                            '3': (['4'], []),
+                            '4': ([], ['3'])})
+        graph = StepGraph(MockedLogger(), plan)
+        self.assertEqual(graph.dependencies['4'], ['3', '2'])
+        self.assertEqual(graph.parents['4'], '3')
+        self.assertEqual(graph.parents['1'], None)
+
+    def test_loop_is_not_followed(self):
+        plan = create_plan({'1': (['2'], []),
+                            '2': (['1'], [])})
+        graph = StepGraph(MockedLogger(), plan)
+        self.assertEqual(graph.dependencies, {'1': [], '2': ['1']})
+
+
+class GraphSchedulerMethods(unittest.TestCase):
+
+    def test_run_passes_parent_reply(self):
+        plan = create_plan({'1': (['2', '3'], []),
+                            '2': ([], []),
+                            '3': ([], [])})
+        graph = StepGraph(MockedLogger(), plan)
+        lock = threading.Lock()
+        seen = {}
+
+        def execute(step_id, p_reply):
+            with lock:
+                seen[step_id] = p_reply
+            return 'reply-' + step_id
+
+        executed = GraphScheduler(MockedLogger(), graph, 2).run(execute)
+        self.assertEqual(executed, 3)
+        self.assertEqual(seen, {'1': None, '2': 'reply-1', '3': 'reply-1'})
+
+    def test_dependency_cycle_is_not_executed(self):
+        plan = create_plan({'1': (['2', '3'], []),
+                            '2': ([], ['3']),
+                            '3': ([], ['2'])})
+        graph = StepGraph(MockedLogger(), plan)
+        executed = []
+        execute = lambda step_id, p_reply: executed.append(step_id)
+        GraphScheduler(MockedLogger(), graph).run(execute)
+        self.assertEqual(executed, ['1'])
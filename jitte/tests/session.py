@@ -0,0 +1,84 @@
+import shutil
+import tempfile
+import unittest
+
+from jitte.core.cache import HttpCache, CachingAdapter
+from jitte.core.cassette import Cassette, RecordingAdapter, ReplayAdapter
+from jitte.core.session import (ConnectionPool, TimedHTTPAdapter,
+                                RETRY_STATUS_CODES)
+from jitte.core.throttle import Throttle, ThrottlingAdapter
+from jitte.tests.mocks import MockedLogger
+
+
+def adapter_chain(session):
+    """
+    The classes of the adapters of a session, outermost first.
+    """
+    adapter = session.get_adapter('http://localhost/')
+    chain = [type(adapter)]
+    while getattr(adapter, 'adapter', None) is not None:
+        adapter = adapter.adapter
+        chain.append(type(adapter))
+    return chain
+
+
+class ConnectionPoolMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_retry_configuration(self):
+        pool = ConnectionPool(MockedLogger(), pool_size=4, retries=3,
+                              backoff=0.5)
+        adapter = pool.session.get_adapter('https://localhost/')
+        self.assertTrue(isinstance(adapter, TimedHTTPAdapter))
+        self.assertEqual(adapter._pool_maxsize, 4)
+        retry = adapter.max_retries
+        self.assertEqual(retry.total, 3)
+        self.assertEqual(retry.backoff_factor, 0.5)
+        self.assertEqual(retry.status_forcelist, RETRY_STATUS_CODES)
+        # the last reply is returned, its assumptions can still be checked
+        self.assertFalse(retry.raise_on_status)
+        pool.close()
+
+    def test_keep_alive(self):
+        pool = ConnectionPool(MockedLogger())
+        self.assertNotEqual(pool.session.headers.get('Connection'), 'close')
+        pool.close()
+        pool = ConnectionPool(MockedLogger(), keep_alive=False)
+        self.assertEqual(pool.session.headers['Connection'], 'close')
+        self.assertTrue(pool.session is pool.origin_session)
+        pool.close()
+
+    def test_adapters_order(self):
+        cassette = Cassette(self.root, record=True)
+        pool = ConnectionPool(MockedLogger(),
+                              cassette=cassette,
+                              cache=HttpCache(MockedLogger()),
+                              throttle=Throttle(MockedLogger(), rate=10))
+        # cached replies are neither recorded nor throttled, and retries
+        # happen below the throttle, as a single request
+        self.assertEqual(adapter_chain(pool.session),
+                         [CachingAdapter, RecordingAdapter,
+                          ThrottlingAdapter, TimedHTTPAdapter])
+        self.assertEqual(adapter_chain(pool.origin_session),
+                         [RecordingAdapter, ThrottlingAdapter,
+                          TimedHTTPAdapter])
+        pool.close()
+        cassette.close()
+
+    def test_replay_sends_nothing(self):
+        Cassette(self.root, record=True).close()
+        pool = ConnectionPool(MockedLogger(),
+                              cassette=Cassette(self.root),
+                              throttle=Throttle(MockedLogger(), rate=10))
+        self.assertEqual(adapter_chain(pool.origin_session),
+                         [ReplayAdapter])
+        pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
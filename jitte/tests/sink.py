@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jitte.core.sink import ResultSink
+from jitte.tests.mocks import MockedLogger
+
+
+class ResultSinkMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.result_path = os.path.join(self.root, 'results')
+        self.sink = ResultSink(MockedLogger(), self.result_path, 'now')
+        self.results = [{'step': '1', 'result': 'OK', 'cause': ''},
+                        {'step': '2', 'result': 'FAILED', 'cause': 'bad'}]
+        for result in self.results:
+            self.sink.add(result)
+        self.sink.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_results_written_as_json_lines(self):
+        path = os.path.join(self.result_path, 'result-now.jsonl')
+        with open(path, 'r') as file_obj:
+            self.assertEqual(len(file_obj.readlines()), 2)
+
+    def test_results_read_back_every_time(self):
+        results = self.sink.results()
+        self.assertEqual(list(results), self.results)
+        self.assertEqual(list(results), self.results)
+
+    def test_summary_from_counters(self):
+        summary = self.sink.create_summary('title')
+        self.assertEqual(summary['total'], 2)
+        self.assertEqual(summary['pass'], 1)
+        self.assertEqual(summary['fail'], 1)
+        self.assertEqual(summary['fail_pct'], '50.00%')
+        self.assertEqual(list(summary['tests']), self.results)
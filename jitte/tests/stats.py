@@ -0,0 +1,64 @@
+import unittest
+
+from jitte.core.stats import Histogram, StepStats, SuiteStats
+
+
+class HistogramMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.histogram = Histogram()
+        for millis in range(1, 1001):
+            self.histogram.record(millis / 1000.0)
+
+    def test_percentile_precision(self):
+        for percent, expected in ((50.0, 0.5), (90.0, 0.9), (99.0, 0.99)):
+            result = self.histogram.percentile(percent)
+            self.assertAlmostEqual(result, expected, delta=expected / 100)
+
+    def test_percentile_capped_by_max(self):
+        self.assertEqual(self.histogram.percentile(100.0), 1.0)
+
+    def test_empty_histogram(self):
+        self.assertEqual(Histogram().percentile(50.0), 0.0)
+        self.assertEqual(Histogram().mean(), 0.0)
+
+    def test_merge(self):
+        other = Histogram()
+        other.record(5.0)
+        self.histogram.merge(other)
+        self.assertEqual(self.histogram.count, 1001)
+        self.assertEqual(self.histogram.max, 5000000)
+        self.assertEqual(self.histogram.min, 1000)
+
+
+class StepStatsMethods(unittest.TestCase):
+
+    def test_as_result_keeps_first_failure(self):
+        stats = StepStats('1', 'http://localhost/')
+        stats.record({'duration': '0.10000', 'result': 'OK', 'cause': ''})
+        stats.record({'duration': '0.20000', 'result': 'FAILED',
+                      'cause': 'first'})
+        stats.record({'duration': '0.30000', 'result': 'FAILED',
+                      'cause': 'second'})
+        result = stats.as_result(1.0)
+        self.assertEqual(result['result'], 'FAILED')
+        self.assertEqual(result['cause'],
+                         '2 of 3 failed. First failure: first')
+        self.assertEqual(result['latency']['throughput'], '3.00')
+        self.assertEqual(result['latency']['error_rate'], '66.67%')
+
+
+class SuiteStatsMethods(unittest.TestCase):
+
+    def test_steps_in_order_first_run(self):
+        stats = SuiteStats()
+        stats.record([{'step': '2', 'url': 'http://localhost/b',
+                       'duration': '0.1', 'result': 'OK', 'cause': ''}])
+        stats.record([{'step': '1', 'url': 'http://localhost/a',
+                       'duration': '0.1', 'result': 'OK', 'cause': ''},
+                      {'step': '2', 'url': 'http://localhost/b',
+                       'duration': '0.3', 'result': 'OK', 'cause': ''}])
+        results = stats.as_results(1.0)
+        self.assertEqual([result['step'] for result in results], ['2', '1'])
+        self.assertEqual(results[0]['latency']['count'], 2)
+        self.assertEqual(results[0]['duration'], '0.20000')
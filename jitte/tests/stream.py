@@ -0,0 +1,57 @@
+import io
+import unittest
+
+from jitte.core import stream
+from jitte.core.stream import TextScanner, find_json_paths
+from jitte.core.exceptions import TestError
+
+
+class TextScannerMethods(unittest.TestCase):
+
+    def scan(self, condition, expected, chunks):
+        scanner = TextScanner(condition, expected)
+        for chunk in chunks:
+            scanner.feed(chunk)
+        return scanner.result()
+
+    def test_in_across_chunks(self):
+        self.assertTrue(self.scan('in', 'needle', ['hay ne', 'edle hay']))
+        self.assertFalse(self.scan('nin', 'needle', ['hay ne', 'edle hay']))
+
+    def test_not_in(self):
+        self.assertFalse(self.scan('in', 'needle', ['hay', 'stack']))
+        self.assertTrue(self.scan('nin', 'needle', ['hay', 'stack']))
+
+    def test_eq(self):
+        self.assertTrue(self.scan('eq', 'haystack', ['hay', 'stack']))
+        self.assertFalse(self.scan('eq', 'haystack', ['hay', 'stacks']))
+        self.assertFalse(self.scan('eq', 'haystack', ['hay']))
+        self.assertTrue(self.scan('neq', 'haystack', ['hay']))
+
+
+class FindJsonPathsMethods(unittest.TestCase):
+
+    source = '{"a": [1, {"b": [2, 3]}], "args": {"x": "1"}, "n": null}'
+    paths = [['args', 'x'], ['a', 1, 'b', 1], ['a', 1], ['n'], ['missing']]
+    expected = {('args', 'x'): '1',
+                ('a', 1, 'b', 1): 3,
+                ('a', 1): {'b': [2, 3]},
+                ('n',): None}
+
+    def test_find(self):
+        result = find_json_paths(io.BytesIO(self.source), self.paths)
+        self.assertEqual(result, self.expected)
+
+    def test_find_without_ijson(self):
+        ijson, stream.ijson = stream.ijson, None
+        try:
+            result = find_json_paths(io.BytesIO(self.source), self.paths)
+        finally:
+            stream.ijson = ijson
+        self.assertEqual(result, self.expected)
+
+    def test_invalid_json(self):
+        self.assertRaises(TestError,
+                          find_json_paths,
+                          io.BytesIO('{"a": this}'),
+                          [['a']])
@@ -1,10 +1,48 @@
 import unittest
 
+import requests
+
 from jitte.core.testcase import TestCase
+from jitte.core.stream import StreamLimits
+from jitte.core.reply import Reply, StreamedReply
+from jitte.core.replystore import ReplyStore
 from jitte.core.exceptions import TestError, ReplyNotAvailable
 from jitte.tests.mocks import MockedLogger, MockedReply
 
 
+class StreamedResponse(object):
+    """
+    A streamed response sending its chunks, then breaking the connection
+    when `broken`.
+    """
+
+    def __init__(self, chunks, status_code=200, broken=False):
+        self.chunks = chunks
+        self.status_code = status_code
+        self.broken = broken
+        self.encoding = 'utf-8'
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for chunk in self.chunks:
+            yield chunk
+        if self.broken:
+            raise requests.exceptions.ChunkedEncodingError(
+                'Connection broken: IncompleteRead')
+
+    def close(self):
+        self.closed = True
+
+
+class ResponseSession(object):
+
+    def __init__(self, response):
+        self.response = response
+
+    def request(self, method, url, **kwargs):
+        return self.response
+
+
 class TestCaseMethods(unittest.TestCase):
 
     def setUp(self):
@@ -96,6 +134,36 @@ class TestCaseMethods(unittest.TestCase):
                                        reply)
         self.assertEqual(result, False)
 
+    def test_process_reply_reports_every_failure(self):
+        assume = [{'type': 'status_code', 'pass_if': 'eq',
+                   'expected': '200', 'got': None},
+                  {'type': 'json', 'pass_if': 'eq', 'expected': 'that',
+                   'got': ['tree', 'leaf']},
+                  {'type': 'json', 'pass_if': 'eq', 'expected': 'this',
+                   'got': ['tree', 'missing']},
+                  {'type': 'text', 'pass_if': 'in', 'expected': 'tree',
+                   'got': None},
+                  {'type': 'text', 'pass_if': 'in', 'expected': 'bush',
+                   'got': None}]
+        test_case = TestCase(MockedLogger(),
+                             'get',
+                             'http://www.google.com/',
+                             assume,
+                             [],
+                             {},
+                             None)
+        reply = Reply(MockedReply('{"tree": {"leaf": "this"}}', 200))
+        result = test_case._process_reply(reply)
+        self.assertEqual(result['assumption'], assume[1])
+        self.assertEqual(result['got'], reply.text)
+        self.assertEqual(result['failures'],
+                         [{'assumption': assume[1], 'got': 'this'},
+                          {'assumption': assume[2]},
+                          {'assumption': assume[4]}])
+        self.assertEqual(test_case._process_reply(Reply(
+            MockedReply('{"tree": {"leaf": "that", "missing": "this"}, '
+                        '"bush": 1}', 200))), None)
+
     def test_check_xpath_pass(self):
         xml = '<xml><tree><branch><leaf>this</leaf></branch></tree></xml>'
         reply = MockedReply(xml, 200)
@@ -153,3 +221,97 @@ class TestCaseMethods(unittest.TestCase):
                                        None,
                                        reply)
         self.assertEqual(result, False)
+
+    def test_find_by_xpath_invalid_expression(self):
+        source = '<xml><tree><branch><leaf>this</leaf></branch></tree></xml>'
+        xpath = '//leaf[text('
+        expected = TestError
+        self.assertRaises(expected,
+                          self.test_case._find_by_xpath,
+                          source,
+                          xpath)
+
+    def test_parse_value_row(self):
+        test_case = TestCase(MockedLogger(),
+                             'get',
+                             'http://www.google.com/${uid}',
+                             [],
+                             [],
+                             {'X-User': '${name}'},
+                             None,
+                             row={'uid': '1', 'name': 'ann'})
+        self.assertEqual(test_case.url, 'http://www.google.com/1')
+        self.assertEqual(test_case.headers, {'X-User': 'ann'})
+        self.assertEqual(test_case._parse_value('row', 'name'), 'ann')
+        self.assertRaises(TestError,
+                          test_case._parse_value,
+                          'row',
+                          'missing')
+
+    def test_parse_value_from_store(self):
+        store = ReplyStore({'1': set([('json', ('token',))])})
+        test_case = TestCase(MockedLogger(),
+                             'get',
+                             'http://www.google.com/',
+                             [],
+                             [],
+                             {},
+                             None,
+                             store=store)
+        self.assertRaises(ReplyNotAvailable,
+                          test_case._parse_value,
+                          'json',
+                          ['token'],
+                          '1')
+        store.keep('1', MockedReply('{"token": "abc"}', 200))
+        self.assertEqual(test_case._parse_value('json', ['token'], '1'),
+                         'abc')
+        self.assertTrue(test_case._check('json', 'eq', 'abc', ['token'],
+                                         MockedReply('{}', 200), '1'))
+
+
+class StreamedTestCaseMethods(unittest.TestCase):
+
+    def invoke(self, response, assume, keep_reply=True):
+        return TestCase(MockedLogger(), 'get', 'http://www.google.com/',
+                        assume, [], {}, None, ResponseSession(response),
+                        StreamLimits(), keep_reply=keep_reply).invoke()
+
+    def test_broken_body_fails_step(self):
+        response = StreamedResponse(['{"a": '], broken=True)
+        result = self.invoke(response, [{'type': 'text', 'pass_if': 'in',
+                                         'expected': 'a', 'got': None}])
+        self.assertEqual(result['result'], 'FAILED')
+        self.assertEqual(result['cause'], 'Request failed: Connection '
+                                          'broken: IncompleteRead')
+        self.assertTrue(response.closed)
+
+    def test_unread_body_closed(self):
+        assume = [{'type': 'status_code', 'pass_if': 'eq',
+                   'expected': '200', 'got': None}]
+        response = StreamedResponse(['{}'])
+        result = self.invoke(response, assume, keep_reply=False)
+        self.assertEqual(result['result'], 'OK')
+        self.assertTrue(response.closed)
+        response = StreamedResponse(['error'], status_code=500)
+        self.invoke(response, [], keep_reply=False)
+        self.assertTrue(response.closed)
+
+    def test_excerpt_of_multibyte_body(self):
+        body = u'caf\xe9 \u20ac'.encode('utf-8')
+        reply = StreamedReply(StreamedResponse([body[:4], body[4:]]),
+                              StreamLimits(excerpt_size=6))
+        reply.consume()
+        self.assertEqual(reply.excerpt, u'caf\xe9 \u20ac')
+        reply = StreamedReply(StreamedResponse([body]),
+                              StreamLimits(excerpt_size=5))
+        reply.consume()
+        self.assertEqual(reply.excerpt, u'caf\xe9 ...')
+
+    def test_kept_reply_read(self):
+        assume = [{'type': 'status_code', 'pass_if': 'eq',
+                   'expected': '200', 'got': None}]
+        response = StreamedResponse(['{"token": ', '"abc"}'])
+        result = self.invoke(response, assume)
+        self.assertTrue(response.closed)
+        self.assertEqual(result['reply'].json(), {'token': 'abc'})
@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from jitte.core.testsuite import TestSuite
+from jitte.core.policy import RunPolicy
+from jitte.core.exceptions import InvalidConfiguration
+from jitte.tests.mocks import MockedLogger
+
+
+def create_step(**kwargs):
+    step = {'url': 'http://localhost/',
+            'method': 'GET',
+            'assume': [{'type': 'status_code', 'expected': '200'}]}
+    step.update(kwargs)
+    return step
+
+
+class TestSuiteMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def create_suite(self, tests, policy=None):
+        path = os.path.join(self.root, 'test.json')
+        with open(path, 'w') as file_obj:
+            json.dump(tests, file_obj)
+        return TestSuite(MockedLogger(), path, policy=policy)
+
+    def test_compile_reachable_steps(self):
+        suite = self.create_suite({'1': create_step(next='2'),
+                                   '2': create_step(),
+                                   '3': create_step(method='INVALID')})
+        self.assertEqual(sorted(suite.plan.steps), ['1', '2'])
+        self.assertEqual(suite.plan.steps['1'].method, 'get')
+        self.assertEqual(suite.plan.steps['1'].next, ('2',))
+
+    def test_compile_detects_loops(self):
+        suite = self.create_suite({'1': create_step(next='2'),
+                                   '2': create_step(next='1')})
+        self.assertEqual(suite.plan.loops, [('2', '1')])
+
+    def test_compile_missing_step(self):
+        self.assertRaises(InvalidConfiguration,
+                          self.create_suite,
+                          {'1': create_step(next='2')})
+
+    def test_compile_unreachable_dependency(self):
+        self.assertRaises(InvalidConfiguration,
+                          self.create_suite,
+                          {'1': create_step(depends_on='2'),
+                           '2': create_step()})
+
+    def test_compile_reply_sources(self):
+        send_data = [{'param_name': {'value': 'token'},
+                      'param_value': {'type': 'json', 'value': ['token'],
+                                      'from': '1'}}]
+        suite = self.create_suite({'1': create_step(next='2'),
+                                   '2': create_step(send_data=send_data)})
+        self.assertEqual(suite.plan.steps['2'].data[0]['param_value'],
+                         {'type': 'json', 'value': ['token'], 'from': '1'})
+        # step 2 is not reachable, its reply never exists
+        self.assertRaises(InvalidConfiguration,
+                          self.create_suite,
+                          {'1': create_step(next='3'),
+                           '2': create_step(),
+                           '3': create_step(send_data=[dict(
+                               send_data[0],
+                               param_value={'type': 'json',
+                                            'value': ['token'],
+                                            'from': '2'})])})
+        send_data[0]['param_value']['type'] = 'static'
+        self.assertRaises(InvalidConfiguration,
+                          self.create_suite,
+                          {'1': create_step(next='2'),
+                           '2': create_step(send_data=send_data)})
+
+    def test_compile_reply_source_runs_before(self):
+        def reading(source, **kwargs):
+            send_data = [{'param_name': {'value': 'token'},
+                          'param_value': {'type': 'json',
+                                          'value': ['token'],
+                                          'from': source}}]
+            return create_step(send_data=send_data, **kwargs)
+
+        for tests in ({'1': create_step(next='2'),
+                       '2': reading('3', next='3'),
+                       '3': create_step()},
+                      {'1': create_step(next=['2', '3']),
+                       '2': reading('3'),
+                       '3': create_step()},
+                      {'1': create_step(next='2'),
+                       '2': reading('2')}):
+            self.assertRaises(InvalidConfiguration, self.create_suite, tests)
+        suite = self.create_suite({'1': create_step(next=['2', '3']),
+                                   '2': create_step(),
+                                   '3': reading('2', depends_on='2')})
+        self.assertEqual(suite.plan.ancestors()['3'], set(['1', '2']))
+
+    def test_compile_reads_files_once(self):
+        path = os.path.join(self.root, 'payload.xml')
+        with open(path, 'w') as file_obj:
+            file_obj.write('<xml/>')
+        data = [{'param_value': {'type': 'file', 'value': path}}]
+        suite = self.create_suite({'1': create_step(send_data=data)})
+        os.remove(path)
+        step = suite.plan.steps['1']
+        self.assertEqual(step.data[0]['param_value']['value'], '<xml/>')
+
+    def test_step_is_immutable(self):
+        suite = self.create_suite({'1': create_step()})
+        step = suite.plan.steps['1']
+        self.assertRaises(AttributeError, setattr, step, 'url', 'other')
+
+    def test_assumptions_cheapest_first(self):
+        assume = [{'type': 'xpath', 'got': '/a/text()', 'expected': 'a'},
+                  {'type': 'text', 'expected': 'a', 'pass_if': 'in'},
+                  {'type': 'status_code', 'expected': '200'}]
+        suite = self.create_suite({'1': create_step(assume=assume)})
+        types = [assumption['type']
+                 for assumption in suite.plan.steps['1'].assume]
+        self.assertEqual(types, ['status_code', 'text', 'xpath'])
+
+    def test_fail_fast_skips_remaining_steps(self):
+        # nothing listens on port 1, the first request fails at once
+        suite = self.create_suite({'1': create_step(url='http://127.0.0.1:1/',
+                                                    next='2'),
+                                   '2': create_step()},
+                                  RunPolicy(fail_fast=True))
+        results = suite.run()
+        self.assertEqual([result['result'] for result in results],
+                         ['FAILED', 'SKIPPED'])
@@ -0,0 +1,224 @@
+import io
+import threading
+import time
+import unittest
+
+import requests
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+from jitte.core.testcase import TestCase
+from jitte.core.throttle import (Throttle, TokenBucket, ConcurrencyLimit,
+                                 CircuitBreaker, CircuitOpen)
+from jitte.tests.mocks import MockedLogger
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class HostAdapter(BaseAdapter):
+    """
+    Reply with the next status of the list, a None status is a connection
+    error.
+    """
+
+    def __init__(self, statuses, delay=0):
+        super(HostAdapter, self).__init__()
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        time.sleep(self.delay)
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status is None:
+            raise requests.exceptions.ConnectionError('Connection refused')
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.raw = io.BytesIO()
+        response.status_code = status
+        response._content = ''
+        return response
+
+    def close(self):
+        pass
+
+
+class TokenBucketMethods(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        clock = Clock()
+        bucket = TokenBucket(2, burst=3, clock=clock, sleep=clock.sleep)
+        delays = [bucket.acquire() for _ in range(5)]
+        self.assertEqual(delays, [0.0, 0.0, 0.0, 0.5, 0.5])
+        self.assertEqual(clock.now, 1001.0)
+
+    def test_idle_refills_up_to_burst(self):
+        clock = Clock()
+        bucket = TokenBucket(1, burst=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+        clock.now += 10
+        delays = [bucket.acquire() for _ in range(3)]
+        self.assertEqual(delays, [0.0, 0.0, 1.0])
+
+
+class ConcurrencyLimitMethods(unittest.TestCase):
+
+    def test_halved_once_on_overload(self):
+        limit = ConcurrencyLimit(8)
+        tickets = [limit.acquire() for _ in range(4)]
+        self.assertEqual(limit.in_flight, 4)
+        limit.release(tickets[0], 0.1, 503)
+        self.assertEqual(limit.limit, 4)
+        # sent before the decrease, doesn't decrease it again
+        limit.release(tickets[1], 0.1, 429)
+        self.assertEqual(limit.limit, 4)
+        self.assertEqual(limit.decreases, 1)
+        limit.release(limit.acquire(), 0.1, 429)
+        self.assertEqual(limit.limit, 2)
+        self.assertEqual(limit.in_flight, 2)
+
+    def test_slow_reply_is_overload(self):
+        limit = ConcurrencyLimit(4)
+        limit.release(limit.acquire(), 0.1, 200)
+        self.assertEqual(limit.limit, 4)
+        limit.release(limit.acquire(), 1.0, 200)
+        self.assertEqual(limit.limit, 2)
+
+    def test_grows_back_to_maximum(self):
+        limit = ConcurrencyLimit(4, minimum=1)
+        limit.release(limit.acquire(), 0.1, 503)
+        limit.release(limit.acquire(), 0.1, 503)
+        self.assertEqual(limit.limit, 1)
+        for _ in range(20):
+            limit.release(limit.acquire(), 0.1, 200)
+        self.assertEqual(limit.limit, 4)
+
+    def test_fixed_limit(self):
+        limit = ConcurrencyLimit(4, adaptive=False)
+        limit.release(limit.acquire(), 0.1, 503)
+        self.assertEqual(limit.limit, 4)
+        self.assertEqual(limit.in_flight, 0)
+
+
+class CircuitBreakerMethods(unittest.TestCase):
+
+    def test_trips_and_resets(self):
+        clock = Clock()
+        breaker = CircuitBreaker(2, reset_timeout=10, clock=clock)
+        breaker.failure()
+        breaker.check('host')
+        breaker.failure()
+        with self.assertRaises(CircuitOpen) as context:
+            breaker.check('host')
+        self.assertEqual(str(context.exception),
+                         'Circuit open for host after 2 failed requests in '
+                         'a row, retrying in 10.0s')
+        clock.now += 10
+        # a single trial request goes through
+        breaker.check('host')
+        self.assertRaises(CircuitOpen, breaker.check, 'host')
+        breaker.success()
+        breaker.check('host')
+        self.assertEqual(breaker.trips, 1)
+
+    def test_failed_trial_opens_again(self):
+        clock = Clock()
+        breaker = CircuitBreaker(1, reset_timeout=10, clock=clock)
+        breaker.failure()
+        clock.now += 10
+        breaker.check('host')
+        breaker.failure()
+        clock.now += 5
+        self.assertRaises(CircuitOpen, breaker.check, 'host')
+        self.assertEqual(breaker.trips, 1)
+
+    def test_check_without_trial(self):
+        clock = Clock()
+        breaker = CircuitBreaker(1, reset_timeout=10, clock=clock)
+        breaker.failure()
+        clock.now += 10
+        breaker.check('host', trial=False)
+        breaker.check('host')
+        self.assertRaises(CircuitOpen, breaker.check, 'host')
+        self.assertEqual(breaker.trips, 1)
+
+
+class ThrottleMethods(unittest.TestCase):
+
+    def session(self, throttle, statuses, delay=0):
+        self.origin = HostAdapter(statuses, delay)
+        session = requests.Session()
+        session.mount('http://', throttle.adapter(self.origin))
+        return session
+
+    def test_tripped_host_fails_at_once(self):
+        throttle = Throttle(MockedLogger(), breaker_failures=2)
+        session = self.session(throttle, [None, 503])
+        self.assertRaises(requests.exceptions.ConnectionError,
+                          session.get, 'http://down:8080/a')
+        self.assertEqual(session.get('http://down:8080/b').status_code, 503)
+        self.assertRaises(CircuitOpen, session.get, 'http://down:8080/c')
+        self.assertEqual(len(self.origin.sent), 2)
+        # other hosts have their own circuit
+        self.assertEqual(session.get('http://up/').status_code, 200)
+
+    def test_queued_requests_fail_once_tripped(self):
+        throttle = Throttle(MockedLogger(), concurrency=1,
+                            breaker_failures=2)
+        session = self.session(throttle, [None] * 8, delay=0.05)
+        errors = []
+
+        def get():
+            try:
+                session.get('http://down/')
+            except requests.exceptions.RequestException as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.origin.sent), 2)
+        self.assertEqual(len([exc for exc in errors
+                              if isinstance(exc, CircuitOpen)]), 6)
+        self.assertEqual(throttle.host('down').limit.in_flight, 0)
+
+    def test_step_failed_with_circuit_cause(self):
+        throttle = Throttle(MockedLogger(), breaker_failures=1)
+        session = self.session(throttle, [None])
+        results = [TestCase(MockedLogger(), 'get', 'http://down/', [], [],
+                            {}, None, session=session).invoke()
+                   for _ in range(2)]
+        self.assertEqual(results[0]['cause'],
+                         'Request failed: Connection refused')
+        self.assertTrue(results[1]['cause'].startswith(
+            'Request failed: Circuit open for down after 1 failed requests'))
+        self.assertEqual(len(self.origin.sent), 1)
+
+    def test_overload_backs_off_per_host(self):
+        throttle = Throttle(MockedLogger(), concurrency=4, adaptive=True)
+        session = self.session(throttle, [429, 200])
+        session.get('http://busy/')
+        session.get('http://idle/')
+        self.assertEqual(throttle.host('busy').limit.limit, 2)
+        self.assertEqual(throttle.host('idle').limit.limit, 4)
+        self.assertEqual(throttle.host('busy').limit.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
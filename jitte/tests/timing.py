@@ -0,0 +1,81 @@
+import unittest
+
+from jitte.core.timing import Timings, NullTimings, connection_phases
+from jitte.core.testcase import TestCase
+from jitte.tests.mocks import MockedLogger, MockedReply
+
+
+class MockedResponse(MockedReply):
+
+    content = ''
+
+
+class MockedSession(object):
+
+    def __init__(self, text):
+        self.text = text
+
+    def request(self, method, url, **kwargs):
+        # a new connection of the pool reports its setup time
+        connection_phases.record('connect', 0.0)
+        return MockedResponse(self.text, 200)
+
+
+class TimingsMethods(unittest.TestCase):
+
+    def test_record_accumulates(self):
+        timings = Timings()
+        timings.record('parse', 0.25)
+        timings.record('parse', 0.5)
+        self.assertEqual(timings.as_dict()['parse'], '0.75000')
+
+    def test_as_dict_phase_order(self):
+        timings = Timings()
+        with timings.measure('prepare'):
+            pass
+        timings.record_assumption(0.001)
+        result = timings.as_dict()
+        self.assertEqual(sorted(result), ['assumptions', 'prepare'])
+        self.assertEqual(result['assumptions'], ['0.00100'])
+
+    def test_null_timings(self):
+        timings = NullTimings()
+        with timings.measure('prepare'):
+            timings.record('parse', 1.0)
+        self.assertFalse(timings.enabled)
+
+
+class TestCaseTimings(unittest.TestCase):
+
+    def create_test_case(self, timings):
+        assume = [{'type': 'json',
+                   'pass_if': 'eq',
+                   'expected': 'this',
+                   'got': ['leaf']},
+                  {'type': 'status_code',
+                   'pass_if': 'eq',
+                   'expected': '200',
+                   'got': None}]
+        return TestCase(MockedLogger(),
+                        'get',
+                        'http://localhost/',
+                        assume,
+                        [],
+                        {},
+                        None,
+                        MockedSession('{"leaf": "this"}'),
+                        timings=timings)
+
+    def test_phases_reported(self):
+        result = self.create_test_case(True).invoke()
+        self.assertEqual(result['result'], 'OK')
+        timings = result['timings']
+        for phase in ('prepare', 'connect', 'ttfb', 'body', 'parse'):
+            self.assertTrue(phase in timings)
+        self.assertFalse('tls' in timings)
+        self.assertEqual(len(timings['assumptions']), 2)
+
+    def test_no_timings_by_default(self):
+        result = self.create_test_case(False).invoke()
+        self.assertEqual(result['result'], 'OK')
+        self.assertFalse('timings' in result)
@@ -0,0 +1,143 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from jitte.core.exceptions import InvalidConfiguration
+from jitte.core.testsuite import TestSuite
+from jitte.core.validate import ScriptValidator
+from jitte.tests.mocks import MockedLogger
+from jitte.tests.testsuite import create_step
+
+
+class ScriptValidatorMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def validate(self, tests, dataset_fields=None):
+        path = os.path.join(self.root, 'test.json')
+        with open(path, 'w') as file_obj:
+            json.dump(tests, file_obj)
+        return ScriptValidator(MockedLogger(), path,
+                               dataset_fields).validate()
+
+    def test_valid_script(self):
+        errors = self.validate({'1': create_step(next=['2', '3']),
+                                '2': create_step(),
+                                '3': create_step(depends_on='2')})
+        self.assertEqual(errors, [])
+
+    def test_reports_every_error(self):
+        errors = self.validate({
+            '1': create_step(method='FETCH', next='2', headers=[]),
+            '2': create_step(url=None, assume=[{'type': 'xpath',
+                                                'got': '//a[',
+                                                'expected': 'x'}]),
+            '3': create_step(assume=[])})
+        self.assertEqual(len(errors), 6)
+        self.assertTrue(errors[0].startswith('Method "FETCH"'))
+        self.assertTrue(errors[1].startswith('Invalid request header'))
+        self.assertTrue(errors[2].startswith('URL not specified'))
+        self.assertTrue(errors[3].startswith('Invalid XPath //a['))
+        self.assertTrue(errors[4].startswith('No assumptions found'))
+        self.assertEqual(errors[5], 'Step 3 is unreachable from step 1.')
+
+    def test_invalid_json(self):
+        path = os.path.join(self.root, 'test.json')
+        with open(path, 'w') as file_obj:
+            file_obj.write('{"1": ')
+        errors = ScriptValidator(MockedLogger(), path).validate()
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith('Invalid test configuration'))
+
+    def test_malformed_step(self):
+        errors = self.validate({'1': create_step(send_data=['name'])})
+        self.assertEqual(errors, ['Invalid step 1.'])
+
+    def test_missing_file(self):
+        errors = self.validate({'1': create_step(assume=[
+            {'type': 'file', 'expected': os.path.join(self.root, 'none')}])})
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith('Unable to open'))
+
+    def test_graph_errors(self):
+        errors = self.validate({'1': create_step(next=['2', '4']),
+                                '2': create_step(next='1'),
+                                '3': create_step(),
+                                '5': create_step(depends_on='3')})
+        self.assertEqual(errors, [
+            'Step 1 has next step 4, which is not found.',
+            'Step 3 is unreachable from step 1.',
+            'Step 5 is unreachable from step 1.',
+            'Step 2 loops back to step 1 with "next" and never ends.'])
+
+    def test_dependency_cycle(self):
+        errors = self.validate({'1': create_step(next=['2', '3']),
+                                '2': create_step(depends_on='3'),
+                                '3': create_step(depends_on='2')})
+        self.assertEqual(errors, ['Steps 2 -> 3 -> 2 depend on each other '
+                                  'and never run.'])
+
+    def test_unreachable_dependency(self):
+        errors = self.validate({'1': create_step(depends_on='2'),
+                                '2': create_step()})
+        self.assertEqual(errors, ['Step 2 is unreachable from step 1.',
+                                  'Step 1 depends on unreachable step 2.'])
+
+    def test_previous_reply_in_first_step(self):
+        send_data = [{'param_name': {'value': 'id'},
+                      'param_value': {'type': 'json', 'value': ['id']}}]
+        errors = self.validate({'1': create_step(send_data=send_data,
+                                                 next='2'),
+                                '2': create_step(send_data=send_data)})
+        self.assertEqual(errors, ['Step 1 sends a value of the previous '
+                                  'reply, but runs first.'])
+
+    def test_reply_source_runs_before(self):
+        def reading(source, **kwargs):
+            assume = [{'type': 'json', 'got': ['id'], 'expected': '1',
+                       'from': source}]
+            return create_step(assume=assume, **kwargs)
+
+        errors = self.validate({'1': create_step(next=['2', '3']),
+                                '2': reading('3', next='4'),
+                                '3': create_step(),
+                                '4': reading('4')})
+        self.assertEqual(errors, [
+            'Step 2 reads the reply of step 3, which does not run before it.',
+            'Step 4 reads the reply of step 4, which does not run before '
+            'it.'])
+        self.assertEqual(self.validate({'1': create_step(next='2'),
+                                        '2': reading('1')}), [])
+
+    def test_reply_source_agrees_with_plan(self):
+        assume = [{'type': 'json', 'got': ['id'], 'expected': '1',
+                   'from': '2'}]
+        # step 2 runs before step 1 again, but only by looping back
+        tests = {'1': create_step(next='2', assume=assume),
+                 '2': create_step(next=['1', '3']),
+                 '3': create_step(assume=assume)}
+        errors = self.validate(tests)
+        path = os.path.join(self.root, 'test.json')
+        with self.assertRaises(InvalidConfiguration) as context:
+            TestSuite(MockedLogger(), path)
+        self.assertEqual(errors[-1], str(context.exception))
+        self.assertEqual(errors[-1], 'Step 1 reads the reply of step 2, '
+                                     'which does not run before it.')
+
+    def test_dataset_fields(self):
+        send_data = [{'param_name': {'value': 'user'},
+                      'param_value': {'type': 'row', 'value': 'uid'}}]
+        tests = {'1': create_step(send_data=send_data)}
+        self.assertEqual(len(self.validate(tests)), 1)
+        self.assertEqual(len(self.validate(tests, set(['name']))), 1)
+        self.assertEqual(self.validate(tests, set(['uid'])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
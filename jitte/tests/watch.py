@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from jitte.core.policy import RunPolicy
+from jitte.core.runner import Runner
+from jitte.core.sink import ResultList
+from jitte.core.watch import Watcher
+from jitte.tests.mocks import MockedLogger
+
+
+def create_script(path, second_status):
+    # nothing listens on port 1, every request fails at once
+    step = {'url': 'http://127.0.0.1:1/',
+            'method': 'GET',
+            'assume': [{'type': 'status_code', 'expected': '200'}]}
+    script = {'1': dict(step, next='2'),
+              '2': dict(step, assume=[{'type': 'status_code',
+                                       'expected': second_status}])}
+    with open(path, 'w') as file_obj:
+        json.dump(script, file_obj)
+    # modification times may be as coarse as a second
+    mtime = time.time() + len(second_status)
+    os.utime(path, (mtime, mtime))
+
+
+class WatcherMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.first = os.path.join(self.root, 'first.json')
+        self.second = os.path.join(self.root, 'second.json')
+        create_script(self.first, '200')
+        create_script(self.second, '200')
+        self.watcher = Watcher(MockedLogger(),
+                               Runner(MockedLogger(), None),
+                               [self.root])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_first_round_runs_everything(self):
+        self.assertEqual(self.watcher.run_round(ResultList()),
+                         [self.first, self.second])
+        self.assertEqual(self.watcher.changed(), [])
+
+    def test_changed_script_reuses_unmodified_steps(self):
+        self.watcher.run_round(ResultList())
+        create_script(self.first, '201')
+        self.assertEqual(self.watcher.changed(), [self.first])
+
+        results = ResultList()
+        self.assertEqual(self.watcher.run_round(results), [self.first])
+        reused = [(result['script'], result['step'])
+                  for result in results if result.get('reused')]
+        self.assertEqual(reused, [(self.first, '1')])
+        # the unchanged script is reported again without running
+        self.assertEqual(len(results), 4)
+
+    def test_invalid_script_not_run(self):
+        self.watcher.run_round(ResultList())
+        with open(self.second, 'w') as file_obj:
+            file_obj.write('{')
+        results = ResultList()
+        self.assertEqual(self.watcher.run_round(results), [])
+        self.assertEqual([result['script'] for result in results],
+                         [self.first, self.first])
+
+    def test_fail_fast_starts_over_every_round(self):
+        self.watcher = Watcher(MockedLogger(),
+                               Runner(MockedLogger(), None,
+                                      policy=RunPolicy(fail_fast=True)),
+                               [self.root])
+        results = ResultList()
+        self.watcher.run_round(results)
+        self.assertEqual([result['result'] for result in results],
+                         ['FAILED', 'SKIPPED', 'SKIPPED', 'SKIPPED'])
+        create_script(self.second, '201')
+        results = ResultList()
+        self.assertEqual(self.watcher.run_round(results), [self.second])
+        # the failed step of the first script is reported, not counted
+        self.assertEqual([(result['script'], result['result'])
+                          for result in results],
+                         [(self.first, 'FAILED'), (self.first, 'SKIPPED'),
+                          (self.second, 'FAILED'), (self.second, 'SKIPPED')])
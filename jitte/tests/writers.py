@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree
+
+from jitte.core.writers import JUnitWriter, JsonLinesWriter
+from jitte.tests.mocks import MockedLogger
+
+
+class WritersMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        tests = [{'step': '1', 'url': 'http://localhost/',
+                  'script': 'a.json', 'result': 'OK', 'cause': '',
+                  'duration': '0.10000'},
+                 {'step': '2', 'url': 'http://localhost/?a=1&b=<2>',
+                  'script': 'a.json', 'result': 'FAILED',
+                  'cause': 'Got status_code: 500', 'duration': '0.20000'}]
+        self.summary = {'title': 'Summary', 'total': 2, 'pass': 1,
+                        'fail': 1, 'tests': tests}
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_junit(self):
+        JUnitWriter(MockedLogger()).write(self.summary, self.root, 'now')
+        tree = etree.parse(os.path.join(self.root, 'result-now.xml'))
+        self.assertEqual(tree.getroot().get('failures'), '1')
+        testcases = tree.findall('testcase')
+        self.assertEqual(len(testcases), 2)
+        self.assertEqual(testcases[1].get('name'),
+                         'Test 2 http://localhost/?a=1&b=<2>')
+        failure = testcases[1].find('failure')
+        self.assertEqual(failure.get('message'), 'Got status_code: 500')
+
+    def test_junit_unicode_and_control_characters(self):
+        self.summary['tests'] = [
+            {'step': u'1', 'url': u'http://x/\xfc', 'script': u'\xe9.json',
+             'result': u'FAILED', 'cause': u'ok \x01', 'got': u'a\x1bb',
+             'duration': u'0.10000'}]
+        self.summary['total'] = 1
+        self.summary['pass'] = 0
+        JUnitWriter(MockedLogger()).write(self.summary, self.root, 'now')
+        tree = etree.parse(os.path.join(self.root, 'result-now.xml'))
+        testcase = tree.find('testcase')
+        self.assertEqual(testcase.get('name'), u'Test 1 http://x/\xfc')
+        self.assertEqual(testcase.get('classname'), u'\xe9.json')
+        failure = testcase.find('failure')
+        self.assertEqual(failure.get('message'), u'ok ')
+        self.assertEqual(failure.text, u'Got: ab')
+
+    def test_jsonl(self):
+        JsonLinesWriter(MockedLogger()).write(self.summary, self.root, 'now')
+        with open(os.path.join(self.root, 'result-now.jsonl')) as file_obj:
+            self.assertEqual(len(file_obj.readlines()), 2)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.root, 'result-now.summary.json')))
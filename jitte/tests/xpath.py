@@ -0,0 +1,17 @@
+import unittest
+
+from lxml import etree
+
+from jitte.core.xpath import compile_xpath
+
+
+class CompileXPathMethods(unittest.TestCase):
+
+    def test_compiled_once(self):
+        compiled = compile_xpath('//leaf/text()')
+        self.assertTrue(compile_xpath('//leaf/text()') is compiled)
+
+    def test_invalid_expression(self):
+        self.assertRaises(etree.XPathSyntaxError,
+                          compile_xpath,
+                          '//leaf[text(')
@@ -9,6 +9,7 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=['requests', 'lxml', 'jinja2', 'argparse'],
+    extras_require={'streaming': ['ijson']},
     url='http://github.com/integricho/jitte/',
     zip_safe=False,
     scripts=[